@@ -1,10 +1,16 @@
 # Substitua todo o conteúdo de RPA/apexFluxoLegalOne.py por este código:
 
+import re
 import requests
 import os
 import json
-from datetime import datetime, timedelta, UTC
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -15,116 +21,494 @@ load_dotenv()
 CLIENT_ID = os.environ.get("LEGAL_ONE_CLIENT_ID")
 CLIENT_SECRET = os.environ.get("LEGAL_ONE_CLIENT_SECRET")
 BASE_URL = os.environ.get("LEGAL_ONE_BASE_URL")
+AUTH_URL = os.environ.get("LEGAL_ONE_AUTH_URL", "https://api.thomsonreuters.com/legalone/oauth?grant_type=client_credentials")
 
-auth_token_cache = { "token": None, "expires_at": datetime.now(UTC) }
+# Consultas simultâneas de litigations (também é o tamanho do pool de conexões)
+MAX_WORKERS = max(1, int(os.environ.get("LEGAL_ONE_MAX_WORKERS", "8")))
+# Novas tentativas em 429/5xx, com backoff exponencial e respeitando o Retry-After
+MAX_TENTATIVAS = int(os.environ.get("LEGAL_ONE_MAX_TENTATIVAS", "5"))
+TIMEOUT_SEGUNDOS = float(os.environ.get("LEGAL_ONE_TIMEOUT", "30"))
+# Tarefas por página na busca por filtro ($top)
+TAMANHO_PAGINA = int(os.environ.get("LEGAL_ONE_TAMANHO_PAGINA", "30"))
+# Quantos CNJs (litigation_id -> identifierNumber) ficam em memória na frente da tabela do banco
+CACHE_CNJ_MAXIMO = int(os.environ.get("LEGAL_ONE_CACHE_CNJ_MAXIMO", "10000"))
+# Quanto antes de expirar o token é renovado em segundo plano
+TOKEN_ANTECEDENCIA_SEGUNDOS = int(os.environ.get("LEGAL_ONE_TOKEN_ANTECEDENCIA", "300"))
+# Compartilha o token entre server, scheduler e scheduler_api pela tabela tokens_compartilhados
+TOKEN_COMPARTILHADO = os.environ.get("LEGAL_ONE_TOKEN_COMPARTILHADO", "false").lower() in ("1", "true", "sim")
+# Usuário que recebe as tarefas importadas pelo scheduler e pelo scheduler_api
+# (que não têm sessão no painel). Vazio desliga a importação agendada.
+USUARIO_IMPORTACAO_AGENDADA = os.environ.get("LEGAL_ONE_USUARIO_IMPORTACAO", "admin")
 
-def get_access_token():
-    if auth_token_cache["token"] and datetime.now(UTC) < auth_token_cache["expires_at"] - timedelta(seconds=60):
-        return auth_token_cache["token"]
+_sessao = None
+_trava_sessao = threading.Lock()
+_cache_cnj = OrderedDict()
+_trava_cache_cnj = threading.Lock()
+estatisticas_cache_cnj = {"acertos_memoria": 0, "acertos_banco": 0, "faltas": 0}
+
+# Observador das requisições ao Legal One (RPA/metricas.py):
+# observador(endpoint, segundos, status); status None indica falha de conexão.
+observador = None
+
+def _endpoint(url: str) -> str:
+    if url.startswith(AUTH_URL):
+        return "oauth"
+    encontrado = re.search(r"/(tasks|litigations)\b", url)
+    return encontrado.group(1) if encontrado else "outro"
+
+def _observar_resposta(response, *args, **kwargs):
+    if observador is not None:
+        observador(_endpoint(response.url), response.elapsed.total_seconds(), response.status_code)
+
+def _observar_falha(url: str):
+    if observador is not None:
+        observador(_endpoint(url), None, None)
+
+def _criar_sessao():
+    """
+    Sessão HTTP compartilhada: reaproveita conexões (keep-alive) entre as
+    requisições e refaz automaticamente as que recebem 429 ou erro 5xx.
+    """
+    retry = Retry(
+        total=MAX_TENTATIVAS,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=MAX_WORKERS, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount("https://", adapter)
+    sessao.mount("http://", adapter)
+    sessao.hooks["response"].append(_observar_resposta)
+    return sessao
+
+def obter_sessao():
+    global _sessao
+    if _sessao is None:
+        with _trava_sessao:
+            if _sessao is None:
+                _sessao = _criar_sessao()
+    return _sessao
+
+def _gerar_token():
+    """ Pede um token novo ao Legal One. Retorna (token, expira_em em epoch). """
     print("Gerando um novo token de acesso...")
-    auth_url = "https://api.thomsonreuters.com/legalone/oauth?grant_type=client_credentials"
     try:
-        response = requests.post(auth_url, auth=(CLIENT_ID, CLIENT_SECRET))
-        response.raise_for_status()
-        data = response.json()
-        auth_token_cache["token"] = data["access_token"]
-        expires_in = int(data.get("expires_in", 1800))
-        auth_token_cache["expires_at"] = datetime.now(UTC) + timedelta(seconds=expires_in)
-        print("Token gerado com sucesso!")
-        return auth_token_cache["token"]
-    except requests.exceptions.HTTPError as e:
+        response = obter_sessao().post(AUTH_URL, auth=(CLIENT_ID, CLIENT_SECRET), timeout=TIMEOUT_SEGUNDOS)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        _observar_falha(AUTH_URL)
+        raise
+    response.raise_for_status()
+    data = response.json()
+    expires_in = int(data.get("expires_in", 1800))
+    print("Token gerado com sucesso!")
+    return data["access_token"], time.time() + expires_in
+
+class ProvedorDeToken:
+    """
+    Token OAuth do Legal One. Só uma thread renova por vez (as outras esperam
+    e usam o resultado), o token é renovado em segundo plano antes de expirar
+    enquanto estiver em uso e, com 'compartilhado', é lido e gravado no banco
+    para que os outros processos não gerem um token próprio.
+    """
+    NOME = "legal_one"
+    MARGEM_SEGUNDOS = 60
+
+    def __init__(self, antecedencia: int, compartilhado: bool):
+        self.antecedencia = antecedencia
+        self.compartilhado = compartilhado
+        self.renovacoes = 0
+        self._token = None
+        self._expira_em = 0.0
+        self._renovar_em = 0.0
+        self._usado = False
+        self._trava = threading.Lock()
+        self._thread = None
+
+    def _valido(self, margem: float) -> bool:
+        return self._token is not None and time.time() < self._expira_em - margem
+
+    def obter(self) -> str:
+        self._usado = True
+        if self._valido(self.MARGEM_SEGUNDOS):
+            return self._token
+        with self._trava:
+            # Outra thread pode ter renovado o token enquanto esta esperava a trava.
+            if not self._valido(self.MARGEM_SEGUNDOS):
+                self._renovar(self.MARGEM_SEGUNDOS)
+            return self._token
+
+    def invalidar(self, token: str):
+        """ Descarta o token recusado pela API (401), se ainda for o atual. """
+        with self._trava:
+            if self._token == token:
+                self._token, self._expira_em = None, 0.0
+
+    def _aplicar(self, token: str, expira_em: float):
+        self._token, self._expira_em = token, expira_em
+        # Tokens curtos são renovados na metade da vida, não na antecedência inteira.
+        self._renovar_em = expira_em - min(self.antecedencia, (expira_em - time.time()) / 2)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._ciclo_de_renovacao, name="legal-one-token", daemon=True)
+            self._thread.start()
+
+    def _carregar_do_banco(self, margem: float) -> bool:
+        compartilhado = database.buscar_token_compartilhado(self.NOME)
+        if compartilhado and compartilhado[0] and time.time() < compartilhado[1] - margem:
+            self._aplicar(*compartilhado)
+            return True
+        return False
+
+    def _renovar(self, margem: float):
+        """ Chamado com a trava. 'margem' é quanto o token obtido precisa durar. """
+        if self.compartilhado:
+            if self._carregar_do_banco(margem):
+                return
+            # Outro processo já está renovando: espera o token dele até o timeout da API.
+            if not database.reservar_renovacao_token(self.NOME, TIMEOUT_SEGUNDOS):
+                limite = time.time() + TIMEOUT_SEGUNDOS
+                while time.time() < limite:
+                    time.sleep(0.5)
+                    if self._carregar_do_banco(margem):
+                        return
+        token, expira_em = _gerar_token()
+        self.renovacoes += 1
+        self._aplicar(token, expira_em)
+        if self.compartilhado:
+            database.salvar_token_compartilhado(self.NOME, token, expira_em)
+
+    def _ciclo_de_renovacao(self):
+        while True:
+            time.sleep(max(0.0, self._renovar_em - time.time()))
+            with self._trava:
+                # Sem uso desde a última renovação o token expira sozinho; a próxima
+                # chamada a obter() gera outro e reinicia este ciclo.
+                if not self._usado or self._token is None:
+                    self._thread = None
+                    return
+                self._usado = False
+                try:
+                    self._renovar(self.antecedencia / 2)
+                    continue
+                except Exception as e:
+                    # Qualquer erro (API, banco do token compartilhado...) mataria a
+                    # thread com self._thread ainda preenchido, e nenhuma outra seria criada.
+                    print(f"-> Falha na renovação antecipada do token: {e!r}")
+                    # O token atual ainda vale; tenta de novo em 30 segundos.
+                    self._renovar_em = time.time() + 30
+
+provedor_token = ProvedorDeToken(TOKEN_ANTECEDENCIA_SEGUNDOS, TOKEN_COMPARTILHADO)
+
+def get_access_token():
+    return provedor_token.obter()
+
+def _get(url, token, params):
+    try:
+        return obter_sessao().get(url, headers={ "Authorization": f"Bearer {token}" }, params=params, timeout=TIMEOUT_SEGUNDOS)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        _observar_falha(url)
         raise
 
 def make_api_request(url, params):
     token = get_access_token()
-    headers = { "Authorization": f"Bearer {token}" }
-    response = requests.get(url, headers=headers, params=params)
+    response = _get(url, token, params)
+    if response.status_code == 401:
+        # Token revogado antes do prazo: descarta e tenta uma vez com um novo.
+        provedor_token.invalidar(token)
+        response = _get(url, get_access_token(), params)
     response.raise_for_status()
     return response.json()
 
-def get_all_tasks_candidates():
-    print("Iniciando busca de tarefas candidatas...")
-    all_tasks = []
-    tipos_de_tarefa = [
-        "(typeId eq 26 and subTypeId eq 1131)",
-        "(typeId eq 28 and subTypeId eq 961)",
-        "(typeId eq 28 and subTypeId eq 936)",
-        "(typeId eq 15 and subTypeId eq 856)",
-        "(typeId eq 28 and subTypeId eq 984)"
-    ]
-
-    for tipo in tipos_de_tarefa:
-        print(f"\nBuscando os últimos 30 para o filtro: {tipo}")
-        params = {
-            "$filter": f"{tipo} and statusId eq 1 and relationships/any(r: r/linkType eq 'Litigation')",
-            "$expand": "relationships($select=id,linkId)",
-            "$select": "id,finishedBy,relationships",
-            "$top": 30,
-            "$orderby": "id desc"
-        }
-        url = f"{BASE_URL}/tasks"
-        try:
-            data = make_api_request(url, params=params)
-            tasks_nesta_busca = data.get("value", [])
-            all_tasks.extend(tasks_nesta_busca)
-            print(f"-> Encontradas {len(tasks_nesta_busca)} candidatas.")
-        except requests.exceptions.HTTPError as e:
-            print(f"-> Erro ao buscar tarefas para este filtro: {e.response.text}")
+TIPOS_DE_TAREFA = [
+    "(typeId eq 26 and subTypeId eq 1131)",
+    "(typeId eq 28 and subTypeId eq 961)",
+    "(typeId eq 28 and subTypeId eq 936)",
+    "(typeId eq 15 and subTypeId eq 856)",
+    "(typeId eq 28 and subTypeId eq 984)"
+]
+
+def _buscar_tarefas_do_filtro(tipo, marca):
+    """
+    Sem marca (primeira execução do filtro) traz só as últimas TAMANHO_PAGINA
+    tarefas, como antes. Com marca traz todas as tarefas de id maior que ela,
+    seguindo @odata.nextLink ou, na falta dele, $skip até a última página.
+    """
+    filtro = f"{tipo} and statusId eq 1 and relationships/any(r: r/linkType eq 'Litigation')"
+    url_base = f"{BASE_URL}/tasks"
+    params_base = {
+        "$expand": "relationships($select=id,linkId)",
+        "$select": "id,finishedBy,relationships",
+        "$top": TAMANHO_PAGINA,
+    }
+    if marca is None:
+        params_base.update({"$filter": filtro, "$orderby": "id desc"})
+        return make_api_request(url_base, params=params_base).get("value", [])
+
+    params_base.update({"$filter": f"{filtro} and id gt {marca}", "$orderby": "id asc"})
+    tarefas = []
+    url, params = url_base, params_base
+    while True:
+        data = make_api_request(url, params=params)
+        pagina = data.get("value", [])
+        tarefas.extend(pagina)
+        if not pagina:
+            return tarefas
+        if data.get("@odata.nextLink"):
+            url, params = data["@odata.nextLink"], None
+        elif len(pagina) >= TAMANHO_PAGINA:
+            url, params = url_base, {**params_base, "$skip": len(tarefas)}
+        else:
+            return tarefas
+
+def _buscar_filtro_cronometrado(tipo, marca):
+    """ Retorna (tarefas ou None em caso de erro, duração em ms, mensagem). """
+    inicio = time.perf_counter()
+    try:
+        tarefas = _buscar_tarefas_do_filtro(tipo, marca)
+        mensagem = f"{len(tarefas)} candidatas"
+    except requests.exceptions.HTTPError as e:
+        tarefas, mensagem = None, f"Erro ao buscar tarefas para este filtro: {e.response.text}"
+    except requests.exceptions.RequestException as e:
+        tarefas, mensagem = None, f"Erro ao buscar tarefas para este filtro: {e}"
+    return tarefas, (time.perf_counter() - inicio) * 1000, mensagem
+
+def buscar_tarefas_por_filtro(marcas=None):
+    """
+    Consulta os filtros em paralelo. Retorna {filtro: tarefas}; o filtro que
+    falhou fica com None para que a sua marca não avance.
+    """
+    marcas = marcas or {}
+    # Garante o token antes de disparar as threads; se falhar, cada filtro registra o erro.
+    try:
+        get_access_token()
+    except requests.exceptions.RequestException:
+        pass
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(TIPOS_DE_TAREFA), MAX_WORKERS), thread_name_prefix="legal-one-filtro") as executor:
+        futuros = {tipo: executor.submit(_buscar_filtro_cronometrado, tipo, marcas.get(tipo)) for tipo in TIPOS_DE_TAREFA}
+
+    tarefas_por_filtro = {}
+    for tipo, futuro in futuros.items():
+        tarefas, duracao_ms, mensagem = futuro.result()
+        tarefas_por_filtro[tipo] = tarefas
+        origem = f"últimos {TAMANHO_PAGINA}" if marcas.get(tipo) is None else f"id > {marcas[tipo]}"
+        print(f"-> {tipo} [{origem}]: {mensagem} em {duracao_ms:.0f} ms")
+    print(f"-> Busca dos {len(TIPOS_DE_TAREFA)} filtros concluída em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return tarefas_por_filtro
+
+def _unir_tarefas(tarefas_por_filtro):
+    unicas = {}
+    for tarefas in tarefas_por_filtro.values():
+        for tarefa in tarefas or []:
+            unicas.setdefault(tarefa.get('id'), tarefa)
+    return list(unicas.values())
+
+def _calcular_marcas(marcas, tarefas_por_filtro, resultados, falhas_transitorias=frozenset()):
+    """
+    Nova marca de cada filtro: o maior id recebido. Se a consulta do CNJ de
+    alguma tarefa falhou por erro transitório (rede, timeout, 5xx), a marca
+    para logo antes dela, para que ela seja buscada de novo na próxima
+    execução. Tarefas sem CNJ por natureza (sem processo vinculado ou sem
+    identifierNumber) não seguram a marca: buscá-las de novo não mudaria nada.
+    """
+    sem_cnj = {r["tarefa_id"] for r in resultados
+               if not r.get("processo_cnj") and r.get("processo_id") in falhas_transitorias}
+    novas_marcas = {}
+    for tipo, tarefas in tarefas_por_filtro.items():
+        ids = [t['id'] for t in tarefas or [] if t.get('id') is not None]
+        if not ids:
             continue
-    print(f"\nTotal de {len(all_tasks)} tarefas candidatas encontradas em todas as buscas.")
-    return all_tasks
+        pendentes = [i for i in ids if i in sem_cnj]
+        marca = min(pendentes) - 1 if pendentes else max(ids)
+        if marcas.get(tipo) is None or marca > marcas[tipo]:
+            novas_marcas[tipo] = marca
+    return novas_marcas
 
-def get_litigation_by_id(litigation_id):
+def _guardar_cnj_em_memoria(litigation_id, cnj):
+    with _trava_cache_cnj:
+        _cache_cnj[litigation_id] = cnj
+        _cache_cnj.move_to_end(litigation_id)
+        while len(_cache_cnj) > CACHE_CNJ_MAXIMO:
+            _cache_cnj.popitem(last=False)
+
+def _buscar_cnj_em_memoria(litigation_id):
+    with _trava_cache_cnj:
+        cnj = _cache_cnj.get(litigation_id)
+        if cnj is not None:
+            _cache_cnj.move_to_end(litigation_id)
+        return cnj
+
+def _contar(chave, quantidade=1):
+    with _trava_cache_cnj:
+        estatisticas_cache_cnj[chave] += quantidade
+
+# Retorno de _consultar_cnj_na_api quando a consulta falhou e vale tentar de novo.
+_FALHA_TRANSITORIA = object()
+_STATUS_TRANSITORIOS = {401, 408, 429}
+
+def _consultar_cnj_na_api(litigation_id):
     url = f"{BASE_URL}/litigations/{litigation_id}?$select=identifierNumber"
     try:
-        return make_api_request(url, params={})
+        litigation_data = make_api_request(url, params={})
     except requests.exceptions.HTTPError as e:
-        return None
+        print(f"-> Erro ao buscar o processo {litigation_id}: {e}")
+        status = e.response.status_code if e.response is not None else None
+        # 4xx (processo removido, sem permissão...) se repetiria a cada execução.
+        if status is not None and 400 <= status < 500 and status not in _STATUS_TRANSITORIOS:
+            return None
+        return _FALHA_TRANSITORIA
+    except requests.exceptions.RequestException as e:
+        print(f"-> Erro ao buscar o processo {litigation_id}: {e}")
+        return _FALHA_TRANSITORIA
+    return litigation_data.get('identifierNumber') if litigation_data else None
+
+def obter_cnjs(litigation_ids, falhas_transitorias=None) -> dict:
+    """
+    CNJ de cada litigation: primeiro a memória, depois o banco (uma consulta) e
+    só as que faltarem vão à API, com até MAX_WORKERS consultas simultâneas.
+    As obtidas da API são gravadas no banco de uma vez. Se informado, o set
+    'falhas_transitorias' recebe as litigations cuja consulta falhou por erro
+    de rede ou da API (e não por falta de CNJ).
+    """
+    cnjs, pendentes = {}, []
+    for litigation_id in dict.fromkeys(i for i in litigation_ids if i is not None):
+        cnj = _buscar_cnj_em_memoria(litigation_id)
+        if cnj is not None:
+            cnjs[litigation_id] = cnj
+        else:
+            pendentes.append(litigation_id)
+    _contar("acertos_memoria", len(cnjs))
+
+    do_banco = database.buscar_cnjs_em_cache(pendentes) if pendentes else {}
+    for litigation_id, cnj in do_banco.items():
+        _guardar_cnj_em_memoria(litigation_id, cnj)
+    cnjs.update(do_banco)
+    _contar("acertos_banco", len(do_banco))
+
+    faltantes = [i for i in pendentes if i not in do_banco]
+    _contar("faltas", len(faltantes))
+    if faltantes:
+        # Garante o token antes de disparar as threads.
+        get_access_token()
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="legal-one") as executor:
+            respostas = dict(zip(faltantes, executor.map(_consultar_cnj_na_api, faltantes)))
+        if falhas_transitorias is not None:
+            falhas_transitorias.update(i for i, cnj in respostas.items() if cnj is _FALHA_TRANSITORIA)
+        da_api = {i: cnj for i, cnj in respostas.items() if cnj and cnj is not _FALHA_TRANSITORIA}
+        for litigation_id, cnj in da_api.items():
+            _guardar_cnj_em_memoria(litigation_id, cnj)
+        database.salvar_cnjs_em_cache(da_api)
+        cnjs.update(da_api)
+    return cnjs
+
+def _litigation_da_tarefa(task):
+    return task['relationships'][0].get('linkId') if task.get('relationships') else None
+
+def processar_tarefas(tasks, falhas_transitorias=None):
+    """
+    Monta o resultado de cada tarefa nova com o CNJ do seu processo, mantendo a
+    ordem original das tarefas (ver obter_cnjs para 'falhas_transitorias').
+    """
+    print(f"\nBuscando o CNJ de {len(tasks)} tarefas novas ({MAX_WORKERS} consultas simultâneas)...")
+    cnjs = obter_cnjs((_litigation_da_tarefa(task) for task in tasks), falhas_transitorias)
+    print(f"-> Cache de CNJ: {estatisticas_cache_cnj}")
+    resultados = []
+    for task in tasks:
+        litigation_id = _litigation_da_tarefa(task)
+        resultados.append({
+            "tarefa_id": task.get('id'),
+            "processo_id": litigation_id,
+            "processo_cnj": cnjs.get(litigation_id),
+            "finalizado_por_id": task.get('finishedBy'),
+        })
+    return resultados
 
 # --- FUNÇÃO PRINCIPAL MODIFICADA ---
-def main():
+def main(persistir=None):
+    """
+    Importa as tarefas novas do Legal One. Se 'persistir' for informado, ele
+    recebe os resultados para gravá-los, e só depois de ele terminar sem erro
+    as marcas de cada filtro (último id visto) avançam. Sem 'persistir' as
+    marcas não mudam, pois nada garante que as tarefas foram gravadas.
+    """
     if not CLIENT_ID or not CLIENT_SECRET:
         return []
 
-    # 1. Busca a lista de candidatos
-    tasks_candidatas = get_all_tasks_candidates()
-    if not tasks_candidatas:
-        print("Nenhuma tarefa candidata encontrada. Encerrando.")
-        return []
+    # 1. Busca as tarefas de cada filtro a partir da sua marca
+    marcas = database.buscar_marcas_legal_one()
+    print("Iniciando busca de tarefas candidatas...")
+    tarefas_por_filtro = buscar_tarefas_por_filtro(marcas)
+    tasks_candidatas = _unir_tarefas(tarefas_por_filtro)
+    print(f"\nTotal de {len(tasks_candidatas)} tarefas candidatas encontradas em todas as buscas.")
 
     # 2. Filtra a lista para obter apenas as tarefas novas
     tasks_para_processar = database.filtrar_tarefas_novas(tasks_candidatas)
-    
-    if not tasks_para_processar:
-        print("Nenhuma tarefa NOVA para processar. Encerrando.")
-        return []
 
     # 3. Processa apenas a lista de tarefas novas
     final_results = []
-    for task in tasks_para_processar:
-        task_id = task.get('id')
-        print(f"\nProcessando Tarefa NOVA ID: {task_id}...")
-        user_id = task.get('finishedBy')
-        litigation_id = task['relationships'][0].get('linkId') if task.get('relationships') else None
-        cnj_number = None
-        if litigation_id:
-            litigation_data = get_litigation_by_id(litigation_id)
-            if litigation_data:
-                cnj_number = litigation_data.get('identifierNumber')
-        
-        final_results.append({
-            "tarefa_id": task_id,
-            "processo_id": litigation_id,
-            "processo_cnj": cnj_number,
-            "finalizado_por_id": user_id,
-        })
+    falhas_transitorias = set()
+    if not tasks_candidatas:
+        print("Nenhuma tarefa candidata encontrada.")
+    elif not tasks_para_processar:
+        print("Nenhuma tarefa NOVA para processar.")
+    else:
+        final_results = processar_tarefas(tasks_para_processar, falhas_transitorias)
+        print("\n--- RESULTADO FINAL ---")
+        nome_do_arquivo = "resultado_tarefas.json"
+        with open(nome_do_arquivo, "w", encoding="utf-8") as f:
+            json.dump(final_results, f, indent=2, ensure_ascii=False)
+        print(f"Resultados salvos com sucesso no arquivo: {nome_do_arquivo}")
 
-    print("\n--- RESULTADO FINAL ---")
-    nome_do_arquivo = "resultado_tarefas.json"
-    with open(nome_do_arquivo, "w", encoding="utf-8") as f:
-        json.dump(final_results, f, indent=2, ensure_ascii=False)
-    print(f"Resultados salvos com sucesso no arquivo: {nome_do_arquivo}")
+    # 4. Grava e só então avança as marcas
+    if persistir is not None:
+        if final_results:
+            persistir(final_results)
+        novas_marcas = _calcular_marcas(marcas, tarefas_por_filtro, final_results, falhas_transitorias)
+        database.salvar_marcas_legal_one(novas_marcas)
+        if novas_marcas:
+            print(f"-> Marcas atualizadas: {novas_marcas}")
     return final_results
 
+def gravar_para_usuario(user_id, contagem=None):
+    """
+    Retorna o 'persistir' de main() que coloca as tarefas importadas na esteira
+    do usuário: só entram tarefas com número CNJ e id da tarefa, todas em uma
+    única transação. 'contagem', se informado, recebe adicionados e ignorados.
+    """
+    def persistir(tarefas):
+        lote = [
+            {
+                "numero_processo": tarefa.get('processo_cnj'),
+                "executante": tarefa.get('finalizado_por_nome'),
+                "tarefa_id": tarefa.get('tarefa_id'),
+                "id_responsavel": tarefa.get('finalizado_por_id'),
+            }
+            for tarefa in tarefas
+            if tarefa.get('processo_cnj') and tarefa.get('tarefa_id')
+        ]
+        adicionados, ignorados = database.adicionar_processos_em_lote(user_id, lote)
+        if contagem is not None:
+            contagem["adicionados"], contagem["ignorados"] = adicionados, ignorados
+    return persistir
+
+def importar_agendado():
+    """
+    Importação dos agendadores: grava as tarefas para o usuário
+    LEGAL_ONE_USUARIO_IMPORTACAO e avança as marcas, como o botão do painel.
+    Sem usuário válido, não importa nada (sem gravar, as marcas não andariam e
+    cada execução buscaria de novo todas as tarefas desde a última marca).
+    """
+    usuario = database.buscar_usuario_por_nome(USUARIO_IMPORTACAO_AGENDADA) if USUARIO_IMPORTACAO_AGENDADA else None
+    if not usuario:
+        print(f"-> Importação agendada desligada: usuário '{USUARIO_IMPORTACAO_AGENDADA}' não encontrado (LEGAL_ONE_USUARIO_IMPORTACAO).")
+        return []
+    contagem = {"adicionados": 0, "ignorados": 0}
+    resultados = main(persistir=gravar_para_usuario(usuario['id'], contagem))
+    if resultados:
+        print(f"-> {contagem['adicionados']} processo(s) adicionado(s) para '{usuario['username']}', {contagem['ignorados']} ignorado(s).")
+    return resultados
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
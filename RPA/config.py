@@ -1,5 +1,6 @@
 # Em: RPA/config.py
 import os
+import socket
 from pathlib import Path
 
 # --- LEITURA DAS VARIÁVEIS DE AMBIENTE VINDAS DO DOCKER ---
@@ -13,7 +14,7 @@ FRONTEND_ORIGIN = os.environ.get('FRONTEND_ORIGIN', 'http://localhost:3000')
 
 
 # --- CONFIGURAÇÕES DE CONEXÃO ---
-EXTENSION_URL = "chrome-extension://lnidijeaekolpfeckelhkomndglcglhh/index.html"
+EXTENSION_URL = os.environ.get('RPA_EXTENSION_URL', "chrome-extension://lnidijeaekolpfeckelhkomndglcglhh/index.html")
 CDP_ENDPOINT = "http://localhost:9222"
 
 # --- CAMINHOS DE ARQUIVOS ---
@@ -26,4 +27,79 @@ URL_BUSCA_PROCESSO = "https://juridico.bb.com.br/paj/juridico/v2?app=processoCon
 API_TASKS_BATCH_URL = f"http://{HOST_IP}:8000/api/v1/tasks/batch-create"
 
 # URL base da API do "server.py" (a que o frontend usa)
-API_SERVER_BASE_URL = f"http://{HOST_IP}:5000/api"
\ No newline at end of file
+API_SERVER_BASE_URL = f"http://{HOST_IP}:5000/api"
+
+# --- CONFIGURAÇÕES DE EXECUÇÃO DO RPA ---
+# Quantidade de abas (workers) que processam a fila em paralelo dentro do
+# mesmo contexto autenticado. Com 1, o robô mantém o fluxo sequencial original.
+RPA_NUM_WORKERS = max(1, int(os.environ.get('RPA_NUM_WORKERS', '1')))
+
+# Modo de extração dos subsídios: 'dom' lê a tabela do iframe; 'xhr' lê o JSON
+# que o Angular busca ao abrir o menu 'Subsídios' (com a tabela como alternativa).
+RPA_MODO_EXTRACAO = os.environ.get('RPA_MODO_EXTRACAO', 'dom').lower()
+# Expressão regular aplicada à URL das respostas XHR para reconhecer a lista de subsídios
+# (só respostas com content-type JSON são consideradas).
+XHR_SUBSIDIOS_PADRAO_URL = os.environ.get('XHR_SUBSIDIOS_PADRAO_URL', r'subsidio')
+
+# Gravação em lote das leituras (RPA/gravador.py): o lote é gravado ao atingir
+# este tamanho ou quando a leitura mais antiga passa deste intervalo (segundos).
+RPA_GRAVACAO_LOTE_TAMANHO = max(1, int(os.environ.get('RPA_GRAVACAO_LOTE_TAMANHO', '25')))
+RPA_GRAVACAO_LOTE_INTERVALO = float(os.environ.get('RPA_GRAVACAO_LOTE_INTERVALO', '2'))
+
+# Ciclo do RPA com agenda adaptativa (intervalos de backoff em bd/database.py):
+# cada ciclo pega no máximo este lote dos processos vencidos e não inicia
+# processos novos depois do prazo (0 desativa o prazo).
+RPA_CICLO_MAXIMO_PROCESSOS = max(1, int(os.environ.get('RPA_CICLO_MAXIMO_PROCESSOS', '300')))
+RPA_CICLO_MAXIMO_MINUTOS = float(os.environ.get('RPA_CICLO_MAXIMO_MINUTOS', '30'))
+# Pausa entre ciclos: até a próxima verificação vencer, dentro destes limites (segundos).
+RPA_PAUSA_MINIMA_SEGUNDOS = int(os.environ.get('RPA_PAUSA_MINIMA_SEGUNDOS', '60'))
+RPA_PAUSA_MAXIMA_SEGUNDOS = int(os.environ.get('RPA_PAUSA_MAXIMA_SEGUNDOS', '600'))
+
+# Fila persistente de jobs do RPA (tabela rpa_jobs): tentativas por processo e
+# prazo do lease, após o qual o job de um worker que caiu volta para a fila.
+RPA_JOB_MAX_TENTATIVAS = max(1, int(os.environ.get('RPA_JOB_MAX_TENTATIVAS', '2')))
+RPA_JOB_LEASE_SEGUNDOS = int(os.environ.get('RPA_JOB_LEASE_SEGUNDOS', '300'))
+
+# Verificação da sessão do portal (RPA/sessao.py): no máximo a cada N segundos,
+# ou antes disso se a aba for redirecionada para uma URL de login
+# (RPA_SESSAO_PADRAO_LOGIN) ou o portal responder 401/403. Com 0, a sessão é
+# verificada antes de cada processo, como antes.
+RPA_SESSAO_INTERVALO_VERIFICACAO = float(os.environ.get('RPA_SESSAO_INTERVALO_VERIFICACAO', '300'))
+RPA_SESSAO_PADRAO_LOGIN = os.environ.get('RPA_SESSAO_PADRAO_LOGIN', r'login|logon|/sso/|autenticacao')
+
+# Navegador persistente (RPA/supervisor.py): mantém o Chrome e a sessão do
+# portal abertos entre os ciclos, reciclando o Chrome após este tempo (0 desativa).
+RPA_NAVEGADOR_PERSISTENTE = os.environ.get('RPA_NAVEGADOR_PERSISTENTE', 'true').lower() in ('1', 'true', 'sim')
+RPA_NAVEGADOR_RECICLAR_HORAS = float(os.environ.get('RPA_NAVEGADOR_RECICLAR_HORAS', '12'))
+
+# Modo de abertura do navegador: 'cdp' executa o abrir_chrome.bat e se conecta
+# à porta fixa de CDP_ENDPOINT (Windows); 'playwright' lança o Chromium pelo
+# próprio Playwright, com a extensão descompactada de RPA_EXTENSAO_DIR, em um
+# perfil (RPA_PERFIS_DIR/RPA_WORKER_ID) e uma porta livre exclusivos do worker,
+# o que permite vários workers no mesmo host Linux/Docker. Extensão carregada
+# a partir de uma pasta pode ganhar outro ID: ajuste RPA_EXTENSION_URL.
+RPA_MODO_NAVEGADOR = os.environ.get('RPA_MODO_NAVEGADOR', 'cdp').lower()
+RPA_HEADLESS = os.environ.get('RPA_HEADLESS', 'true').lower() in ('1', 'true', 'sim')
+# O canal 'chromium' usa o headless novo, o único que carrega extensões.
+RPA_CANAL_NAVEGADOR = os.environ.get('RPA_CANAL_NAVEGADOR', 'chromium')
+RPA_EXTENSAO_DIR = os.environ.get('RPA_EXTENSAO_DIR', '')
+RPA_PERFIS_DIR = os.environ.get('RPA_PERFIS_DIR', str(Path(__file__).resolve().parent / 'perfis_chrome'))
+RPA_WORKER_ID = os.environ.get('RPA_WORKER_ID') or f"{socket.gethostname()}-{os.getpid()}"
+# Com true, o scheduler.py só roda o loop do RPA (sem a importação do Legal One).
+RPA_AGENDADOR_SOMENTE_RPA = os.environ.get('RPA_AGENDADOR_SOMENTE_RPA', 'false').lower() in ('1', 'true', 'sim')
+
+# Perfil leve de navegação (RPA/rede.py): bloqueia, pelo próprio Chromium
+# (Network.setBlockedURLs, sem interceptar as requisições no Python e sem
+# desligar o cache HTTP), as extensões de arquivo dos tipos de recurso e os
+# padrões de URL (curinga '*', separados por vírgula) que não influenciam a
+# leitura dos subsídios, e troca as esperas por 'networkidle' por esperas
+# direcionadas. Desligado até a comparação com RPA/relatorio_rpa.py justificar.
+RPA_PERFIL_LEVE = os.environ.get('RPA_PERFIL_LEVE', 'false').lower() in ('1', 'true', 'sim')
+RPA_BLOQUEAR_TIPOS = [t.strip() for t in os.environ.get('RPA_BLOQUEAR_TIPOS', 'image,media,font').split(',') if t.strip()]
+RPA_BLOQUEAR_URLS = os.environ.get(
+    'RPA_BLOQUEAR_URLS',
+    '*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,*hotjar.com*,*clarity.ms*,*newrelic.com*,*nr-data.net*',
+)
+# Contabiliza bytes e requisições do portal em cada execução (com ou sem o perfil
+# leve). Custa uma chamada extra ao navegador por requisição: ligue só para medir.
+RPA_MEDIR_REDE = os.environ.get('RPA_MEDIR_REDE', 'false').lower() in ('1', 'true', 'sim')
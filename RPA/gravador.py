@@ -0,0 +1,130 @@
+# Em: RPA/gravador.py
+"""
+Gravação em segundo plano (write-behind) das leituras do RPA.
+
+As abas entregam cada leitura ao GravadorEmLote e seguem para o próximo
+processo; uma thread própria junta as leituras e grava em uma única transação
+quando o lote enche (tamanho) ou quando a leitura mais antiga do lote passa do
+intervalo (tempo). fechar() só retorna depois que tudo o que foi entregue está
+gravado (ou registrado como falha).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from bd import database
+
+_FIM = object()
+
+
+class GravadorEmLote:
+    def __init__(self, tamanho_lote: int = 25, intervalo: float = 2.0, apos_gravar=None, capacidade: int = 1000,
+                 gravar_lote=database.atualizar_status_em_lote, gravar_unitario=database.gravar_leitura_rpa,
+                 apos_falhar=None):
+        """
+        apos_gravar, se informado, recebe {numero_processo: subsídios alterados}
+        de cada lote depois do commit. Se o lote falhar, as leituras são
+        gravadas uma a uma; as que falharem também assim não entram no
+        resultado nem em leituras_gravadas, e vão para apos_falhar (lista de
+        números de processo). 'capacidade' limita a fila: se o banco ficar para
+        trás, as abas esperam em vez de acumular memória.
+        """
+        self.tamanho_lote = max(1, tamanho_lote)
+        self.intervalo = intervalo
+        self.apos_gravar = apos_gravar
+        self.apos_falhar = apos_falhar
+        self.leituras_gravadas = 0
+        self.leituras_com_falha = 0
+        self.lotes_gravados = 0
+        self._gravar_lote = gravar_lote
+        self._gravar_unitario = gravar_unitario
+        self._fila = queue.Queue(maxsize=capacidade)
+        self._fechado = False
+        self._trava = threading.Lock()
+        self._thread = threading.Thread(target=self._executar, name="rpa-gravador", daemon=True)
+        self._thread.start()
+        # Garante a gravação do que estiver na fila se o processo encerrar sem fechar().
+        atexit.register(self.fechar)
+
+    def __call__(self, numero_processo: str, lista_subsidios: list):
+        """ Mesma assinatura de database.atualizar_status_para_usuarios. """
+        self.enviar(numero_processo, lista_subsidios)
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def enviar(self, numero_processo: str, lista_subsidios: list):
+        if self._fechado:
+            raise RuntimeError("O gravador já foi fechado.")
+        self._fila.put((numero_processo, list(lista_subsidios)))
+
+    def fechar(self):
+        """ Grava o que falta na fila e encerra a thread. Pode ser chamado mais de uma vez. """
+        with self._trava:
+            if self._fechado:
+                return
+            self._fechado = True
+        atexit.unregister(self.fechar)
+        self._fila.put(_FIM)
+        self._thread.join()
+        logging.info(f"💾 Gravador encerrado: {self.leituras_gravadas} leitura(s) em {self.lotes_gravados} lote(s).")
+        if self.leituras_com_falha:
+            logging.error(f"‼️ {self.leituras_com_falha} leitura(s) não puderam ser gravadas.")
+
+    def _executar(self):
+        lote, limite = [], None
+        while True:
+            espera = None if not lote else max(0.0, limite - time.monotonic())
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+            if item is _FIM:
+                self._gravar(lote)
+                return
+            if item is not None:
+                if not lote:
+                    limite = time.monotonic() + self.intervalo
+                lote.append(item)
+            if lote and (len(lote) >= self.tamanho_lote or time.monotonic() >= limite):
+                self._gravar(lote)
+                lote = []
+
+    def _gravar(self, lote: list):
+        if not lote:
+            return
+        try:
+            resultado = self._gravar_lote(lote)
+        except Exception:
+            # Um registro problemático não pode levar o lote inteiro junto.
+            logging.error(f"Falha ao gravar lote de {len(lote)} leitura(s). Gravando uma a uma.", exc_info=True)
+            resultado, falhas = {}, []
+            for numero_processo, lista_subsidios in lote:
+                try:
+                    resultado[numero_processo] = self._gravar_unitario(numero_processo, lista_subsidios)
+                except Exception:
+                    falhas.append(numero_processo)
+                    logging.error(f"Falha ao gravar a leitura do processo {numero_processo}.", exc_info=True)
+            if falhas:
+                self.leituras_com_falha += len(falhas)
+                if self.apos_falhar:
+                    try:
+                        self.apos_falhar(falhas)
+                    except Exception:
+                        logging.error("Erro no retorno de falha de gravação.", exc_info=True)
+            gravadas = len(lote) - len(falhas)
+        else:
+            gravadas = len(lote)
+        self.leituras_gravadas += gravadas
+        self.lotes_gravados += 1
+        if self.apos_gravar and resultado:
+            try:
+                self.apos_gravar(resultado)
+            except Exception:
+                logging.error("Erro no retorno pós-gravação do lote.", exc_info=True)
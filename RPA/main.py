@@ -1,7 +1,12 @@
 import sys
 import os
 import time
+import datetime
+import socket
+import contextlib
 import logging
+import threading
+import signal
 from logging.handlers import RotatingFileHandler
 from playwright.sync_api import sync_playwright
 
@@ -12,7 +17,11 @@ caminho_raiz_do_projeto = os.path.dirname(caminho_atual)
 if caminho_raiz_do_projeto not in sys.path:
     sys.path.append(caminho_raiz_do_projeto)
 
-from RPA import navegador, portal_bb, processo, config
+from RPA import navegador, portal_bb, processo, rede, metricas, config
+from RPA.gravador import GravadorEmLote
+from RPA.supervisor import supervisor
+from RPA.medicao import MedicaoDaExecucao
+from RPA.sessao import GuardaDeSessao
 from bd import database
 
 # --- CONFIGURAÇÃO DO LOG ---
@@ -33,88 +42,377 @@ if not logger.handlers:
     logger.addHandler(stream_handler)
 
 
-def executar_rpa(lista_processos: list, funcao_de_atualizacao=database.atualizar_status_para_usuarios):
+# Churn da execução atual: processos gravados, quantos mudaram e quantos subsídios mudaram.
+_churn = {"processos": 0, "com_mudanca": 0, "subsidios_alterados": 0}
+_trava_churn = threading.Lock()
+
+
+def _registrar_churn(alterados):
+    # Funções de atualização que não informam o que mudou retornam None.
+    if alterados is None:
+        return
+    with _trava_churn:
+        _churn["processos"] += 1
+        _churn["com_mudanca"] += 1 if alterados else 0
+        _churn["subsidios_alterados"] += alterados
+
+
+# Jobs cuja leitura está na fila do GravadorEmLote: {numero_processo: (execucao_id, dono)}.
+# Só são concluídos depois do commit da leitura (_apos_gravar_lote).
+_jobs_em_gravacao = {}
+_trava_jobs_em_gravacao = threading.Lock()
+
+# Sinalizado pelo SIGTERM/SIGINT: nenhum job novo é arrendado.
+_encerrando = threading.Event()
+
+
+def instalar_encerramento_por_sinal():
     """
-    Executa o robô de RPA com uma lógica de 2 tentativas e logging detalhado.
-    (Esta é a sua função original, mantida 100% intacta)
+    Converte SIGTERM (docker stop) e SIGINT em SystemExit na thread principal.
+    O SIGTERM padrão mata o processo sem executar os handlers do atexit; assim,
+    o finally de executar_rpa (ou o atexit, quando o RPA roda em outra thread)
+    fecha o gravador e as leituras na fila são gravadas antes de sair.
     """
-    logging.info("--- INICIANDO EXECUÇÃO DO RPA ---")
-    browser = None
-    processos_para_tentar = lista_processos[:] 
+    def _ao_receber_sinal(signum, frame):
+        if _encerrando.is_set():
+            # Já encerrando: um segundo sinal não interrompe a gravação da fila.
+            return
+        _encerrando.set()
+        logging.warning(f"🛑 {signal.Signals(signum).name} recebido. Gravando as leituras pendentes e encerrando...")
+        raise SystemExit(128 + signum)
+
+    for sinal in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sinal, _ao_receber_sinal)
+
+
+# Medição por etapa da execução atual (recriada a cada executar_rpa).
+_medicao = MedicaoDaExecucao()
+
+
+def _medir_etapa(nome: str):
+    return _medicao.etapa(nome)
+
+
+def _registrar_relatorio(execucao_id: int, inicio):
+    """ Registra no log e grava em rpa_relatorios os percentis por etapa da execução. """
+    relatorio = _medicao.relatorio()
+    if not relatorio["processos"]:
+        return
+    for nome, etapa in relatorio["etapas"].items():
+        logging.info(f"⏱️ {nome:<10} p50 {etapa['p50']:.2f}s | p95 {etapa['p95']:.2f}s | p99 {etapa['p99']:.2f}s"
+                     f" | {etapa['amostras']} amostra(s), {etapa['falhas']} falha(s)")
+    for lento in relatorio["mais_lentos"][:3]:
+        logging.info(f"🐢 {lento['numero_processo']}: {lento['segundos']:.1f}s {lento['etapas']}")
+    relatorio["rede"] = dict(rede.estatisticas_rede)
+    try:
+        relatorio_id = database.salvar_relatorio_rpa(execucao_id, inicio, datetime.datetime.now(), relatorio)
+        logging.info(f"📈 Relatório {relatorio_id} gravado (compare com: python RPA/relatorio_rpa.py comparar).")
+    except Exception:
+        logging.error("Falha ao gravar o relatório da execução.", exc_info=True)
+
+
+def _processar_processo(portal_page, num_processo: str, funcao_de_atualizacao):
+    """
+    Executa as etapas do robô para um único processo na aba informada.
+    """
+    # No perfil leve, as esperas por 'networkidle' dão lugar às esperas
+    # direcionadas de cada etapa (menu lateral, cabeçalho da tabela, resposta XHR).
+    aguardar_rede = not config.RPA_PERFIL_LEVE
+    logging.info(f"--- Processando: {num_processo} ---")
+    logging.info(f" 	a. Navegando para a página do processo...")
+    with _medir_etapa("navegar"):
+        processo.navegar_para_processo(portal_page, num_processo, config.URL_BUSCA_PROCESSO)
+
+    logging.info(f" 	b. Acessando detalhes e subsídios...")
+    with _medir_etapa("detalhes"):
+        processo.acessar_detalhes(portal_page, num_processo, aguardar_rede=aguardar_rede and config.RPA_MODO_EXTRACAO != "xhr")
+    if config.RPA_MODO_EXTRACAO == "xhr":
+        logging.info(f" 	c. Capturando subsídios pela resposta XHR...")
+        with _medir_etapa("subsidios"):
+            dados_subsidios_do_processo = processo.capturar_subsidios_xhr(portal_page, num_processo, config.XHR_SUBSIDIOS_PADRAO_URL)
+        if dados_subsidios_do_processo is None:
+            logging.info(f" 	c. XHR indisponível. Extraindo dados da tabela...")
+            with _medir_etapa("extrair"):
+                dados_subsidios_do_processo = processo.extrair_dados_subsidios(portal_page)
+    else:
+        with _medir_etapa("subsidios"):
+            processo.clicar_menu_subsidios(portal_page, num_processo, aguardar_rede=aguardar_rede)
+
+        logging.info(f" 	c. Extraindo dados da tabela...")
+        with _medir_etapa("extrair"):
+            dados_subsidios_do_processo = processo.extrair_dados_subsidios(portal_page)
+
+    if dados_subsidios_do_processo:
+        logging.info(f" 	d. Encontrados {len(dados_subsidios_do_processo)} subsídios. Atualizando banco de dados...")
+        with _medir_etapa("gravar"):
+            alterados = funcao_de_atualizacao(num_processo, dados_subsidios_do_processo)
+        if alterados is None:
+            logging.info(f" 	✔️ SUCESSO: Leitura do processo {num_processo} entregue para gravação.")
+        elif alterados == 0:
+            logging.info(f" 	✔️ SUCESSO: Processo {num_processo} sem alterações desde a última leitura.")
+        else:
+            logging.info(f" 	✔️ SUCESSO: Banco de dados atualizado para o processo {num_processo} ({alterados} subsídio(s) alterado(s)).")
+    else:
+        logging.info(f" 	d. Nenhum subsídio encontrado para {num_processo}.")
+        with _medir_etapa("gravar"):
+            alterados = funcao_de_atualizacao(num_processo, [])
+    _registrar_churn(alterados)
+
+
+def _prazo_esgotado(prazo) -> bool:
+    return prazo is not None and time.monotonic() >= prazo
+
+
+def _dono_do_job() -> str:
+    """ Identifica o worker nos leases da fila (máquina, processo e thread). """
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def _processar_job(guarda: GuardaDeSessao, execucao_id: int, num_processo: str, dono: str, funcao_de_atualizacao):
+    """
+    Processa um job já arrendado e registra o resultado na fila persistente.
+    A sessão só é verificada quando o guarda pede; se o processo falhar com a
+    sessão caída, o guarda refaz o login e o processo é repetido na nova aba.
+    Com o GravadorEmLote, o job só é concluído depois que a leitura é gravada.
+    """
+    gravacao_adiada = isinstance(funcao_de_atualizacao, GravadorEmLote)
+    if gravacao_adiada:
+        with _trava_jobs_em_gravacao:
+            _jobs_em_gravacao[num_processo] = (execucao_id, dono)
+    try:
+        with _medicao.processo(num_processo):
+            with _medir_etapa("sessao"):
+                guarda.garantir()
+            try:
+                _processar_processo(guarda.page, num_processo, funcao_de_atualizacao)
+            except Exception:
+                with _medir_etapa("sessao"):
+                    relogou = guarda.recuperar_apos_falha()
+                if not relogou:
+                    raise
+                logging.warning(f"🔁 Repetindo {num_processo} após o re-login.")
+                _processar_processo(guarda.page, num_processo, funcao_de_atualizacao)
+        if not gravacao_adiada:
+            database.concluir_job_rpa(execucao_id, num_processo, dono)
+            metricas.rpa_processos.incrementar("sucesso")
+    except Exception as e:
+        if gravacao_adiada:
+            with _trava_jobs_em_gravacao:
+                _jobs_em_gravacao.pop(num_processo, None)
+        metricas.rpa_processos.incrementar("falha")
+        logging.error(f"[{threading.current_thread().name}] ERRO AO PROCESSAR {num_processo}", exc_info=True)
+        if database.falhar_job_rpa(execucao_id, num_processo, dono, repr(e), config.RPA_JOB_MAX_TENTATIVAS):
+            logging.warning(f"{num_processo} esgotou as {config.RPA_JOB_MAX_TENTATIVAS} tentativas.")
+
+
+def _arrendar_proximo(execucao_id: int, dono: str, prazo):
+    if _encerrando.is_set() or _prazo_esgotado(prazo):
+        return None
+    return database.arrendar_job_rpa(execucao_id, dono, config.RPA_JOB_LEASE_SEGUNDOS, config.RPA_JOB_MAX_TENTATIVAS)
+
+
+def _processar_sequencial(portal_page, context, execucao_id: int, funcao_de_atualizacao, prazo=None):
+    """
+    Consome a fila de jobs da execução em uma única aba, um processo após o
+    outro. Retorna a aba em uso (pode ter mudado por re-login).
+    """
+    dono = _dono_do_job()
+    guarda = GuardaDeSessao(portal_page, context, config.RPA_SESSAO_INTERVALO_VERIFICACAO)
+    while (num_processo := _arrendar_proximo(execucao_id, dono, prazo)) is not None:
+        _processar_job(guarda, execucao_id, num_processo, dono, funcao_de_atualizacao)
+    logging.info(f"🔐 {guarda.resumo()}.")
+    return guarda.page
 
+
+def _worker_paralelo(indice: int, execucao_id: int, url_portal: str, funcao_de_atualizacao,
+                     trava_login: threading.Lock, prazo=None):
+    """
+    Worker de uma aba. Cada thread abre sua própria conexão Playwright ao mesmo
+    Chrome (o Playwright síncrono não pode ser compartilhado entre threads) e cria
+    uma aba no contexto já autenticado, arrendando jobs da fila até esvaziá-la.
+    """
+    nome = f"Worker {indice}"
     try:
         with sync_playwright() as p:
-            browser = navegador.iniciar_e_conectar(p)
-            if not browser:
-                logging.error("Falha ao iniciar o navegador. Abortando.")
-                return
+            browser = p.chromium.connect_over_cdp(navegador.endpoint_cdp())
+            context = browser.contexts[0]
+            rede.preparar_contexto(context)
+            page = context.new_page()
+            # A aba nova ainda não foi verificada: o primeiro job confere a sessão.
+            guarda = GuardaDeSessao(page, context, config.RPA_SESSAO_INTERVALO_VERIFICACAO, trava_login, verificada=False)
+            try:
+                # A aba nova começa em branco; abrimos o portal para herdar a sessão.
+                page.goto(url_portal, wait_until="domcontentloaded")
+                dono = _dono_do_job()
+                while (num_processo := _arrendar_proximo(execucao_id, dono, prazo)) is not None:
+                    _processar_job(guarda, execucao_id, num_processo, dono, funcao_de_atualizacao)
+                logging.info(f"[{nome}] 🔐 {guarda.resumo()}.")
+            finally:
+                if not guarda.page.is_closed():
+                    guarda.page.close()
+    except Exception:
+        # Jobs pendentes ficam para os demais; um job arrendado volta quando o lease vencer.
+        logging.error(f"[{nome}] Falha geral no worker. Os processos restantes ficam para os demais.", exc_info=True)
+
+
+def _processar_paralelo(portal_page, execucao_id: int, pendentes: int, funcao_de_atualizacao, prazo=None):
+    """
+    Distribui a fila de jobs da execução entre config.RPA_NUM_WORKERS abas do
+    mesmo contexto.
+    """
+    trava_login = threading.Lock()
+    num_workers = max(1, min(config.RPA_NUM_WORKERS, pendentes))
+    logging.info(f"Distribuindo {pendentes} processo(s) entre {num_workers} worker(s).")
+
+    workers = [
+        threading.Thread(
+            target=_worker_paralelo,
+            args=(i, execucao_id, portal_page.url, funcao_de_atualizacao, trava_login, prazo),
+            name=f"rpa-worker-{i}",
+        )
+        for i in range(1, num_workers + 1)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _retirar_jobs_em_gravacao(processos) -> list:
+    with _trava_jobs_em_gravacao:
+        return [(numero, _jobs_em_gravacao.pop(numero)) for numero in processos if numero in _jobs_em_gravacao]
+
+
+def _apos_gravar_lote(resultado: dict):
+    """ Chamado pelo gravador depois do commit: só agora os jobs são concluídos. """
+    for numero, (execucao_id, dono) in _retirar_jobs_em_gravacao(resultado):
+        database.concluir_job_rpa(execucao_id, numero, dono)
+    metricas.rpa_processos.incrementar("sucesso", valor=len(resultado))
+    for alterados in resultado.values():
+        _registrar_churn(alterados)
+
+
+def _apos_falhar_lote(processos: list):
+    # A leitura não foi gravada: o job volta para a fila (ou falha de vez, se
+    # esgotou as tentativas), como qualquer outra falha do processo.
+    metricas.rpa_processos.incrementar("falha", valor=len(processos))
+    logging.error(f"‼️ Leituras não gravadas: {processos}")
+    for numero, (execucao_id, dono) in _retirar_jobs_em_gravacao(processos):
+        database.falhar_job_rpa(execucao_id, numero, dono, "Falha ao gravar a leitura.", config.RPA_JOB_MAX_TENTATIVAS)
+
+
+@contextlib.contextmanager
+def _sessao_do_portal(persistente: bool):
+    """
+    Fornece (context, portal_page) autenticados para o ciclo. No modo
+    persistente, o navegador e a sessão vêm do supervisor e continuam abertos
+    para o próximo ciclo; no modo a frio, o Chrome é aberto, autenticado e
+    fechado a cada ciclo, como antes.
+    """
+    if persistente:
+        logging.info("1. Verificando navegador e sessão do portal...")
+        yield supervisor.obter_sessao()
+        logging.info("✔️ Navegador mantido aberto para o próximo ciclo.")
+        return
 
+    browser = None
+    try:
+        with sync_playwright() as p:
+            browser = navegador.iniciar_e_conectar(p)
             context = browser.contexts[0]
-            
+            rede.preparar_contexto(context)
+
             logging.info("1. Realizando login no portal...")
             portal_page = portal_bb.fazer_login(context, config.EXTENSION_URL)
-            if not portal_page:
-                logging.error("Falha no login. Verifique as credenciais ou a página.")
-                return
             logging.info("✔️ Login realizado com sucesso.")
+            yield context, portal_page
+    finally:
+        if browser:
+            logging.info("3. Fechando navegador...")
+            navegador.fechar_navegador()
+
 
-            for tentativa in range(1, 3):
-                if not processos_para_tentar:
+def executar_rpa(lista_processos: list, funcao_de_atualizacao=None, prazo_segundos: float = None):
+    """
+    Executa o robô de RPA sobre uma fila persistente de jobs (tabela rpa_jobs):
+    cada processo tem até config.RPA_JOB_MAX_TENTATIVAS tentativas, e uma
+    execução interrompida (queda do navegador, do portal ou do próprio script)
+    é retomada de onde parou na chamada seguinte, ignorando 'lista_processos'.
+    Com config.RPA_NUM_WORKERS > 1, os jobs são distribuídos entre várias
+    abas do mesmo contexto autenticado. Sem 'funcao_de_atualizacao', as leituras
+    são gravadas em lote, em segundo plano, por um GravadorEmLote. Com
+    'prazo_segundos', nenhum processo novo é iniciado depois do prazo; os que
+    sobrarem continuam vencidos na agenda e entram no próximo ciclo. Com
+    config.RPA_NAVEGADOR_PERSISTENTE, o Chrome e a sessão do portal ficam
+    abertos entre as chamadas (RPA/supervisor.py).
+    """
+    prazo = time.monotonic() + prazo_segundos if prazo_segundos else None
+    logging.info("--- INICIANDO EXECUÇÃO DO RPA ---")
+    execucao_id, retomada = database.abrir_execucao_rpa(lista_processos)
+    resumo = database.resumo_execucao_rpa(execucao_id)
+    if retomada:
+        logging.warning(f"♻️ Retomando a execução {execucao_id}, interrompida antes de terminar: "
+                        f"{resumo['pendente'] + resumo['em_andamento']} processo(s) restantes.")
+    with _trava_churn:
+        _churn.update(processos=0, com_mudanca=0, subsidios_alterados=0)
+    global _medicao
+    _medicao = MedicaoDaExecucao()
+    inicio = datetime.datetime.now()
+    rede.zerar_estatisticas_rede()
+    gravador = None
+    if funcao_de_atualizacao is None:
+        gravador = GravadorEmLote(config.RPA_GRAVACAO_LOTE_TAMANHO, config.RPA_GRAVACAO_LOTE_INTERVALO,
+                                  apos_gravar=_apos_gravar_lote, apos_falhar=_apos_falhar_lote)
+        funcao_de_atualizacao = gravador
+    persistente = config.RPA_NAVEGADOR_PERSISTENTE and supervisor.disponivel()
+
+    try:
+        with _sessao_do_portal(persistente) as (context, portal_page):
+            logging.info(f"{'='*20} EXECUÇÃO {execucao_id} {'='*20}")
+            logging.info(f"Processando {resumo['pendente'] + resumo['em_andamento']} processo(s).")
+            if config.RPA_NUM_WORKERS > 1:
+                _processar_paralelo(portal_page, execucao_id, resumo['pendente'] + resumo['em_andamento'], funcao_de_atualizacao, prazo)
+            else:
+                portal_page = _processar_sequencial(portal_page, context, execucao_id, funcao_de_atualizacao, prazo)
+                if persistente:
+                    supervisor.atualizar_portal(portal_page)
+
+            # Os jobs só são concluídos depois do commit das leituras: grava a
+            # fila antes de decidir se a execução terminou.
+            if gravador:
+                gravador.fechar()
+            resumo = database.resumo_execucao_rpa(execucao_id)
+            if _prazo_esgotado(prazo):
+                logging.warning(f"⏱️ Prazo do ciclo esgotado. {resumo['pendente']} processo(s) ficam para o próximo ciclo.")
+                database.encerrar_execucao_rpa(execucao_id, 'encerrada_por_prazo')
+            elif resumo['pendente'] or resumo['em_andamento']:
+                # Workers que caíram deixaram jobs sem processar (ou arrendados): a
+                # execução segue aberta e é retomada no próximo ciclo.
+                logging.warning(f"{resumo['pendente'] + resumo['em_andamento']} processo(s) não concluídos por workers que caíram; "
+                                f"a execução {execucao_id} será retomada.")
+            else:
+                database.encerrar_execucao_rpa(execucao_id)
+                if not resumo['falhados']:
                     logging.info("Todos os processos foram concluídos com sucesso.")
-                    break
-
-                logging.info(f"{'='*20} TENTATIVA {tentativa} de 2 {'='*20}")
-                logging.info(f"Processando {len(processos_para_tentar)} processo(s).")
-                
-                processos_falhados_nesta_tentativa = []
-
-                for num_processo in processos_para_tentar:
-                    try:
-                        portal_page = portal_bb.verificar_e_renovar_sessao(portal_page, context, config.EXTENSION_URL)
-
-                        logging.info(f"--- Processando: {num_processo} ---")
-                        logging.info(f" 	a. Navegando para a página do processo...")
-                        processo.navegar_para_processo(portal_page, num_processo, config.URL_BUSCA_PROCESSO)
-                        
-                        logging.info(f" 	b. Acessando detalhes e subsídios...")
-                        processo.acessar_detalhes(portal_page, num_processo)
-                        processo.clicar_menu_subsidios(portal_page, num_processo)
-                        
-                        logging.info(f" 	c. Extraindo dados da tabela...")
-                        dados_subsidios_do_processo = processo.extrair_dados_subsidios(portal_page)
-                        
-                        if dados_subsidios_do_processo:
-                            logging.info(f" 	d. Encontrados {len(dados_subsidios_do_processo)} subsídios. Atualizando banco de dados...")
-                            funcao_de_atualizacao(num_processo, dados_subsidios_do_processo)
-                            logging.info(f" 	✔️ SUCESSO: Banco de dados atualizado para o processo {num_processo}.")
-                        else:
-                            logging.info(f" 	d. Nenhum subsídio encontrado para {num_processo}.")
-                            funcao_de_atualizacao(num_processo, []) 
-
-                    except Exception:
-                        logging.error(f"ERRO AO PROCESSAR {num_processo} NA TENTATIVA {tentativa}", exc_info=True)
-                        processos_falhados_nesta_tentativa.append(num_processo)
-                        continue
-                
-                processos_para_tentar = processos_falhados_nesta_tentativa
-                
-                if processos_para_tentar:
-                    logging.warning(f"--- Fim da Tentativa {tentativa}. {len(processos_para_tentar)} processos falharam e serão reprocessados. ---")
-                    time.sleep(10)
-
-            if processos_para_tentar:
-                logging.critical("‼️ ATENÇÃO: Os seguintes processos falharam após 2 tentativas:")
-                for num_proc in processos_para_tentar:
+
+            if resumo['falhados']:
+                logging.critical(f"‼️ ATENÇÃO: Os seguintes processos falharam após {config.RPA_JOB_MAX_TENTATIVAS} tentativas:")
+                for num_proc in resumo['falhados']:
                     logging.critical(f" 	- {num_proc}")
 
+            if _churn["processos"]:
+                logging.info(f"📊 Churn: {_churn['com_mudanca']} de {_churn['processos']} processo(s) com mudança, "
+                             f"{_churn['subsidios_alterados']} subsídio(s) alterado(s).")
+            rede.registrar_resumo()
             logging.info("✅ CONSULTA RPA FINALIZADA.")
 
     except Exception:
         logging.critical("========================= ERRO GERAL NO RPA =========================", exc_info=True)
     finally:
-        if browser:
-            logging.info("3. Fechando navegador...")
-            navegador.fechar_navegador()
+        # Nenhuma leitura entregue pode se perder, mesmo após erro geral.
+        if gravador:
+            gravador.fechar()
+        _registrar_relatorio(execucao_id, inicio)
         logging.info("--- EXECUÇÃO DO RPA FINALIZADA ---")
 
 
@@ -127,19 +425,17 @@ def main():
     """
     logging.info("Função main() do RPA iniciada. Buscando processos no banco...")
     try:
-        # 1. Buscar a lista de processos do banco de dados
-        # (Esta é a lista que o `executar_rpa` precisa)
-        lista_processos_para_monitorar = database.buscar_processos_em_monitoramento_geral()
+        # 1. Buscar o lote de processos com verificação vencida, por prioridade
+        lista_processos_para_monitorar = database.buscar_processos_para_verificar(config.RPA_CICLO_MAXIMO_PROCESSOS)
 
         if not lista_processos_para_monitorar:
-            logging.info("Nenhum processo em 'monitorando' encontrado no banco. Ciclo de RPA pulado.")
+            logging.info("Nenhum processo com verificação vencida. Ciclo de RPA pulado.")
             return # Não há o que fazer
 
         logging.info(f"Encontrados {len(lista_processos_para_monitorar)} processos para monitorar.")
         
-        # 2. Chamar a função principal do robô com a lista
-        # (Passando a lista que acabamos de buscar)
-        executar_rpa(lista_processos_para_monitorar)
+        # 2. Chamar a função principal do robô com o lote, dentro do prazo do ciclo
+        executar_rpa(lista_processos_para_monitorar, prazo_segundos=config.RPA_CICLO_MAXIMO_MINUTOS * 60)
 
     except Exception as e:
         logging.critical(f"Erro catastrófico na função main() antes de iniciar o executar_rpa: {e}", exc_info=True)
@@ -148,4 +444,6 @@ if __name__ == "__main__":
     # Agora, se você executar "python RPA/main.py" diretamente,
     # ele vai rodar a lógica completa, o que é ótimo para testes.
     logging.info("Script main.py executado diretamente. Iniciando o processo...")
-    main()
\ No newline at end of file
+    instalar_encerramento_por_sinal()
+    main()
+    supervisor.encerrar()
\ No newline at end of file
@@ -0,0 +1,109 @@
+# Em: RPA/medicao.py
+"""
+Medição por etapa de uma execução do RPA.
+
+Cada etapa de cada processo (verificação da sessão, navegação, detalhes, menu
+de subsídios, extração e gravação) vira uma amostra de duração. No fim da
+execução, relatorio() agrega as amostras em percentis (p50/p95/p99) por etapa,
+lista os processos mais lentos e conta as falhas por etapa; o relatório é
+gravado em rpa_relatorios e comparado pelo RPA/relatorio_rpa.py. Cada
+tentativa de um processo conta como uma medição.
+"""
+import contextlib
+import math
+import threading
+import time
+
+# Ordem de exibição das etapas nos relatórios.
+ETAPAS = ("sessao", "navegar", "detalhes", "subsidios", "extrair", "gravar")
+
+
+def percentil(ordenados: list, p: float):
+    """ Percentil por posição mais próxima (nearest-rank) de uma lista já ordenada. """
+    if not ordenados:
+        return None
+    posicao = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posicao - 1]
+
+
+class MedicaoDaExecucao:
+    def __init__(self, mais_lentos: int = 10):
+        self.mais_lentos = mais_lentos
+        self._amostras = {}
+        self._falhas = {}
+        self._processos = []
+        self._trava = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def etapa(self, nome: str):
+        """
+        Mede a etapa e, se ela levantar exceção, conta a falha nela. A duração
+        também é somada ao processo em andamento na thread (ver processo()).
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            with self._trava:
+                self._falhas[nome] = self._falhas.get(nome, 0) + 1
+            raise
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self._trava:
+                self._amostras.setdefault(nome, []).append(duracao)
+            etapas_do_processo = getattr(self._local, "etapas", None)
+            if etapas_do_processo is not None:
+                etapas_do_processo[nome] = etapas_do_processo.get(nome, 0.0) + duracao
+
+    @contextlib.contextmanager
+    def processo(self, numero_processo: str):
+        """ Mede o processo inteiro (todas as etapas, na thread atual). """
+        self._local.etapas = {}
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            yield
+            sucesso = True
+        finally:
+            registro = {
+                "numero_processo": numero_processo,
+                "segundos": round(time.perf_counter() - inicio, 3),
+                "sucesso": sucesso,
+                "etapas": {nome: round(segundos, 3) for nome, segundos in self._local.etapas.items()},
+            }
+            self._local.etapas = None
+            with self._trava:
+                self._processos.append(registro)
+
+    def relatorio(self) -> dict:
+        with self._trava:
+            amostras = {nome: sorted(valores) for nome, valores in self._amostras.items()}
+            falhas = dict(self._falhas)
+            processos = list(self._processos)
+
+        etapas = {}
+        for nome in sorted(amostras, key=lambda n: ETAPAS.index(n) if n in ETAPAS else len(ETAPAS)):
+            valores = amostras[nome]
+            etapas[nome] = {
+                "amostras": len(valores),
+                "media": round(sum(valores) / len(valores), 3),
+                "p50": round(percentil(valores, 50), 3),
+                "p95": round(percentil(valores, 95), 3),
+                "p99": round(percentil(valores, 99), 3),
+                "maximo": round(valores[-1], 3),
+                "falhas": falhas.get(nome, 0),
+            }
+        duracoes = sorted(p["segundos"] for p in processos)
+        return {
+            "processos": len(processos),
+            "falhas": sum(1 for p in processos if not p["sucesso"]),
+            "processo": {
+                "p50": percentil(duracoes, 50),
+                "p95": percentil(duracoes, 95),
+                "p99": percentil(duracoes, 99),
+            },
+            "etapas": etapas,
+            "falhas_por_etapa": {nome: total for nome, total in falhas.items() if total},
+            "mais_lentos": sorted(processos, key=lambda p: p["segundos"], reverse=True)[:self.mais_lentos],
+        }
@@ -0,0 +1,234 @@
+# Em: RPA/metricas.py
+"""
+Métricas no formato de texto do Prometheus, sem dependências externas.
+
+Cada processo mantém contadores e histogramas em memória (baratos: uma trava e
+uma busca binária por observação). O server.py expõe os seus em /metrics junto
+com os retratos que o scheduler e os workers publicam periodicamente no banco
+(tabela metricas_processos) e com os indicadores do RPA lidos do próprio banco
+(fila, vazão, idade da última varredura). Cada série leva o rótulo 'processo'
+de quem a mediu.
+
+Uso:
+    metricas.instalar(apexFluxoLegalOne)              # observa o banco e o Legal One
+    metricas.iniciar_publicacao("scheduler")          # nos processos sem /metrics
+    metricas.renderizar_metricas("servidor")          # no /metrics
+"""
+import bisect
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+
+from bd import database
+
+METRICAS_INTERVALO_PUBLICACAO = float(os.environ.get('METRICAS_INTERVALO_PUBLICACAO', '15'))
+# Retratos mais antigos que isto são de processos parados e ficam fora do /metrics.
+METRICAS_IDADE_MAXIMA_RETRATO = float(os.environ.get('METRICAS_IDADE_MAXIMA_RETRATO', '300'))
+# Janela usada para a vazão do RPA (processos concluídos por minuto).
+METRICAS_JANELA_VAZAO_MINUTOS = float(os.environ.get('METRICAS_JANELA_VAZAO_MINUTOS', '10'))
+
+BALDES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome: str, ajuda: str, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._trava = threading.Lock()
+        _registro.append(self)
+
+    def retrato(self) -> dict:
+        with self._trava:
+            series = [[dict(zip(self.rotulos, chave)), self._copiar(valor)] for chave, valor in self._series.items()]
+        return {"nome": self.nome, "tipo": self.tipo, "ajuda": self.ajuda, "series": series}
+
+    def _copiar(self, valor):
+        return valor
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, *rotulos, valor: float = 1):
+        with self._trava:
+            self._series[rotulos] = self._series.get(rotulos, 0) + valor
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos=(), baldes=BALDES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(baldes)
+
+    def observar(self, valor: float, *rotulos):
+        indice = bisect.bisect_left(self.baldes, valor)
+        with self._trava:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                # Contagem por balde (não acumulada) + soma + total.
+                serie = self._series[rotulos] = [0] * len(self.baldes) + [0.0, 0]
+            if indice < len(self.baldes):
+                serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def retrato(self) -> dict:
+        retrato = super().retrato()
+        retrato["baldes"] = list(self.baldes)
+        return retrato
+
+    def _copiar(self, valor):
+        return list(valor)
+
+
+_registro = []
+
+http_latencia = Histograma("onesid_http_requisicao_segundos", "Latência das requisições ao server.py por rota.", ("rota", "metodo", "status"))
+db_latencia = Histograma("onesid_db_funcao_segundos", "Duração das funções de bd.database marcadas com @_observada.", ("funcao",))
+db_erros = Contador("onesid_db_funcao_erros_total", "Funções de bd.database que terminaram com exceção.", ("funcao",))
+legal_one_latencia = Histograma("onesid_legal_one_requisicao_segundos", "Latência das respostas da API do Legal One.", ("endpoint",))
+legal_one_erros = Contador("onesid_legal_one_erros_total", "Erros da API do Legal One (status HTTP ou 'conexao').", ("endpoint", "tipo"))
+rpa_processos = Contador("onesid_rpa_processos_total", "Tentativas de processamento do RPA por resultado.", ("resultado",))
+
+
+def _observar_db(funcao: str, segundos: float, erro: bool):
+    db_latencia.observar(segundos, funcao)
+    if erro:
+        db_erros.incrementar(funcao)
+
+
+def _observar_legal_one(endpoint: str, segundos, status):
+    if status is None:
+        legal_one_erros.incrementar(endpoint, "conexao")
+        return
+    legal_one_latencia.observar(segundos, endpoint)
+    if status >= 400:
+        legal_one_erros.incrementar(endpoint, str(status))
+
+
+def instalar(legal_one=None):
+    """
+    Liga a observação das funções de bd.database e, se informado, do módulo
+    apexFluxoLegalOne (passado pelo chamador, que o importa pelo próprio caminho).
+    """
+    database.definir_observador(_observar_db)
+    if legal_one is not None:
+        legal_one.observador = _observar_legal_one
+
+
+def retrato() -> list:
+    return [metrica.retrato() for metrica in _registro]
+
+
+def _publicar(processo: str):
+    while True:
+        time.sleep(METRICAS_INTERVALO_PUBLICACAO)
+        try:
+            database.salvar_metricas_processo(processo, retrato())
+        except Exception:
+            logging.warning("Falha ao publicar as métricas no banco.", exc_info=True)
+
+
+def iniciar_publicacao(processo: str = None) -> str:
+    """
+    Publica o retrato das métricas deste processo no banco a cada
+    METRICAS_INTERVALO_PUBLICACAO segundos, para o /metrics do server.py.
+    """
+    processo = processo or f"{socket.gethostname()}-{os.getpid()}"
+    threading.Thread(target=_publicar, args=(processo,), name="metricas-publicacao", daemon=True).start()
+    return processo
+
+
+# --- RENDERIZAÇÃO NO FORMATO DE TEXTO ---
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _rotulos(rotulos: dict) -> str:
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos.items()) + "}"
+
+
+def _numero(valor) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _linhas_da_familia(familia: dict, rotulos_base: dict) -> list:
+    linhas = []
+    for rotulos, valor in familia["series"]:
+        rotulos = {**rotulos_base, **rotulos}
+        if familia["tipo"] != "histogram":
+            linhas.append(f"{familia['nome']}{_rotulos(rotulos)} {_numero(valor)}")
+            continue
+        acumulado = 0
+        for limite, contagem in zip(familia["baldes"], valor):
+            acumulado += contagem
+            linhas.append(f"{familia['nome']}_bucket{_rotulos({**rotulos, 'le': _numero(float(limite))})} {acumulado}")
+        linhas.append(f"{familia['nome']}_bucket{_rotulos({**rotulos, 'le': '+Inf'})} {valor[-1]}")
+        linhas.append(f"{familia['nome']}_sum{_rotulos(rotulos)} {_numero(float(valor[-2]))}")
+        linhas.append(f"{familia['nome']}_count{_rotulos(rotulos)} {valor[-1]}")
+    return linhas
+
+
+def _medidores_do_banco() -> list:
+    indicadores = database.metricas_rpa(METRICAS_JANELA_VAZAO_MINUTOS)
+    medidores = [
+        ("onesid_rpa_fila_monitorando", "Processos em monitoramento.", indicadores["monitorando"]),
+        ("onesid_rpa_fila_vencidos", "Processos com verificação vencida na agenda.", indicadores["vencidos"]),
+        ("onesid_rpa_jobs_pendentes", "Jobs ainda não concluídos da execução aberta.", indicadores["jobs_pendentes"]),
+        ("onesid_rpa_processos_por_minuto", f"Processos concluídos por minuto nos últimos {METRICAS_JANELA_VAZAO_MINUTOS:g} minutos.",
+         indicadores["processos_por_minuto"]),
+    ]
+    if indicadores["ultima_varredura"] is not None:
+        idade = (datetime.datetime.now() - indicadores["ultima_varredura"]).total_seconds()
+        medidores.append(("onesid_rpa_ultima_varredura_idade_segundos", "Segundos desde o fim da última varredura do RPA.", max(0.0, idade)))
+    return [{"nome": nome, "tipo": "gauge", "ajuda": ajuda, "series": [[{}, valor]]} for nome, ajuda, valor in medidores]
+
+
+def renderizar_metricas(processo: str) -> str:
+    """
+    Texto do /metrics: as métricas deste processo, os retratos recentes dos
+    demais e os indicadores do RPA lidos do banco.
+    """
+    fontes = [(processo, retrato())]
+    idades = []
+    try:
+        for outro, atualizado_em, conteudo in database.buscar_metricas_processos(METRICAS_IDADE_MAXIMA_RETRATO):
+            if outro != processo:
+                fontes.append((outro, conteudo))
+                idades.append((outro, time.time() - atualizado_em))
+    except Exception:
+        logging.warning("Falha ao ler as métricas publicadas pelos outros processos.", exc_info=True)
+
+    familias = {}
+    for origem, conteudo in fontes:
+        for familia in conteudo:
+            agrupada = familias.setdefault(familia["nome"], {"familia": familia, "linhas": []})
+            agrupada["linhas"] += _linhas_da_familia(familia, {"processo": origem})
+
+    extras = [{"nome": "onesid_metricas_retrato_idade_segundos", "tipo": "gauge", "ajuda": "Idade do retrato de métricas publicado por cada processo.",
+               "series": [[{"processo": outro}, idade] for outro, idade in idades]}]
+    try:
+        extras += _medidores_do_banco()
+    except Exception:
+        logging.warning("Falha ao calcular os indicadores do RPA para o /metrics.", exc_info=True)
+    for familia in extras:
+        familias[familia["nome"]] = {"familia": familia, "linhas": _linhas_da_familia(familia, {})}
+
+    saida = []
+    for nome, agrupada in familias.items():
+        saida.append(f"# HELP {nome} {_escapar(agrupada['familia']['ajuda'])}")
+        saida.append(f"# TYPE {nome} {agrupada['familia']['tipo']}")
+        saida += agrupada["linhas"]
+    return "\n".join(saida) + "\n"
@@ -1,4 +1,6 @@
+import os
 import time
+import socket
 import subprocess
 from playwright.sync_api import Playwright, Browser
 import config  # Importa as configurações
@@ -8,13 +10,93 @@ import sys     # <-- ADICIONADO (Necessário para a correção)
 # Variável para armazenar o processo do navegador
 browser_process = None
 
+# Modo 'playwright': contexto persistente lançado por este processo e o
+# endpoint CDP da porta livre escolhida para ele.
+contexto_proprio = None
+endpoint_proprio = None
+
+
+def endpoint_cdp() -> str:
+    """
+    Endpoint CDP do navegador deste worker: o fixo do config no modo 'cdp' ou o
+    da porta alocada no modo 'playwright' (None se ainda não foi lançado).
+    """
+    if config.RPA_MODO_NAVEGADOR == 'playwright':
+        return endpoint_proprio
+    return config.CDP_ENDPOINT
+
+
+def _porta_livre() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _lancar_com_playwright(p: Playwright) -> Browser:
+    """
+    Lança o Chromium pelo próprio Playwright, com a extensão carregada em um
+    contexto persistente (extensões exigem um perfil), em um diretório de perfil
+    e uma porta de depuração exclusivos deste worker. Depois se conecta a essa
+    porta via CDP, para que o restante do robô (e os workers paralelos) use o
+    navegador exatamente como no modo 'cdp'.
+    """
+    global contexto_proprio, endpoint_proprio
+    _fechar_contexto_proprio()
+
+    # O login no portal depende da extensão: sem ela, melhor parar já aqui do que
+    # falhar mais tarde, por timeout, na página da extensão.
+    if not os.path.isfile(os.path.join(config.RPA_EXTENSAO_DIR, "manifest.json")):
+        raise FileNotFoundError(
+            f"Extensão de login não encontrada em RPA_EXTENSAO_DIR='{config.RPA_EXTENSAO_DIR}'. "
+            "Descompacte a extensão (pasta com o manifest.json) e aponte RPA_EXTENSAO_DIR para ela "
+            "(no docker-compose, a pasta ./extensao do projeto)."
+        )
+
+    perfil = os.path.join(config.RPA_PERFIS_DIR, config.RPA_WORKER_ID)
+    os.makedirs(perfil, exist_ok=True)
+    porta = _porta_livre()
+    argumentos = [
+        f"--remote-debugging-port={porta}",
+        f"--disable-extensions-except={config.RPA_EXTENSAO_DIR}",
+        f"--load-extension={config.RPA_EXTENSAO_DIR}",
+    ]
+
+    print(f"▶️  Lançando o Chromium (headless={config.RPA_HEADLESS}) com o perfil {perfil} na porta {porta}...")
+    contexto_proprio = p.chromium.launch_persistent_context(
+        perfil,
+        headless=config.RPA_HEADLESS,
+        channel=config.RPA_CANAL_NAVEGADOR or None,
+        args=argumentos,
+    )
+    endpoint_proprio = f"http://127.0.0.1:{porta}"
+    browser = p.chromium.connect_over_cdp(endpoint_proprio)
+    print("✅ Conectado com sucesso ao navegador!")
+    return browser
+
+
+def _fechar_contexto_proprio():
+    global contexto_proprio, endpoint_proprio
+    if contexto_proprio is None:
+        return
+    try:
+        # Fecha o contexto persistente e, com ele, só o Chromium deste worker.
+        contexto_proprio.close()
+    except Exception as e:
+        print(f"     Aviso: Falha ao fechar o navegador deste worker: {e}")
+    contexto_proprio = endpoint_proprio = None
+
+
 def iniciar_e_conectar(p: Playwright) -> Browser:
     """
     Inicia o navegador executando o arquivo .bat e conecta-se a ele via Playwright.
-    Retorna o objeto 'browser' conectado.
+    Com RPA_MODO_NAVEGADOR=playwright, lança o Chromium diretamente (ver
+    _lancar_com_playwright). Retorna o objeto 'browser' conectado.
     """
     global browser_process
-    
+
+    if config.RPA_MODO_NAVEGADOR == 'playwright':
+        return _lancar_com_playwright(p)
+
     print(f"▶️  Executando o script: {config.BAT_FILE_PATH}")
     browser_process = subprocess.Popen(
         str(config.BAT_FILE_PATH), 
@@ -39,10 +121,16 @@ def iniciar_e_conectar(p: Playwright) -> Browser:
 def fechar_navegador():
     """
     Encerra o processo do navegador de forma limpa e automática,
-    matando o processo do Chrome pela porta de depuração.
+    matando o processo do Chrome pela porta de depuração. No modo
+    'playwright', fecha apenas o Chromium lançado por este worker.
     """
     print("\n🏁 Iniciando rotina de fechamento do navegador...")
 
+    if config.RPA_MODO_NAVEGADOR == 'playwright':
+        _fechar_contexto_proprio()
+        print("--- Rotina de fechamento concluída. Fim da execução do RPA. ---")
+        return
+
     # 1. Extrai a porta do endpoint de configuração
     port_match = re.search(r':(\d+)$', config.CDP_ENDPOINT)
     if not port_match:
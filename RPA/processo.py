@@ -1,7 +1,12 @@
 import re
 import logging
+import unicodedata
 from playwright.sync_api import Page, TimeoutError
 
+# Chaves (normalizadas) aceitas no JSON do Angular para as colunas 'Item' e 'Estado'.
+_CHAVES_ITEM = ("item", "nomeitem", "descricaoitem", "subsidio", "nomesubsidio", "descricaosubsidio")
+_CHAVES_ESTADO = ("estado", "nomeestado", "descricaoestado", "situacao", "descricaosituacao", "status")
+
 def _limpar_numero(numero_processo_bruto: str) -> str:
     """
     Função interna para remover todos os caracteres não numéricos 
@@ -22,10 +27,12 @@ def navegar_para_processo(page: Page, numero_processo: str, url_base: str):
     
     logging.info("Página de resultados do processo aberta.")
 
-def acessar_detalhes(page: Page, num_processo: str):
+def acessar_detalhes(page: Page, num_processo: str, aguardar_rede: bool = True):
     """
     Usa o número do processo para confirmar o carregamento da página e
     clica no botão 'Detalhar' da primeira correspondência encontrada.
+    Com aguardar_rede=False não espera o 'networkidle' (a próxima etapa já
+    aguarda o menu lateral aparecer).
     """
     iframe_selector = "#WIDGET_ID_1"
     
@@ -50,14 +57,15 @@ def acessar_detalhes(page: Page, num_processo: str):
         logging.info("4. Clicando em 'Detalhar'...")
         botao_detalhar.click()
 
-        page.wait_for_load_state("networkidle")
+        if aguardar_rede:
+            page.wait_for_load_state("networkidle")
         logging.info("✔️ SUCESSO! Página de detalhes carregada.")
 
     except Exception as e:
         logging.error(f"FALHA ao acessar detalhes do processo: {e}", exc_info=True)
         raise
 
-def clicar_menu_subsidios(page: Page, num_processo: str):
+def clicar_menu_subsidios(page: Page, num_processo: str, aguardar_rede: bool = True):
     """
     Acessa o iframe da página de detalhes e clica no menu 'Subsídios'.
     """
@@ -80,64 +88,189 @@ def clicar_menu_subsidios(page: Page, num_processo: str):
         logging.info("4. Clicando em 'Subsídios'...")
         menu_subsidios.click()
         
-        page.wait_for_load_state("networkidle")
+        if aguardar_rede:
+            page.wait_for_load_state("networkidle")
         logging.info("✔️ SUCESSO! Menu 'Subsídios' clicado.")
 
     except Exception as e:
         logging.error(f"FALHA ao tentar clicar em 'Subsídios' para o processo {num_processo}.", exc_info=True)
         raise
 
+# Lê cabeçalhos e células de todas as linhas em uma única chamada ao iframe,
+# em vez de um text_content() por célula. Só a tabela do cabeçalho escolhido é
+# lida: outra tabela ainda na tela não pode deslocar as colunas nem somar linhas.
+_SCRIPT_LEITURA_TABELA = """
+(thead) => {
+    const tabela = thead.closest('table');
+    const texto = (el) => el.textContent || '';
+    const linhas = tabela ? Array.from(tabela.tBodies).flatMap((tbody) => Array.from(tbody.rows)) : [];
+    return {
+        cabecalhos: Array.from(thead.querySelectorAll('th'), texto),
+        linhas: linhas.map((tr) => Array.from(tr.querySelectorAll('td'), texto)),
+    };
+}
+"""
+
+def _montar_dados_da_tabela(tabela: dict) -> list:
+    """
+    Resolve as posições das colunas 'Item' e 'Estado' a partir dos cabeçalhos
+    devolvidos pelo script e monta a lista de subsídios. Levanta ValueError se
+    as colunas não existirem (layout novo): isso não é uma tabela vazia.
+    """
+    headers = [h.strip().upper() for h in tabela["cabecalhos"]]
+    try:
+        item_index = headers.index('ITEM')
+        estado_index = headers.index('ESTADO')
+    except ValueError:
+        raise ValueError(f"Colunas 'Item' e 'Estado' não encontradas na tabela (cabeçalhos: {headers}).") from None
+
+    logging.info(f"   - Coluna 'Item' encontrada na posição {item_index}.")
+    logging.info(f"   - Coluna 'Estado' encontrada na posição {estado_index}.")
+
+    dados_extraidos = []
+    for celulas in tabela["linhas"]:
+        # Linhas de aviso (ex.: 'Nenhum registro', com colspan) não têm as colunas.
+        if len(celulas) <= max(item_index, estado_index):
+            continue
+        item = celulas[item_index].strip()
+        estado = celulas[estado_index].strip()
+        dados_extraidos.append({"item": item, "status": estado})
+        logging.info(f"   - Item: {item} | Status: {estado}")
+    return dados_extraidos
+
 def extrair_dados_subsidios(page: Page) -> list:
     """
     Na página de subsídios, localiza as colunas 'Item' e 'Estado' pelo nome
-    e extrai os dados de cada linha da tabela.
+    e extrai os dados de cada linha da tabela. Retorna [] só quando a tabela
+    está na tela e vazia; falhas na leitura são propagadas, para que não sejam
+    gravadas como uma leitura sem subsídios.
     """
     iframe_selector = "#WIDGET_ID_1"
-    dados_extraidos = []
     
     try:
         logging.info("--- Próxima etapa: Extrair dados da tabela de subsídios ---")
         frame = page.frame_locator(iframe_selector)
         
-        logging.info("1. Aguardando a tabela carregar e localizando colunas...")
-        
-        frame.locator("thead").wait_for(state="visible", timeout=15000)
-        
-        headers = [h.upper() for h in frame.locator("thead th").all_text_contents()]
-        
-        try:
-            item_index = headers.index('ITEM')
-            estado_index = headers.index('ESTADO')
-        except ValueError:
-            logging.error("ERRO: Não foi possível encontrar as colunas 'Item' e 'Estado' na tabela.")
-            return []
+        logging.info("1. Aguardando a tabela carregar...")
+        # Espera o cabeçalho da tabela de subsídios (com 'Item' e 'Estado'), e não
+        # qualquer tabela que ainda esteja na tela da etapa anterior.
+        thead = (frame.locator("thead")
+                 .filter(has_text=re.compile(r"\bitem\b", re.IGNORECASE))
+                 .filter(has_text=re.compile(r"\bestado\b", re.IGNORECASE))
+                 .first)
+        thead.wait_for(state="visible", timeout=15000)
 
-        logging.info(f"   - Coluna 'Item' encontrada na posição {item_index}.")
-        logging.info(f"   - Coluna 'Estado' encontrada na posição {estado_index}.")
+        logging.info("2. Tabela visualizada. Extraindo informações...")
+        tabela = thead.evaluate(_SCRIPT_LEITURA_TABELA)
 
-        # Verifica se existe alguma linha no corpo da tabela antes de prosseguir
-        if frame.locator("tbody > tr").count() == 0:
+        if not tabela["linhas"]:
             logging.info("Tabela de subsídios encontrada, mas está vazia.")
             return []
 
-        frame.locator("tbody > tr").first.wait_for(state="visible", timeout=15000)
-        
-        logging.info("2. Tabela com dados visualizada. Extraindo informações...")
-        linhas = frame.locator("tbody > tr").all()
-        
-        for linha in linhas:
-            celulas = linha.locator("td").all()
-            
-            item = celulas[item_index].text_content().strip()
-            estado = celulas[estado_index].text_content().strip()
-            
-            dados_extraidos.append({"item": item, "status": estado})
-            logging.info(f"   - Item: {item} | Status: {estado}")
-            
+        dados_extraidos = _montar_dados_da_tabela(tabela)
         logging.info(f"✔️ SUCESSO! {len(dados_extraidos)} registros extraídos.")
         return dados_extraidos
 
     except Exception as e:
-        logging.warning(f"FALHA ao extrair dados dos subsídios: {e}")
-        return []
+        logging.error(f"FALHA ao extrair dados dos subsídios: {e}")
+        raise
+
+
+def _normalizar_chave(chave: str) -> str:
+    """
+    Remove acentos e caracteres não alfanuméricos de uma chave do JSON
+    ('descricaoEstado', 'DESCRICAO_ESTADO' e 'descrição estado' viram a mesma coisa).
+    """
+    chave = ''.join(c for c in unicodedata.normalize('NFD', str(chave)) if unicodedata.category(c) != 'Mn')
+    return re.sub(r'[^a-z0-9]', '', chave.lower())
+
+def _valor_textual(valor):
+    """
+    Converte o valor de um campo em texto. O Angular às vezes entrega objetos
+    do tipo {"codigo": 1, "descricao": "Concluído"} no lugar da string.
+    """
+    if isinstance(valor, str):
+        return valor.strip()
+    if isinstance(valor, dict):
+        for chave, conteudo in valor.items():
+            if _normalizar_chave(chave) in ("descricao", "nome", "texto", "valor") and isinstance(conteudo, str):
+                return conteudo.strip()
+    return None
+
+def _par_item_estado(registro: dict):
+    """
+    Retorna o dicionário {'item', 'status'} de um registro do JSON, ou None
+    se o registro não tiver os dois campos reconhecíveis.
+    """
+    campos = {_normalizar_chave(chave): valor for chave, valor in registro.items()}
+    item = next((_valor_textual(campos[c]) for c in _CHAVES_ITEM if c in campos), None)
+    estado = next((_valor_textual(campos[c]) for c in _CHAVES_ESTADO if c in campos), None)
+    if item is None or estado is None:
+        return None
+    return {"item": item, "status": estado}
+
+def _extrair_pares_do_json(payload):
+    """
+    Procura no JSON a primeira lista de registros que tenham 'item' e 'estado'.
+    Retorna None se nenhuma lista tiver esse formato (payload mudou).
+    """
+    if isinstance(payload, list) and payload and all(isinstance(r, dict) for r in payload):
+        pares = [_par_item_estado(registro) for registro in payload]
+        if all(pares):
+            return pares
+    filhos = payload.values() if isinstance(payload, dict) else payload if isinstance(payload, list) else []
+    for filho in filhos:
+        if isinstance(filho, (dict, list)):
+            pares = _extrair_pares_do_json(filho)
+            if pares is not None:
+                return pares
+    return None
+
+def capturar_subsidios_xhr(page: Page, num_processo: str, padrao_url: str):
+    """
+    Clica no menu 'Subsídios' interceptando a resposta XHR que o Angular usa
+    para montar a tabela, e lê os pares item/estado direto do JSON.
+    Retorna None quando a resposta não chega ou o formato não é reconhecido;
+    nesse caso a tabela já está na tela e o chamador pode usar
+    extrair_dados_subsidios como alternativa. Falhas ao clicar no menu são
+    propagadas.
+    """
+    padrao = re.compile(padrao_url, re.IGNORECASE)
+
+    def _eh_resposta_de_subsidios(response) -> bool:
+        # Só respostas JSON: o padrão também casa com bundles, templates e
+        # imagens que o Angular carrega com 'subsidio' no caminho.
+        return (response.request.resource_type in ("xhr", "fetch")
+                and "json" in response.headers.get("content-type", "").lower()
+                and padrao.search(response.url) is not None)
+
+    clicou = False
+    try:
+        with page.expect_response(_eh_resposta_de_subsidios, timeout=15000) as resposta_info:
+            clicar_menu_subsidios(page, num_processo, aguardar_rede=False)
+            clicou = True
+        resposta = resposta_info.value
+        if not resposta.ok:
+            logging.warning(f"Resposta XHR de subsídios com status {resposta.status} ({resposta.url}).")
+            return None
+        payload = resposta.json()
+    except TimeoutError:
+        if not clicou:
+            # Timeout do próprio menu (iframe ausente, sessão caída, layout novo):
+            # é falha do processo, não ausência do XHR.
+            raise
+        logging.warning(f"Nenhuma resposta XHR correspondente a '{padrao_url}' foi capturada.")
+        return None
+    except ValueError:
+        logging.warning("A resposta XHR de subsídios não é um JSON válido.")
+        return None
+
+    dados_extraidos = _extrair_pares_do_json(payload)
+    if dados_extraidos is None:
+        logging.warning(f"Formato do JSON de subsídios não reconhecido ({resposta.url}).")
+        return None
 
+    for dado in dados_extraidos:
+        logging.info(f"   - Item: {dado['item']} | Status: {dado['status']}")
+    logging.info(f"✔️ SUCESSO! {len(dados_extraidos)} registros extraídos via XHR.")
+    return dados_extraidos
@@ -0,0 +1,128 @@
+# Em: RPA/rede.py
+"""
+Perfil leve de navegação e medição do tráfego do portal.
+
+Com config.RPA_PERFIL_LEVE, cada aba dos contextos usados na raspagem recebe,
+via CDP, a lista de URLs que o próprio Chromium deve bloquear
+(Network.setBlockedURLs): as extensões de arquivo dos tipos de recurso
+(imagens, fontes, mídia...) e os padrões de URL (analytics) que não influenciam
+a leitura dos subsídios. Diferente de context.route, isso não passa cada
+requisição pelo Python nem desliga o cache HTTP. Com config.RPA_MEDIR_REDE, as
+requisições concluídas e as bloqueadas são contabilizadas em
+estatisticas_rede, para comparar bytes e tempos com e sem o bloqueio.
+"""
+import logging
+import threading
+import weakref
+
+from RPA import config
+
+# Totais da execução atual (zerados por zerar_estatisticas_rede).
+estatisticas_rede = {"requisicoes": 0, "bytes": 0, "bloqueadas": 0}
+_bytes_por_tipo = {}
+_trava = threading.Lock()
+
+# Um monitor por objeto de contexto: o navegador persistente e as conexões de
+# cada worker paralelo têm contextos próprios, e nenhum pode ser preparado duas vezes.
+_contextos_preparados = weakref.WeakKeyDictionary()
+
+# O bloqueio do Chromium é por URL: cada tipo de recurso vira as suas extensões.
+_EXTENSOES_POR_TIPO = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav", "m4a"),
+}
+
+
+def padroes_de_bloqueio(tipos_bloqueados, padroes_bloqueados: str) -> list:
+    """ Padrões (curinga '*') do Network.setBlockedURLs; só URLs http(s). """
+    padroes = []
+    for tipo in tipos_bloqueados:
+        if tipo not in _EXTENSOES_POR_TIPO:
+            logging.warning(f"Tipo de recurso '{tipo}' não pode ser bloqueado por URL; ignorado.")
+            continue
+        padroes += [f"http*://*.{extensao}*" for extensao in _EXTENSOES_POR_TIPO[tipo]]
+    padroes += [p.strip() for p in padroes_bloqueados.split(",") if p.strip()]
+    return padroes
+
+
+class MonitorDeRede:
+    def __init__(self, bloquear: bool, tipos_bloqueados, padroes_bloqueados: str, medir: bool = True):
+        self.medir = medir
+        self.padroes = padroes_de_bloqueio(tipos_bloqueados, padroes_bloqueados) if bloquear else []
+        self._sessoes = []
+
+    def instalar(self, context):
+        if self.padroes:
+            for page in context.pages:
+                self._bloquear_na_aba(context, page)
+            context.on("page", lambda page: self._bloquear_na_aba(context, page))
+        if self.medir:
+            context.on("requestfinished", self._contabilizar)
+            context.on("requestfailed", self._contabilizar_falha)
+
+    def _bloquear_na_aba(self, context, page):
+        try:
+            sessao = context.new_cdp_session(page)
+            sessao.send("Network.enable")
+            sessao.send("Network.setBlockedURLs", {"urls": self.padroes})
+            # A lista de bloqueio vale enquanto a sessão CDP estiver aberta.
+            self._sessoes.append(sessao)
+            page.on("close", lambda _: self._sessoes.remove(sessao))
+        except Exception:
+            logging.warning("Não foi possível aplicar o perfil leve a uma aba.", exc_info=True)
+
+    def _contabilizar(self, request):
+        try:
+            tamanhos = request.sizes()
+        except Exception:
+            return
+        total = max(0, tamanhos.get("responseBodySize", 0)) + max(0, tamanhos.get("responseHeadersSize", 0))
+        with _trava:
+            estatisticas_rede["requisicoes"] += 1
+            estatisticas_rede["bytes"] += total
+            _bytes_por_tipo[request.resource_type] = _bytes_por_tipo.get(request.resource_type, 0) + total
+
+    def _contabilizar_falha(self, request):
+        if "ERR_BLOCKED_BY_CLIENT" in (request.failure or ""):
+            with _trava:
+                estatisticas_rede["bloqueadas"] += 1
+
+
+def preparar_contexto(context):
+    """
+    Instala o bloqueio (se config.RPA_PERFIL_LEVE) e a medição (se
+    config.RPA_MEDIR_REDE) no contexto.
+    Chamadas repetidas para o mesmo contexto não fazem nada.
+    """
+    if context in _contextos_preparados:
+        return _contextos_preparados[context]
+    monitor = MonitorDeRede(
+        config.RPA_PERFIL_LEVE,
+        config.RPA_BLOQUEAR_TIPOS,
+        config.RPA_BLOQUEAR_URLS,
+        medir=config.RPA_MEDIR_REDE,
+    )
+    monitor.instalar(context)
+    _contextos_preparados[context] = monitor
+    return monitor
+
+
+def zerar_estatisticas_rede():
+    with _trava:
+        estatisticas_rede.update(requisicoes=0, bytes=0, bloqueadas=0)
+        _bytes_por_tipo.clear()
+
+
+def resumo_rede() -> str:
+    with _trava:
+        por_tipo = sorted(_bytes_por_tipo.items(), key=lambda par: par[1], reverse=True)
+        detalhes = ", ".join(f"{tipo} {total / 1024:.0f} KiB" for tipo, total in por_tipo[:5])
+        return (f"{estatisticas_rede['bytes'] / (1024 * 1024):.1f} MiB em {estatisticas_rede['requisicoes']} requisição(ões), "
+                f"{estatisticas_rede['bloqueadas']} bloqueada(s)" + (f" ({detalhes})" if detalhes else ""))
+
+
+def registrar_resumo():
+    if estatisticas_rede["requisicoes"] or estatisticas_rede["bloqueadas"]:
+        perfil = "leve" if config.RPA_PERFIL_LEVE else "completo"
+        logging.info(f"🌐 Tráfego do portal (perfil {perfil}): {resumo_rede()}.")
@@ -0,0 +1,141 @@
+# Em: RPA/relatorio_rpa.py
+"""
+Relatórios de tempo por etapa das execuções do RPA (tabela rpa_relatorios).
+
+Uso:
+    python RPA/relatorio_rpa.py                       # lista os relatórios recentes
+    python RPA/relatorio_rpa.py mostrar [ID]          # detalha um relatório (padrão: o último)
+    python RPA/relatorio_rpa.py comparar [A] [B]      # compara A (antes) com B (depois); padrão: os dois últimos
+    python RPA/relatorio_rpa.py comparar A B --limite 20 --falhar-se-regredir
+"""
+import argparse
+import os
+import sys
+
+caminho_raiz_do_projeto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if caminho_raiz_do_projeto not in sys.path:
+    sys.path.append(caminho_raiz_do_projeto)
+
+from bd import database
+
+PERCENTIS = ("p50", "p95", "p99")
+
+
+def _variacao(antes, depois):
+    if not antes or depois is None:
+        return None
+    return (depois - antes) / antes * 100
+
+
+def _formatar_variacao(variacao, limite: float) -> str:
+    if variacao is None:
+        return f"{'-':>8}"
+    marca = " ⚠️" if variacao > limite else ""
+    return f"{variacao:>+7.0f}%{marca}"
+
+
+def _carregar(relatorio_id: int) -> dict:
+    relatorio = database.buscar_relatorio_rpa(relatorio_id)
+    if not relatorio:
+        raise SystemExit(f"Relatório {relatorio_id} não encontrado.")
+    return relatorio
+
+
+def listar(limite: int):
+    relatorios = database.listar_relatorios_rpa(limite)
+    if not relatorios:
+        print("Nenhum relatório gravado ainda.")
+        return
+    print(f"{'id':>5} {'execução':>9} {'início':<20} {'processos':>10} {'falhas':>7}")
+    for r in relatorios:
+        print(f"{r['id']:>5} {r['execucao_id']:>9} {str(r['inicio'])[:19]:<20} {r['processos']:>10} {r['falhas']:>7}")
+
+
+def mostrar(relatorio_id: int):
+    registro = _carregar(relatorio_id)
+    relatorio = registro["relatorio"]
+    print(f"Relatório {registro['id']} (execução {registro['execucao_id']}, {str(registro['inicio'])[:19]}): "
+          f"{relatorio['processos']} processo(s), {relatorio['falhas']} falha(s)")
+    print(f"\n{'etapa':<10} {'amostras':>9} {'média':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'máx.':>8} {'falhas':>7}")
+    for nome, etapa in relatorio["etapas"].items():
+        print(f"{nome:<10} {etapa['amostras']:>9} {etapa['media']:>8.2f} {etapa['p50']:>8.2f} {etapa['p95']:>8.2f} "
+              f"{etapa['p99']:>8.2f} {etapa['maximo']:>8.2f} {etapa['falhas']:>7}")
+    print("\nProcessos mais lentos:")
+    for lento in relatorio["mais_lentos"]:
+        situacao = "ok" if lento["sucesso"] else "FALHOU"
+        print(f"  {lento['numero_processo']:<25} {lento['segundos']:>7.1f}s {situacao:<7} {lento['etapas']}")
+    rede = relatorio.get("rede")
+    if rede and rede["requisicoes"]:
+        print(f"\nRede: {rede['bytes'] / (1024 * 1024):.1f} MiB em {rede['requisicoes']} requisição(ões), {rede['bloqueadas']} bloqueada(s)")
+
+
+def comparar(id_antes: int, id_depois: int, limite: float) -> bool:
+    """ Imprime a comparação e retorna se algum p95 piorou mais que 'limite' por cento. """
+    antes, depois = _carregar(id_antes)["relatorio"], _carregar(id_depois)["relatorio"]
+    print(f"Comparando o relatório {id_antes} (antes) com o {id_depois} (depois); ⚠️ = piora acima de {limite:g}%\n")
+    print(f"{'etapa':<10} " + " ".join(f"{p + ' antes':>10} {p + ' depois':>11} {'var.':>8}" for p in PERCENTIS) + f" {'falhas':>10}")
+
+    regrediu = False
+    linhas = [("processo", antes["processo"], depois["processo"])]
+    linhas += [(nome, antes["etapas"].get(nome), depois["etapas"].get(nome))
+               for nome in dict.fromkeys([*antes["etapas"], *depois["etapas"]])]
+    for nome, a, d in linhas:
+        a, d = a or {}, d or {}
+        colunas = []
+        for p in PERCENTIS:
+            variacao = _variacao(a.get(p), d.get(p))
+            if p == "p95" and variacao is not None and variacao > limite:
+                regrediu = True
+            valor_antes = f"{a[p]:.2f}" if a.get(p) is not None else "-"
+            valor_depois = f"{d[p]:.2f}" if d.get(p) is not None else "-"
+            colunas.append(f"{valor_antes:>10} {valor_depois:>11} {_formatar_variacao(variacao, limite)}")
+        falhas = f"{a.get('falhas', '-')} → {d.get('falhas', '-')}" if nome != "processo" else f"{antes['falhas']} → {depois['falhas']}"
+        print(f"{nome:<10} " + " ".join(colunas) + f" {falhas:>10}")
+
+    novas_falhas = {nome: total for nome, total in depois["falhas_por_etapa"].items() if total > antes["falhas_por_etapa"].get(nome, 0)}
+    if novas_falhas:
+        print(f"\nEtapas com mais falhas que antes: {novas_falhas}")
+    rede_antes, rede_depois = antes.get("rede"), depois.get("rede")
+    if rede_antes and rede_depois and rede_antes["requisicoes"] and rede_depois["requisicoes"]:
+        por_processo_antes = rede_antes["bytes"] / max(1, antes["processos"]) / 1024
+        por_processo_depois = rede_depois["bytes"] / max(1, depois["processos"]) / 1024
+        print(f"Rede por processo: {por_processo_antes:.0f} KiB → {por_processo_depois:.0f} KiB")
+    return regrediu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="comando")
+    parser_listar = subparsers.add_parser("listar", help="lista os relatórios recentes")
+    parser_listar.add_argument("--limite", type=int, default=20)
+    parser_mostrar = subparsers.add_parser("mostrar", help="detalha um relatório")
+    parser_mostrar.add_argument("id", type=int, nargs="?")
+    parser_comparar = subparsers.add_parser("comparar", help="compara dois relatórios")
+    parser_comparar.add_argument("ids", type=int, nargs="*", help="antes e depois (padrão: os dois últimos)")
+    parser_comparar.add_argument("--limite", type=float, default=20, help="piora percentual do p95 considerada regressão")
+    parser_comparar.add_argument("--falhar-se-regredir", action="store_true", help="sai com código 1 se houver regressão")
+    args = parser.parse_args()
+
+    if args.comando == "mostrar":
+        recentes = database.listar_relatorios_rpa(1)
+        if args.id is None and not recentes:
+            raise SystemExit("Nenhum relatório gravado ainda.")
+        mostrar(args.id if args.id is not None else recentes[0]["id"])
+    elif args.comando == "comparar":
+        if len(args.ids) == 2:
+            id_antes, id_depois = args.ids
+        elif not args.ids:
+            recentes = database.listar_relatorios_rpa(2)
+            if len(recentes) < 2:
+                raise SystemExit("São necessários ao menos dois relatórios para comparar.")
+            id_antes, id_depois = recentes[1]["id"], recentes[0]["id"]
+        else:
+            raise SystemExit("Informe dois ids (antes e depois) ou nenhum.")
+        if comparar(id_antes, id_depois, args.limite) and args.falhar_se_regredir:
+            raise SystemExit(1)
+    else:
+        listar(getattr(args, "limite", 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,8 @@ from bd import database
 from RPA import apexFluxoLegalOne
 from RPA import api_client
 from RPA import main as rpa_main
+from RPA import config
+from RPA import metricas
 
 # ==================================================================
 #           TAREFA 1: IMPORTAÇÃO E POSTAGEM NA API
@@ -36,7 +38,7 @@ def tarefa_automatizada_completa():
     # 1. Botão de Importar do Legal One
     print("[PASSO 1/3] Executando importação do Legal One...")
     try:
-        resultados_importacao = apexFluxoLegalOne.main()
+        resultados_importacao = apexFluxoLegalOne.importar_agendado()
         print(f"Importação do Legal One concluída. {len(resultados_importacao)} tarefas processadas.")
     except Exception as e:
         print(f"!!! Erro na importação do Legal One: {e} !!!")
@@ -74,31 +76,43 @@ def tarefa_automatizada_completa():
 
 # ==================================================================
 #           TAREFA 2: MONITORAMENTO RPA
-#           (Esta função não muda)
+#           (Agenda adaptativa: só os processos com verificação vencida)
 # ==================================================================
 def executar_tarefa_monitoramento():
     """
     Esta é a função que o agendador irá chamar.
-    Ela busca os processos que precisam ser monitorados e executa o robô para eles.
+    Ela busca o lote de processos com verificação vencida (novos e que mudaram
+    recentemente primeiro) e executa o robô para eles dentro do prazo do ciclo.
     """
     print(f"\n--- [{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}] INICIANDO TAREFA MONITORAMENTO (RPA) ---")
-    print("Buscando processos que necessitam de monitoramento...")
+    print("Buscando processos com verificação vencida...")
 
-    processos_para_rodar = database.buscar_processos_em_monitoramento_geral()
+    processos_para_rodar = database.buscar_processos_para_verificar(config.RPA_CICLO_MAXIMO_PROCESSOS)
 
     if not processos_para_rodar:
-        print("Nenhum processo na fila de monitoramento no momento.")
+        print("Nenhum processo com verificação vencida no momento.")
         return
 
     print(f"Encontrados {len(processos_para_rodar)} processo(s). Iniciando o RPA...")
     try:
-        # Chama a função principal do robô com a lista de processos
-        rpa_main.executar_rpa(processos_para_rodar)
+        # Chama a função principal do robô com o lote, limitado ao prazo do ciclo
+        rpa_main.executar_rpa(processos_para_rodar, prazo_segundos=config.RPA_CICLO_MAXIMO_MINUTOS * 60)
         print("--- Tarefa de monitoramento agendada concluída com sucesso! ---")
     except Exception as e:
         print(f"!!! Ocorreu um erro durante a execução agendada do RPA: {e} !!!")
 
 
+def _pausa_ate_proximo_ciclo() -> float:
+    try:
+        espera = database.segundos_ate_proxima_verificacao()
+    except Exception as e:
+        print(f"!!! Erro ao consultar a agenda do RPA: {e} !!!")
+        espera = None
+    if espera is None:
+        return config.RPA_PAUSA_MAXIMA_SEGUNDOS
+    return min(max(espera, config.RPA_PAUSA_MINIMA_SEGUNDOS), config.RPA_PAUSA_MAXIMA_SEGUNDOS)
+
+
 # ==================================================================
 #           NOVO: FUNÇÃO DE LOOP PARA A THREAD DO RPA
 # ==================================================================
@@ -115,9 +129,10 @@ def loop_monitoramento_rpa():
             # Captura qualquer erro que a função 'executar_tarefa_monitoramento' não capturou
             print(f"!!! [{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}] Erro crítico no loop de monitoramento RPA: {e} !!!")
         
-        # 2. Pausa de 10 minutos
-        print(f"\n--- [{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}] TAREFA RPA: Execução concluída. Aguardando 10 minutos antes da próxima... ---")
-        time.sleep(60 * 10) # 60 segundos * 10 minutos
+        # 2. Pausa até a próxima verificação vencer (dentro dos limites do config)
+        pausa = _pausa_ate_proximo_ciclo()
+        print(f"\n--- [{datetime.now().strftime('%d/%m/%Y %H:%M:%S')}] TAREFA RPA: Execução concluída. Aguardando {pausa / 60:.1f} minutos antes da próxima... ---")
+        time.sleep(pausa)
 
 # ==================================================================
 #           REGISTRO DE TAREFAS
@@ -132,9 +147,22 @@ schedule.every(30).minutes.do(tarefa_automatizada_completa)
 
 
 if __name__ == "__main__":
+    # docker stop envia SIGTERM: grava as leituras na fila antes de sair.
+    rpa_main.instalar_encerramento_por_sinal()
+    # O /metrics do server.py lê as métricas deste processo pelo banco.
+    metricas.instalar(apexFluxoLegalOne)
+    metricas.iniciar_publicacao(f"scheduler-{config.RPA_WORKER_ID}")
+
+    if config.RPA_AGENDADOR_SOMENTE_RPA:
+        # Worker de raspagem (ex.: serviço rpa-worker do docker-compose): vários
+        # podem rodar lado a lado, dividindo a fila de jobs pelo banco, enquanto
+        # a importação do Legal One fica com um único agendador.
+        print(f"✅✅ AGENDADOR SOMENTE RPA INICIADO (worker {config.RPA_WORKER_ID}) ✅✅")
+        loop_monitoramento_rpa()
+
     print("✅✅ AGENDADOR UNIFICADO (COM THREADS) INICIADO ✅✅")
     print(f"-> Tarefa 1 (API Legal One) rodará a cada 30 MINUTOS (entre 8h e 20h).")
-    print(f"-> Tarefa 2 (Monitoramento RPA) rodará em loop contínuo (executa, espera 10 MINUTOS, executa de novo).")
+    print(f"-> Tarefa 2 (Monitoramento RPA) rodará em loop contínuo, verificando só os processos com verificação vencida.")
     print("Pressione Ctrl+C para encerrar.")
     
     # 1. Criar a thread para o loop do RPA
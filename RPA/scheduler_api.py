@@ -34,7 +34,7 @@ def tarefa_automatizada_completa():
     # 1. Botão de Importar do Legal One
     print("\n[PASSO 1/3] Executando importação do Legal One...")
     try:
-        resultados_importacao = apexFluxoLegalOne.main()
+        resultados_importacao = apexFluxoLegalOne.importar_agendado()
         print(f"Importação do Legal One concluída. {len(resultados_importacao)} tarefas processadas.")
     except Exception as e:
         print(f"!!! Erro na importação do Legal One: {e} !!!")
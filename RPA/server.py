@@ -1,15 +1,20 @@
 # Substitua todo o conteúdo de RPA/server.py por este código:
 
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, g
 from flask_cors import CORS
 from werkzeug.security import check_password_hash
 import sys
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import timedelta
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import bd.database as database
 import apexFluxoLegalOne 
+import metricas
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'default-secret-key-for-dev')
@@ -19,6 +24,72 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 CORS(app, supports_credentials=True, resources={r"/*": {"origins": ["http://localhost:3000", "http://localhost:3001", "http://192.168.0.66:3000", "http://192.168.0.66:3001"]}})
 #database.inicializar_banco()
 
+# --- MÉTRICAS (/metrics) ---
+# Latência por rota medida aqui; funções do banco e chamadas ao Legal One pelos
+# observadores instalados; o scheduler publica as suas pelo banco.
+metricas.instalar(apexFluxoLegalOne)
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+
+@app.before_request
+def _iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
+
+@app.after_request
+def _registrar_latencia(resposta):
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is not None:
+        # A regra da rota (ex.: /api/delete-process/<int:process_id>) mantém a cardinalidade baixa.
+        rota = request.url_rule.rule if request.url_rule else 'sem_rota'
+        metricas.http_latencia.observar(time.perf_counter() - inicio, rota, request.method, str(resposta.status_code))
+    return resposta
+
+@app.route('/metrics')
+def exibir_metricas():
+    if METRICAS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICAS_TOKEN}":
+        return jsonify({"message": "Acesso não autorizado"}), 401
+    return app.response_class(metricas.renderizar_metricas("servidor"), mimetype='text/plain; version=0.0.4')
+
+# --- CACHE DE RESPOSTAS (painel e histórico) ---
+# As respostas serializadas ficam em memória, associadas à versão dos dados
+# (database.obter_versao_dados) em que foram geradas. Enquanto nenhuma escrita
+# incrementar a versão, a resposta é reaproveitada e o ETag permanece o mesmo,
+# então o navegador recebe 304 sem corpo ao revalidar.
+CACHE_RESPOSTAS_MAXIMO = 256
+_cache_respostas = OrderedDict()
+_trava_cache_respostas = threading.Lock()
+
+def _resposta_com_cache(gerar_dados):
+    """
+    Responde à requisição atual com o JSON de gerar_dados(), usando o cache por
+    (rota, usuário, query string) e honrando If-None-Match.
+    """
+    versao = database.obter_versao_dados()
+    chave = (request.path, session['user_id'], request.query_string)
+    etag = hashlib.sha1(f"{versao}:{chave}".encode()).hexdigest()
+
+    if request.if_none_match.contains(etag):
+        resposta = app.response_class(status=304)
+    else:
+        with _trava_cache_respostas:
+            em_cache = _cache_respostas.get(chave)
+            if em_cache and em_cache[0] == versao:
+                _cache_respostas.move_to_end(chave)
+        if em_cache and em_cache[0] == versao:
+            corpo = em_cache[1]
+        else:
+            corpo = app.json.response(gerar_dados()).get_data()
+            with _trava_cache_respostas:
+                _cache_respostas[chave] = (versao, corpo)
+                _cache_respostas.move_to_end(chave)
+                while len(_cache_respostas) > CACHE_RESPOSTAS_MAXIMO:
+                    _cache_respostas.popitem(last=False)
+        resposta = app.response_class(corpo, mimetype='application/json')
+
+    resposta.set_etag(etag)
+    # 'no-cache' faz o navegador revalidar sempre (com If-None-Match) em vez de usar cópia vencida.
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -57,32 +128,49 @@ def import_from_legal_one():
         return jsonify({"message": "Acesso não autorizado"}), 401
     user_id = session['user_id']
     try:
-        tarefas_importadas = apexFluxoLegalOne.main()
+        contagem = {"adicionados": 0, "ignorados": 0}
+
+        # Grava antes de avançar as marcas dos filtros (ver apexFluxoLegalOne.main).
+        tarefas_importadas = apexFluxoLegalOne.main(persistir=apexFluxoLegalOne.gravar_para_usuario(user_id, contagem))
         if not tarefas_importadas:
             return jsonify({"message": "Nenhuma tarefa nova encontrada no Legal One."}), 200
-        processos_adicionados = 0
-        processos_ignorados = 0
-        for tarefa in tarefas_importadas:
-            numero_cnj = tarefa.get('processo_cnj')
-            nome_responsavel = tarefa.get('finalizado_por_nome')
-            tarefa_id = tarefa.get('tarefa_id')
-            # --- MUDANÇA AQUI ---
-            # Pegamos também o ID do responsável
-            id_responsavel = tarefa.get('finalizado_por_id')
-            
-            if numero_cnj and tarefa_id:
-                # E passamos para a função do banco
-                resultado = database.adicionar_processo_unitario(user_id, numero_cnj, nome_responsavel, tarefa_id=tarefa_id, id_responsavel=id_responsavel)
-                if resultado is not None:
-                    processos_adicionados += 1
-                else:
-                    processos_ignorados += 1
-        
+        processos_adicionados, processos_ignorados = contagem["adicionados"], contagem["ignorados"]
+
         mensagem = f"Importação finalizada! {processos_adicionados} novos processos adicionados. {processos_ignorados} já existentes foram ignorados."
         return jsonify({"message": mensagem}), 201
     except Exception as e:
         return jsonify({"message": f"Ocorreu um erro durante a importação: {e}"}), 500
 
+def _ler_processos_colados(texto: str, executante: str) -> list:
+    """
+    Converte o texto colado do Excel em processos: um por linha, com o número
+    na primeira coluna e, se houver, o executante na segunda (colunas separadas
+    por tabulação). Linhas sem dígitos (ex.: cabeçalho) são descartadas.
+    """
+    processos = []
+    for linha in texto.splitlines():
+        colunas = [coluna.strip() for coluna in linha.split('\t')]
+        if not colunas[0] or not any(c.isdigit() for c in colunas[0]):
+            continue
+        executante_linha = colunas[1] if len(colunas) > 1 and colunas[1] else executante
+        processos.append({"numero_processo": colunas[0], "executante": executante_linha})
+    return processos
+
+@app.route('/api/add-processes-batch', methods=['POST'])
+def add_processes_batch():
+    if 'user_id' not in session:
+        return jsonify({"message": "Acesso não autorizado"}), 401
+    data = request.get_json() or {}
+    processos = _ler_processos_colados(data.get('processos', ''), data.get('executante', ''))
+    if not processos:
+        return jsonify({"message": "Nenhum número de processo encontrado no texto informado."}), 400
+    try:
+        adicionados, ignorados = database.adicionar_processos_em_lote(session['user_id'], processos)
+        mensagem = f"{adicionados} processos colocados na esteira de monitoramento. {ignorados} já existentes ou inválidos foram ignorados."
+        return jsonify({"message": mensagem, "adicionados": adicionados, "ignorados": ignorados}), 201
+    except Exception as e:
+        return jsonify({"message": f"Erro interno do servidor: {e}"}), 500
+
 # --- NOVA ROTA DE EXPORTAÇÃO ---
 @app.route('/api/exportar-json', methods=['GET'])
 def exportar_json():
@@ -117,19 +205,36 @@ def profile():
         return jsonify({"logged_in": True, "user_id": session['user_id'], "username": session['username'], "role": session.get('role', 'user')})
     return jsonify({"logged_in": False}), 401
     
+# Parâmetros que ativam o painel paginado; sem nenhum deles, /api/painel devolve a lista completa.
+PARAMETROS_PAINEL_PAGINADO = ('limite', 'cursor', 'status', 'responsavel', 'numero', 'ordenar_por', 'direcao')
+
 @app.route('/api/painel')
 def get_painel():
     if 'user_id' not in session:
         return jsonify({"message": "Acesso não autorizado"}), 401
     user_id = session['user_id']
-    return jsonify(database.buscar_painel_usuario(user_id))
+    if not any(parametro in request.args for parametro in PARAMETROS_PAINEL_PAGINADO):
+        return _resposta_com_cache(lambda: database.buscar_painel_usuario(user_id))
+    try:
+        return _resposta_com_cache(lambda: database.buscar_painel_paginado(
+            user_id,
+            limite=request.args.get('limite', 50, type=int),
+            cursor_paginacao=request.args.get('cursor') or None,
+            status=request.args.get('status') or None,
+            responsavel=request.args.get('responsavel') or None,
+            numero=request.args.get('numero') or None,
+            ordenar_por=request.args.get('ordenar_por', 'data_ultima_atualizacao'),
+            direcao=request.args.get('direcao', 'desc'),
+        ))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
 @app.route('/api/historico')
 def get_historico():
     if 'user_id' not in session:
         return jsonify({"message": "Acesso não autorizado"}), 401
     user_id = session['user_id']
-    return jsonify(database.buscar_historico_usuario(user_id))
+    return _resposta_com_cache(lambda: database.buscar_historico_usuario(user_id))
 
 @app.route('/api/marcar-ciencia', methods=['POST'])
 def marcar_ciencia():
@@ -0,0 +1,120 @@
+# Em: RPA/sessao.py
+"""
+Verificação amortizada da sessão do portal.
+
+portal_bb.verificar_e_renovar_sessao espera até 5 s pelo link 'Página inicial'
+e, chamada antes de cada processo, custava esse tempo mesmo com a sessão
+válida. O GuardaDeSessao acompanha a aba e só verifica a sessão quando vence
+config.RPA_SESSAO_INTERVALO_VERIFICACAO ou quando aparece um sinal de queda:
+navegação da aba para a tela de login ou resposta 401/403 do portal. Se um
+processo falhar com a sessão caída (sinal, aba na tela de login ou sem o
+iframe de detalhes), recuperar_apos_falha refaz o login para que o processo
+seja repetido.
+"""
+import contextlib
+import logging
+import re
+import time
+from urllib.parse import urlparse
+
+from RPA import portal_bb, config
+
+IFRAME_DETALHES = "#WIDGET_ID_1"
+
+
+class GuardaDeSessao:
+    def __init__(self, page, context, intervalo: float, trava_login=None, verificada: bool = True):
+        """
+        'verificada' indica que a aba acabou de passar pelo login ou por uma
+        verificação; do contrário, a primeira chamada a garantir() verifica.
+        'trava_login' serializa os re-logins entre workers (a extensão só
+        suporta um fluxo por vez).
+        """
+        self.context = context
+        self.intervalo = intervalo
+        self.trava_login = trava_login
+        self.padrao_login = re.compile(config.RPA_SESSAO_PADRAO_LOGIN, re.IGNORECASE)
+        self.dominio_portal = urlparse(config.URL_BUSCA_PROCESSO).netloc
+        self.verificacoes = 0
+        self.relogins = 0
+        self.page = None
+        self._sinal = None
+        self._verificada_em = time.monotonic() if verificada else None
+        self._observar(page)
+
+    def garantir(self):
+        """
+        Verifica a sessão só se houver sinal de queda ou se o intervalo venceu.
+        Retorna a aba em uso (pode ter mudado por re-login).
+        """
+        if self._sinal:
+            self._renovar(forcar=True)
+        elif self._verificada_em is None or time.monotonic() - self._verificada_em >= self.intervalo:
+            self._renovar(forcar=False)
+        return self.page
+
+    def recuperar_apos_falha(self) -> bool:
+        """
+        Chamada quando um processo falha. Se a falha tiver cara de sessão caída,
+        refaz o login e retorna True (o processo deve ser repetido em self.page);
+        retorna False se a sessão continua válida e a falha é do próprio processo.
+        """
+        motivo = self._motivo_da_queda()
+        if motivo is None:
+            return False
+        logging.warning(f"🔒 Possível queda da sessão durante o processo ({motivo}).")
+        return self._renovar(forcar=self._sinal is not None)
+
+    def resumo(self) -> str:
+        return f"{self.verificacoes} verificação(ões) da sessão, {self.relogins} re-login(s)"
+
+    def _observar(self, page):
+        self.page = page
+        page.on("framenavigated", self._ao_navegar)
+        page.on("response", self._ao_responder)
+
+    def _ao_navegar(self, frame):
+        if frame.parent_frame is None and self.padrao_login.search(frame.url):
+            self._sinal = f"redirecionada para {frame.url}"
+
+    def _ao_responder(self, response):
+        if response.status in (401, 403) and self.dominio_portal in response.url:
+            self._sinal = f"HTTP {response.status} em {response.url}"
+
+    def _motivo_da_queda(self):
+        if self._sinal:
+            return self._sinal
+        try:
+            if self.page.is_closed():
+                return "aba fechada"
+            if self.padrao_login.search(self.page.url):
+                return f"aba em {self.page.url}"
+            if self.page.locator(IFRAME_DETALHES).count() == 0:
+                return "iframe de detalhes ausente"
+        except Exception:
+            return "aba inacessível"
+        return None
+
+    def _renovar(self, forcar: bool) -> bool:
+        """
+        Com 'forcar', refaz o login direto (o sinal já confirmou a queda); senão,
+        usa a verificação do portal_bb, que só refaz o login se o link 'Página
+        inicial' não aparecer. Retorna se a aba foi trocada por um novo login.
+        """
+        anterior = self.page
+        with self.trava_login or contextlib.nullcontext():
+            if forcar:
+                logging.warning(f"⚠️ Sessão expirada ({self._sinal}). Refazendo o login...")
+                if not anterior.is_closed():
+                    anterior.close()
+                nova_page = portal_bb.fazer_login(self.context, config.EXTENSION_URL)
+            else:
+                nova_page = portal_bb.verificar_e_renovar_sessao(anterior, self.context, config.EXTENSION_URL)
+        self.verificacoes += 1
+        self._sinal = None
+        self._verificada_em = time.monotonic()
+        if nova_page is anterior:
+            return False
+        self.relogins += 1
+        self._observar(nova_page)
+        return True
@@ -0,0 +1,133 @@
+# Em: RPA/supervisor.py
+"""
+Navegador "quente" entre os ciclos do RPA.
+
+Sem o supervisor, cada ciclo abre o Chrome pelo .bat, espera o CDP responder,
+faz o login completo pela extensão e, no fim, mata o navegador. O
+SupervisorNavegador mantém o Chrome, a conexão do Playwright e a aba
+autenticada do portal vivos entre os ciclos: a cada ciclo faz só uma
+verificação barata (conexão CDP e link 'Página inicial') e relança o navegador
+ou refaz o login apenas quando ela falha.
+"""
+import atexit
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+from playwright.sync_api import sync_playwright
+
+from RPA import navegador, portal_bb, rede, config
+
+
+class SupervisorNavegador:
+    def __init__(self, reciclar_apos_horas: float = 12):
+        """
+        'reciclar_apos_horas' reinicia o Chrome depois desse tempo de uso, para
+        não acumular memória indefinidamente (0 desativa).
+        """
+        self.reciclar_apos = reciclar_apos_horas * 3600
+        self.browser = None
+        self.context = None
+        self.portal_page = None
+        self.lancamentos = 0
+        self.reconexoes = 0
+        self._playwright = None
+        self._thread = None
+        self._iniciado_em = None
+
+    def disponivel(self) -> bool:
+        """
+        O Playwright síncrono fica preso à thread que o iniciou: só essa thread
+        pode reaproveitar o navegador. As demais usam o fluxo a frio.
+        """
+        return self._thread is None or self._thread is threading.current_thread()
+
+    def obter_sessao(self):
+        """
+        Retorna (context, portal_page) prontos para uso, reaproveitando o que
+        estiver saudável. Se a verificação falhar de um jeito que o re-login não
+        resolve, descarta o navegador e recomeça do zero uma vez.
+        """
+        if not self.disponivel():
+            raise RuntimeError("O navegador persistente pertence a outra thread.")
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+            self._thread = threading.current_thread()
+            atexit.register(self.encerrar)
+        try:
+            return self._garantir_sessao()
+        except Exception:
+            logging.warning("⚠️ Navegador persistente em estado inválido. Reiniciando do zero...", exc_info=True)
+            self._descartar_navegador()
+            return self._garantir_sessao()
+
+    def atualizar_portal(self, portal_page):
+        """ Registra a aba do portal após um re-login feito durante o ciclo. """
+        self.portal_page = portal_page
+
+    def encerrar(self):
+        """ Fecha o navegador e o Playwright. Pode ser chamado mais de uma vez. """
+        atexit.unregister(self.encerrar)
+        self._descartar_navegador()
+        if self._playwright is not None and self._thread is threading.current_thread():
+            try:
+                self._playwright.stop()
+            except Exception:
+                logging.warning("Falha ao encerrar o Playwright.", exc_info=True)
+        self._playwright = None
+        self._thread = None
+
+    def _garantir_sessao(self):
+        if self.browser is not None and self.reciclar_apos and time.monotonic() - self._iniciado_em > self.reciclar_apos:
+            logging.info(f"♻️ Navegador em uso há mais de {self.reciclar_apos / 3600:g}h. Reciclando...")
+            self._descartar_navegador()
+
+        if self.browser is None or not self.browser.is_connected():
+            self._conectar()
+
+        if self.portal_page is None or self.portal_page.is_closed():
+            logging.info("🔑 Realizando login no portal...")
+            self.portal_page = portal_bb.fazer_login(self.context, config.EXTENSION_URL)
+        else:
+            self.portal_page = portal_bb.verificar_e_renovar_sessao(self.portal_page, self.context, config.EXTENSION_URL)
+        return self.context, self.portal_page
+
+    def _conectar(self):
+        """
+        Reconecta ao Chrome que ainda responde na porta do CDP (e à aba do portal
+        já aberta nele); só executa o .bat se não houver navegador ouvindo.
+        """
+        self.browser = self.context = self.portal_page = None
+        try:
+            endpoint = navegador.endpoint_cdp()
+            if not endpoint:
+                raise ConnectionError("Navegador deste worker ainda não foi lançado.")
+            self.browser = self._playwright.chromium.connect_over_cdp(endpoint, timeout=5000)
+            self.reconexoes += 1
+            logging.info("🔌 Reconectado ao navegador já aberto.")
+            if self._iniciado_em is None:
+                self._iniciado_em = time.monotonic()
+        except Exception:
+            self.browser = navegador.iniciar_e_conectar(self._playwright)
+            self.lancamentos += 1
+            self._iniciado_em = time.monotonic()
+        self.context = self.browser.contexts[0]
+        rede.preparar_contexto(self.context)
+
+        dominio_portal = urlparse(config.URL_BUSCA_PROCESSO).netloc
+        self.portal_page = next((pagina for pagina in self.context.pages if dominio_portal in pagina.url), None)
+
+    def _descartar_navegador(self):
+        if self.browser is None:
+            return
+        try:
+            self.browser.close()
+        except Exception:
+            pass
+        navegador.fechar_navegador()
+        self.browser = self.context = self.portal_page = None
+        self._iniciado_em = None
+
+
+supervisor = SupervisorNavegador(config.RPA_NAVEGADOR_RECICLAR_HORAS)
@@ -1,15 +1,168 @@
 # Substitua todo o conteúdo de bd/database.py por este código CORRETO e COMPLETO:
 
+import sys
 import sqlite3
 import datetime
+import time
+import random
 import re
 import hashlib
+import json
+import base64
+import queue
+import threading
+import functools
+from contextlib import contextmanager
 from werkzeug.security import generate_password_hash, check_password_hash
 import unicodedata
 import os
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-DB_NAME = os.path.join(PROJECT_ROOT, 'rpa_dados.db')
+# DB_NAME permite apontar todos os processos (inclusive contêineres diferentes)
+# para o mesmo arquivo: no modo WAL, os arquivos -wal/-shm ficam ao lado dele.
+DB_NAME = os.environ.get('DB_NAME') or os.path.join(PROJECT_ROOT, 'rpa_dados.db')
+
+# --- CONFIGURAÇÃO DO POOL DE CONEXÕES ---
+DB_POOL_TAMANHO = int(os.environ.get('DB_POOL_TAMANHO', '8'))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_KB = int(os.environ.get('DB_CACHE_KB', '20000'))
+
+# --- AGENDA ADAPTATIVA DO RPA ---
+# Processo que mudou (ou acabou de entrar) volta a ser verificado após o intervalo
+# mínimo; a cada leitura sem mudança o intervalo é multiplicado pelo fator, até o máximo.
+RPA_INTERVALO_MINIMO_MINUTOS = float(os.environ.get('RPA_INTERVALO_MINIMO_MINUTOS', '10'))
+RPA_INTERVALO_MAXIMO_MINUTOS = float(os.environ.get('RPA_INTERVALO_MAXIMO_MINUTOS', '1440'))
+RPA_FATOR_BACKOFF = float(os.environ.get('RPA_FATOR_BACKOFF', '2'))
+
+class _PoolDeConexoes:
+    """
+    Pool de conexões SQLite compartilhado pelas threads do processo (requisições
+    do Flask, scheduler e RPA). Os PRAGMAs são aplicados uma única vez, quando a
+    conexão é criada, e a conexão é reaproveitada nas chamadas seguintes.
+    """
+    def __init__(self, caminho: str, tamanho: int):
+        self.caminho = caminho
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    def _criar_conexao(self):
+        conn = sqlite3.connect(self.caminho, timeout=DB_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def obter(self):
+        # Bloqueia quando todas as conexões estão emprestadas.
+        self._vagas.acquire()
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            try:
+                return self._criar_conexao()
+            except Exception:
+                self._vagas.release()
+                raise
+
+    def devolver(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._livres.put(conn)
+        except sqlite3.Error:
+            conn.close()
+        finally:
+            self._vagas.release()
+
+    def fechar(self):
+        while True:
+            try:
+                self._livres.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = None
+_trava_pool = threading.Lock()
+
+def _obter_pool() -> _PoolDeConexoes:
+    global _pool
+    with _trava_pool:
+        # Recria o pool se o caminho do banco mudou (ex.: benchmarks com banco temporário).
+        if _pool is None or _pool.caminho != DB_NAME:
+            if _pool is not None:
+                _pool.fechar()
+            novo_pool = _PoolDeConexoes(DB_NAME, DB_POOL_TAMANHO)
+            # O esquema é atualizado antes da primeira conexão ser entregue, então
+            # bancos antigos (rpa_dados.db já existentes) migram sozinhos.
+            conn = novo_pool.obter()
+            try:
+                _aplicar_migracoes(conn)
+            finally:
+                novo_pool.devolver(conn)
+            _pool = novo_pool
+        return _pool
+
+@contextmanager
+def _conexao():
+    """
+    Empresta uma conexão do pool. Faz commit ao sair do bloco sem erros e
+    rollback se uma exceção escapar; em ambos os casos a conexão volta ao pool.
+    """
+    pool = _obter_pool()
+    conn = pool.obter()
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        pool.devolver(conn)
+
+def fechar_conexoes():
+    """
+    Fecha as conexões ociosas do pool (para o encerramento dos processos).
+    """
+    global _pool
+    with _trava_pool:
+        if _pool is not None:
+            _pool.fechar()
+            _pool = None
+
+# --- OBSERVAÇÃO DAS FUNÇÕES ---
+# Se houver um observador (RPA/metricas.py), as funções marcadas com
+# @_observada (as do painel, da importação e do RPA) informam ao terminar
+# observador(nome, segundos, erro). Sem observador, o custo é uma comparação
+# por chamada.
+_observador = None
+
+def definir_observador(observador):
+    global _observador
+    _observador = observador
+
+def _observada(funcao):
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        observador = _observador
+        if observador is None:
+            return funcao(*args, **kwargs)
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resultado = funcao(*args, **kwargs)
+            erro = False
+            return resultado
+        finally:
+            try:
+                observador(funcao.__name__, time.perf_counter() - inicio, erro)
+            except Exception:
+                pass
+    return envoltorio
 
 def _limpar_numero(numero_processo_bruto: str) -> str:
     # Adicionada conversão para string para evitar o erro 'expected string or bytes-like object'
@@ -23,8 +176,15 @@ def _normalize_string(text: str) -> str:
     return re.sub(r'\s+', ' ', text).strip()
 
 def inicializar_banco():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    # As tabelas são criadas pelas migrações, aplicadas ao abrir o pool.
+    _obter_pool()
+    if not buscar_usuario_por_nome('admin'):
+        adicionar_usuario('admin', 'admin', role='admin')
+    if not buscar_usuario_por_nome('mdr'):
+        adicionar_usuario("mdr", "mdr.123")
+    print("✔️ Banco de dados (re)inicializado com a estrutura de visualização por usuário.")
+
+def _criar_tabelas(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS processos (
             id INTEGER PRIMARY KEY AUTOINCREMENT, 
@@ -45,269 +205,998 @@ def inicializar_banco():
             data_exportacao TIMESTAMP
         )
     ''')
-    conn.commit()
-    if not buscar_usuario_por_nome('admin'):
-        adicionar_usuario('admin', 'admin', role='admin')
-    if not buscar_usuario_por_nome('mdr'):
-        adicionar_usuario("mdr", "mdr.123")
-    conn.close()
-    print("✔️ Banco de dados (re)inicializado com a estrutura de visualização por usuário.")
 
+# --- MIGRAÇÕES DO ESQUEMA ---
+# Cada migração roda uma única vez, em ordem, e fica registrada em schema_version.
+# Alterações novas de esquema entram SEMPRE no fim da lista, com a próxima versão;
+# migrações já publicadas nunca devem ser editadas.
+_MIGRACOES = [
+    (1, "Estrutura inicial", _criar_tabelas),
+    (2, "Índices das consultas do painel, exportação e RPA", [
+        "CREATE INDEX IF NOT EXISTS idx_processos_numero_processo ON processos (numero_processo)",
+        "CREATE INDEX IF NOT EXISTS idx_user_process_view_status_processo ON user_process_view (status_visualizacao, process_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_process_view_processo ON user_process_view (process_id)",
+    ]),
+    (3, "Contador de versão dos dados do painel", [
+        "CREATE TABLE IF NOT EXISTS versao_dados (id INTEGER PRIMARY KEY CHECK (id = 1), versao INTEGER NOT NULL)",
+        "INSERT OR IGNORE INTO versao_dados (id, versao) VALUES (1, 0)",
+    ]),
+    (4, "Cache de CNJ por litigation do Legal One", [
+        "CREATE TABLE IF NOT EXISTS litigation_cnj_cache (litigation_id INTEGER PRIMARY KEY, numero_cnj TEXT NOT NULL, data_consulta TIMESTAMP)",
+    ]),
+    (5, "Marca (último id de tarefa) por filtro do Legal One", [
+        "CREATE TABLE IF NOT EXISTS legal_one_marcas (filtro TEXT PRIMARY KEY, ultimo_id INTEGER NOT NULL, data_atualizacao TIMESTAMP)",
+    ]),
+    (6, "Token OAuth compartilhado entre processos", [
+        "CREATE TABLE IF NOT EXISTS tokens_compartilhados (nome TEXT PRIMARY KEY, token TEXT, expira_em REAL, renovando_ate REAL)",
+    ]),
+    (7, "Impressão digital da última leitura de subsídios por processo", [
+        "CREATE TABLE IF NOT EXISTS subsidios_fingerprint (numero_processo TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, todos_concluidos INTEGER NOT NULL DEFAULT 0)",
+    ]),
+    (8, "Agenda adaptativa de verificação do RPA", [
+        "CREATE TABLE IF NOT EXISTS agenda_verificacao (numero_processo TEXT PRIMARY KEY, proxima_verificacao TIMESTAMP NOT NULL, intervalo_minutos REAL NOT NULL, ultima_verificacao TIMESTAMP)",
+        "CREATE INDEX IF NOT EXISTS idx_agenda_verificacao_proxima ON agenda_verificacao (proxima_verificacao)",
+    ]),
+    (9, "Execuções e fila persistente de jobs do RPA", [
+        "CREATE TABLE IF NOT EXISTS rpa_execucoes (id INTEGER PRIMARY KEY AUTOINCREMENT, inicio TIMESTAMP NOT NULL, fim TIMESTAMP, status TEXT NOT NULL, total INTEGER NOT NULL)",
+        """CREATE TABLE IF NOT EXISTS rpa_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            execucao_id INTEGER NOT NULL REFERENCES rpa_execucoes (id),
+            numero_processo TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendente' CHECK (estado IN ('pendente', 'em_andamento', 'concluido', 'falhou')),
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            dono TEXT,
+            lease_ate REAL,
+            erro TEXT,
+            atualizado_em TIMESTAMP,
+            UNIQUE (execucao_id, numero_processo))""",
+        "CREATE INDEX IF NOT EXISTS idx_rpa_jobs_execucao_estado ON rpa_jobs (execucao_id, estado, tentativas, id)",
+        "CREATE INDEX IF NOT EXISTS idx_rpa_execucoes_status ON rpa_execucoes (status)",
+    ]),
+    (10, "Relatórios de tempo por etapa das execuções do RPA", [
+        """CREATE TABLE IF NOT EXISTS rpa_relatorios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            execucao_id INTEGER NOT NULL REFERENCES rpa_execucoes (id),
+            inicio TIMESTAMP NOT NULL,
+            fim TIMESTAMP NOT NULL,
+            processos INTEGER NOT NULL,
+            falhas INTEGER NOT NULL,
+            relatorio TEXT NOT NULL)""",
+        "CREATE INDEX IF NOT EXISTS idx_rpa_relatorios_execucao ON rpa_relatorios (execucao_id)",
+    ]),
+    (11, "Métricas publicadas por processo (scheduler, workers) para o /metrics", [
+        "CREATE TABLE IF NOT EXISTS metricas_processos (processo TEXT PRIMARY KEY, atualizado_em REAL NOT NULL, conteudo TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_rpa_jobs_estado_atualizado ON rpa_jobs (estado, atualizado_em)",
+    ]),
+]
+
+def _aplicar_migracoes(conn):
+    """
+    Leva o banco até a última versão de _MIGRACOES. Cada migração roda em uma
+    transação própria (BEGIN IMMEDIATE), o que também impede que dois processos
+    (servidor e scheduler) apliquem a mesma migração ao mesmo tempo.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_version (versao INTEGER PRIMARY KEY, descricao TEXT, data_aplicacao TIMESTAMP)")
+    for versao, descricao, passo in _MIGRACOES:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("SELECT 1 FROM schema_version WHERE versao = ?", (versao,))
+            if cursor.fetchone():
+                conn.rollback()
+                continue
+            if callable(passo):
+                passo(cursor)
+            else:
+                for comando in passo:
+                    cursor.execute(comando)
+            cursor.execute("INSERT INTO schema_version (versao, descricao, data_aplicacao) VALUES (?, ?, ?)", (versao, descricao, datetime.datetime.now()))
+            conn.commit()
+            print(f"✔️ Migração {versao} aplicada: {descricao}")
+        except Exception:
+            conn.rollback()
+            raise
+
+# --- VERSÃO DOS DADOS ---
+# Contador incrementado, na mesma transação, por toda escrita que altera o painel
+# ou o histórico. Fica no banco para valer entre processos (o RPA grava pelo
+# scheduler e o servidor responde ao painel) e serve de chave para o cache de
+# respostas e os ETags do server.py.
+def _incrementar_versao_dados(cursor):
+    cursor.execute("UPDATE versao_dados SET versao = versao + 1 WHERE id = 1")
+
+def obter_versao_dados() -> int:
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT versao FROM versao_dados WHERE id = 1")
+        return cursor.fetchone()[0]
+
+def versao_do_esquema() -> int:
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(versao), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+@_observada
 def filtrar_tarefas_novas(lista_de_tarefas: list) -> list:
     if not lista_de_tarefas: return []
     tarefa_ids_candidatos = {tarefa['id'] for tarefa in lista_de_tarefas if 'id' in tarefa}
     if not tarefa_ids_candidatos: return []
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    placeholders = ','.join('?' for _ in tarefa_ids_candidatos)
-    query = f"SELECT tarefa_id FROM processos WHERE tarefa_id IN ({placeholders})"
-    cursor.execute(query, tuple(tarefa_ids_candidatos))
-    tarefa_ids_existentes = {row[0] for row in cursor.fetchall()}
-    conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' for _ in tarefa_ids_candidatos)
+        query = f"SELECT tarefa_id FROM processos WHERE tarefa_id IN ({placeholders})"
+        cursor.execute(query, tuple(tarefa_ids_candidatos))
+        tarefa_ids_existentes = {row[0] for row in cursor.fetchall()}
     tarefas_filtradas = [tarefa for tarefa in lista_de_tarefas if tarefa['id'] not in tarefa_ids_existentes]
     return tarefas_filtradas
 
+# --- CACHE DE CNJ DO LEGAL ONE ---
+# O identifierNumber de uma litigation nunca muda; guardá-lo evita consultar a
+# API de novo a cada importação.
+@_observada
+def buscar_cnjs_em_cache(litigation_ids: list) -> dict:
+    ids = {litigation_id for litigation_id in litigation_ids if litigation_id is not None}
+    if not ids: return {}
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        placeholders = ','.join('?' for _ in ids)
+        cursor.execute(f"SELECT litigation_id, numero_cnj FROM litigation_cnj_cache WHERE litigation_id IN ({placeholders})", tuple(ids))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+@_observada
+def salvar_cnjs_em_cache(cnjs_por_litigation: dict):
+    linhas = [(litigation_id, cnj, datetime.datetime.now()) for litigation_id, cnj in cnjs_por_litigation.items() if cnj]
+    if not linhas: return
+    with _conexao() as conn:
+        conn.cursor().executemany("INSERT OR REPLACE INTO litigation_cnj_cache (litigation_id, numero_cnj, data_consulta) VALUES (?, ?, ?)", linhas)
+
+# --- MARCAS DA IMPORTAÇÃO DO LEGAL ONE ---
+def buscar_marcas_legal_one() -> dict:
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT filtro, ultimo_id FROM legal_one_marcas")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+def salvar_marcas_legal_one(marcas: dict):
+    """ A marca de um filtro nunca recua. """
+    if not marcas: return
+    agora = datetime.datetime.now()
+    with _conexao() as conn:
+        conn.cursor().executemany("""
+            INSERT INTO legal_one_marcas (filtro, ultimo_id, data_atualizacao) VALUES (?, ?, ?)
+            ON CONFLICT(filtro) DO UPDATE SET ultimo_id = MAX(ultimo_id, excluded.ultimo_id), data_atualizacao = excluded.data_atualizacao
+        """, [(filtro, ultimo_id, agora) for filtro, ultimo_id in marcas.items()])
+
+# --- TOKEN COMPARTILHADO ---
+# Horários em epoch (time.time()). 'renovando_ate' é a reserva de quem está
+# gerando um token novo, para que os outros processos esperem por ele.
+def buscar_token_compartilhado(nome: str):
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT token, expira_em FROM tokens_compartilhados WHERE nome = ? AND token IS NOT NULL", (nome,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+
+def reservar_renovacao_token(nome: str, segundos: float) -> bool:
+    agora = time.time()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO tokens_compartilhados (nome, renovando_ate) VALUES (?, ?)
+            ON CONFLICT(nome) DO UPDATE SET renovando_ate = excluded.renovando_ate
+            WHERE tokens_compartilhados.renovando_ate IS NULL OR tokens_compartilhados.renovando_ate < ?
+        """, (nome, agora + segundos, agora))
+        return cursor.rowcount == 1
+
+def salvar_token_compartilhado(nome: str, token: str, expira_em: float):
+    with _conexao() as conn:
+        conn.cursor().execute("""
+            INSERT INTO tokens_compartilhados (nome, token, expira_em, renovando_ate) VALUES (?, ?, ?, NULL)
+            ON CONFLICT(nome) DO UPDATE SET token = excluded.token, expira_em = excluded.expira_em, renovando_ate = NULL
+        """, (nome, token, expira_em))
+
+@_observada
 def adicionar_processo_unitario(user_id: int, numero_processo: str, executante: str, tarefa_id: int = None, id_responsavel: int = None):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     agora = datetime.datetime.now()
     numero_limpo = _limpar_numero(numero_processo)
-    try:
-        cursor.execute( "INSERT INTO processos (numero_processo, responsavel_principal, data_ultima_atualizacao, tarefa_id, id_responsavel) VALUES (?, ?, ?, ?, ?)", (numero_limpo, executante, agora, tarefa_id, id_responsavel) )
-        process_id = cursor.lastrowid
-        if process_id and user_id:
-            cursor.execute( "INSERT INTO user_process_view (user_id, process_id, status_visualizacao) VALUES (?, ?, 'monitorando')", (user_id, process_id) )
-        conn.commit()
-        return process_id
-    except sqlite3.IntegrityError: return None
-    except Exception as e:
-        conn.rollback()
-        return None
-    finally: conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute( "INSERT INTO processos (numero_processo, responsavel_principal, data_ultima_atualizacao, tarefa_id, id_responsavel) VALUES (?, ?, ?, ?, ?)", (numero_limpo, executante, agora, tarefa_id, id_responsavel) )
+            process_id = cursor.lastrowid
+            if process_id and user_id:
+                cursor.execute( "INSERT INTO user_process_view (user_id, process_id, status_visualizacao) VALUES (?, ?, 'monitorando')", (user_id, process_id) )
+            _incrementar_versao_dados(cursor)
+            conn.commit()
+            return process_id
+        except Exception as e:
+            conn.rollback()
+            return None
 
+# Agora a exportação considera processos 'monitorando' E 'Concluído'
+_SQL_EXPORTACAO_ELEGIVEIS = """
+    SELECT DISTINCT p.id, p.numero_processo, p.id_responsavel FROM processos p
+    JOIN subsidios_atuais sa ON p.numero_processo = sa.numero_processo
+    JOIN user_process_view v ON p.id = v.process_id
+    WHERE v.status_visualizacao IN ('monitorando', 'Concluído') AND (sa.status LIKE 'Concluído' OR sa.status LIKE 'Concluido' OR sa.status LIKE 'Excluído')
+"""
+# Processos elegíveis já acompanhados de todos os seus subsídios (uma linha por processo x subsídio).
+# Como no fluxo original, cada p.id elegível contribui com os subsídios do seu número.
+_SQL_EXPORTACAO_SUBSIDIOS = f"""
+    WITH elegiveis AS ({_SQL_EXPORTACAO_ELEGIVEIS})
+    SELECT e.numero_processo, e.id_responsavel, sa.item, sa.status
+    FROM elegiveis e JOIN subsidios_atuais sa ON sa.numero_processo = e.numero_processo
+    ORDER BY e.id, sa.id
+"""
+# Anti-join: chaves candidatas que ainda não constam no histórico.
+_SQL_CRIAR_CANDIDATAS_EXPORTACAO = "CREATE TEMP TABLE IF NOT EXISTS exportacao_candidatas (chave_processo TEXT PRIMARY KEY)"
+_SQL_EXPORTACAO_CHAVES_NOVAS = """
+    SELECT c.chave_processo FROM temp.exportacao_candidatas c
+    WHERE NOT EXISTS (SELECT 1 FROM historico_exportacao h WHERE h.chave_processo = c.chave_processo)
+"""
+
+# Tarefas do Legal One já importadas caem no ON CONFLICT(tarefa_id); processos
+# manuais (sem tarefa_id) são ignorados se o número já estiver cadastrado.
+_SQL_INSERIR_PROCESSO_LOTE = """
+    INSERT INTO processos (numero_processo, responsavel_principal, data_ultima_atualizacao, tarefa_id, id_responsavel)
+    SELECT ?, ?, ?, ?, ?
+    WHERE ? IS NOT NULL OR NOT EXISTS (SELECT 1 FROM processos WHERE numero_processo = ?)
+    ON CONFLICT(tarefa_id) DO NOTHING
+"""
+
+@_observada
+def adicionar_processos_em_lote(user_id: int, processos: list) -> tuple:
+    """
+    Insere vários processos em uma única transação. Cada item é um dicionário com
+    'numero_processo' e, opcionalmente, 'executante', 'tarefa_id' e 'id_responsavel'.
+    Retorna (adicionados, ignorados).
+    """
+    agora = datetime.datetime.now()
+    linhas, ignorados = [], 0
+    for processo in processos:
+        numero_limpo = _limpar_numero(processo.get('numero_processo') or '')
+        if not numero_limpo:
+            ignorados += 1
+            continue
+        tarefa_id = processo.get('tarefa_id')
+        linhas.append((numero_limpo, processo.get('executante') or '', agora, tarefa_id, processo.get('id_responsavel'), tarefa_id, numero_limpo))
+    if not linhas:
+        return 0, ignorados
+
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        # O lock de escrita desde o início garante que todo id acima do maior atual
+        # foi inserido por este lote (AUTOINCREMENT nunca reaproveita ids).
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM processos")
+        maior_id_anterior = cursor.fetchone()[0]
+        cursor.executemany(_SQL_INSERIR_PROCESSO_LOTE, linhas)
+        cursor.execute("SELECT COUNT(*) FROM processos WHERE id > ?", (maior_id_anterior,))
+        adicionados = cursor.fetchone()[0]
+        if adicionados:
+            if user_id:
+                cursor.execute("INSERT INTO user_process_view (user_id, process_id, status_visualizacao) SELECT ?, id, 'monitorando' FROM processos WHERE id > ?", (user_id, maior_id_anterior))
+            _incrementar_versao_dados(cursor)
+    return adicionados, ignorados + len(linhas) - adicionados
+
+@_observada
 def exportar_dados_json():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    processos_agrupados = {}
-    # --- MODIFICAÇÃO AQUI ---
-    # Agora a exportação considera processos 'monitorando' E 'Concluído'
-    cursor.execute("""
-        SELECT DISTINCT p.id, p.numero_processo, p.id_responsavel FROM processos p
-        JOIN subsidios_atuais sa ON p.numero_processo = sa.numero_processo
-        JOIN user_process_view v ON p.id = v.process_id
-        WHERE v.status_visualizacao IN ('monitorando', 'Concluído') AND (sa.status LIKE 'Concluído' OR sa.status LIKE 'Concluido' OR sa.status LIKE 'Excluído')
-    """)
-    processos_elegiveis = cursor.fetchall()
-    # ... (o resto da função continua igual)
-    for processo in processos_elegiveis:
-        chave_agrupamento = (processo['numero_processo'], processo['id_responsavel'])
-        if chave_agrupamento not in processos_agrupados:
-            processos_agrupados[chave_agrupamento] = { "numero_processo": processo['numero_processo'], "id_responsavel": processo['id_responsavel'], "observacoes": [] }
-        cursor.execute("SELECT item, status FROM subsidios_atuais WHERE numero_processo = ?", (processo['numero_processo'],))
-        subsidios = cursor.fetchall()
-        for subsidio in subsidios:
-            observacao = f"PROATIVO: {subsidio['item']} ({subsidio['status'].upper()})."
-            processos_agrupados[chave_agrupamento]["observacoes"].append(observacao)
-    lista_para_exportar, lista_para_registrar = [], []
-    for grupo in processos_agrupados.values():
-        observacao_final = " ; ".join(sorted(grupo["observacoes"]))
-        chave_processo = f"{grupo['numero_processo']}-{grupo['id_responsavel']}-{hashlib.md5(observacao_final.encode()).hexdigest()}"
-        cursor.execute("SELECT 1 FROM historico_exportacao WHERE chave_processo = ?", (chave_processo,))
-        if not cursor.fetchone():
-            lista_para_exportar.append({ "numero_processo": grupo["numero_processo"], "id_responsavel": grupo["id_responsavel"], "observacao": observacao_final })
-            lista_para_registrar.append((chave_processo, datetime.datetime.now()))
-    if lista_para_registrar:
-        cursor.executemany("INSERT INTO historico_exportacao (chave_processo, data_exportacao) VALUES (?, ?)", lista_para_registrar)
-        conn.commit()
-    conn.close()
-    return lista_para_exportar
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # Bloqueia a escrita desde o início: duas exportações simultâneas (painel e
+        # scheduler) não podem enviar nem registrar as mesmas chaves.
+        cursor.execute("BEGIN IMMEDIATE")
+
+        # 1. Uma consulta para os processos elegíveis com seus subsídios.
+        processos_agrupados = {}
+        cursor.execute(_SQL_EXPORTACAO_SUBSIDIOS)
+        for numero_processo, id_responsavel, item, status in cursor.fetchall():
+            observacao = f"PROATIVO: {item} ({status.upper()})."
+            processos_agrupados.setdefault((numero_processo, id_responsavel), []).append(observacao)
+
+        candidatos = {}
+        for (numero_processo, id_responsavel), observacoes in processos_agrupados.items():
+            observacao_final = " ; ".join(sorted(observacoes))
+            chave_processo = f"{numero_processo}-{id_responsavel}-{hashlib.md5(observacao_final.encode()).hexdigest()}"
+            candidatos[chave_processo] = { "numero_processo": numero_processo, "id_responsavel": id_responsavel, "observacao": observacao_final }
+        if not candidatos:
+            return []
+
+        # 2. Um anti-join contra o histórico, usando uma tabela temporária da conexão.
+        cursor.execute(_SQL_CRIAR_CANDIDATAS_EXPORTACAO)
+        try:
+            cursor.executemany("INSERT OR IGNORE INTO temp.exportacao_candidatas (chave_processo) VALUES (?)", [(chave,) for chave in candidatos])
+            cursor.execute(_SQL_EXPORTACAO_CHAVES_NOVAS)
+            chaves_novas = {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.execute("DELETE FROM temp.exportacao_candidatas")
+
+        # 3. Um executemany para registrar o que será exportado.
+        agora = datetime.datetime.now()
+        lista_para_exportar = [dados for chave, dados in candidatos.items() if chave in chaves_novas]
+        lista_para_registrar = [(chave, agora) for chave in candidatos if chave in chaves_novas]
+        if lista_para_registrar:
+            cursor.executemany("INSERT INTO historico_exportacao (chave_processo, data_exportacao) VALUES (?, ?)", lista_para_registrar)
+        return lista_para_exportar
 
 def adicionar_usuario(username, password, role='user'):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     password_hash = generate_password_hash(password)
-    try:
-        cursor.execute("INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)", (username, password_hash, role))
-        conn.commit()
-    except sqlite3.IntegrityError:
-        if role == 'admin':
-            cursor.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("INSERT INTO users (username, password_hash, role) VALUES (?, ?, ?)", (username, password_hash, role))
             conn.commit()
-    finally: conn.close()
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            if role == 'admin':
+                cursor.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
+                conn.commit()
 
+@_observada
 def buscar_usuario_por_nome(username):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username, password_hash, role FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, password_hash, role FROM users WHERE username = ?", (username,))
+        user = cursor.fetchone()
     return dict(user) if user else None
 
-def _verificar_e_atualizar_status_geral(cursor, numero_processo_limpo):
-    cursor.execute("""
-        SELECT COUNT(id) FROM subsidios_atuais 
-        WHERE numero_processo = ? 
-        AND status NOT LIKE 'Concluído' 
-        AND status NOT LIKE 'Concluido'
-        AND status NOT LIKE 'Excluído'
-    """, (numero_processo_limpo,))
-    count_nao_concluidos = cursor.fetchone()[0]
-    cursor.execute("SELECT COUNT(id) FROM subsidios_atuais WHERE numero_processo = ?", (numero_processo_limpo,))
-    count_total = cursor.fetchone()[0]
+# Total e não concluídos em uma única leitura
+_SQL_CONTAGEM_SUBSIDIOS = """
+    SELECT COUNT(id),
+           COALESCE(SUM(CASE WHEN status NOT LIKE 'Concluído' AND status NOT LIKE 'Concluido' AND status NOT LIKE 'Excluído' THEN 1 ELSE 0 END), 0)
+    FROM subsidios_atuais WHERE numero_processo = ?
+"""
+_SQL_CONCLUIR_PROCESSO = "UPDATE user_process_view SET status_visualizacao = 'Concluído' WHERE process_id IN (SELECT id FROM processos WHERE numero_processo = ?) AND status_visualizacao <> 'Concluído'"
+_SQL_FINGERPRINT = "SELECT fingerprint, todos_concluidos FROM subsidios_fingerprint WHERE numero_processo = ?"
+_SQL_SALVAR_FINGERPRINT = """
+    INSERT INTO subsidios_fingerprint (numero_processo, fingerprint, todos_concluidos) VALUES (?, ?, ?)
+    ON CONFLICT(numero_processo) DO UPDATE SET fingerprint = excluded.fingerprint, todos_concluidos = excluded.todos_concluidos
+"""
+_SQL_UPSERT_SUBSIDIO = "INSERT INTO subsidios_atuais (numero_processo, item, status, data_atualizacao) VALUES (?, ?, ?, ?) ON CONFLICT(numero_processo, item) DO UPDATE SET status=excluded.status, data_atualizacao=excluded.data_atualizacao"
+
+def _fingerprint_subsidios(lista_subsidios: list) -> str:
+    pares = [[subsidio['item'], subsidio['status']] for subsidio in lista_subsidios]
+    return hashlib.sha1(json.dumps(pares, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def _verificar_e_atualizar_status_geral(cursor, numero_processo_limpo) -> tuple:
+    """ Retorna (todos os subsídios concluídos?, visões marcadas como 'Concluído'). """
+    cursor.execute(_SQL_CONTAGEM_SUBSIDIOS, (numero_processo_limpo,))
+    count_total, count_nao_concluidos = cursor.fetchone()
     if count_total > 0 and count_nao_concluidos == 0:
         print(f"  -> Todos os subsídios para {numero_processo_limpo} estão concluídos!")
-        cursor.execute("UPDATE user_process_view SET status_visualizacao = 'Concluído' WHERE process_id IN (SELECT id FROM processos WHERE numero_processo = ?)", (numero_processo_limpo,))
+        cursor.execute(_SQL_CONCLUIR_PROCESSO, (numero_processo_limpo,))
         print(f"  -> Status do processo {numero_processo_limpo} atualizado para 'Concluído'.")
+        return True, cursor.rowcount
+    return False, 0
 
-def atualizar_status_para_usuarios(numero_processo: str, lista_subsidios: list):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    agora = datetime.datetime.now()
+_SQL_INTERVALO_AGENDA = "SELECT intervalo_minutos FROM agenda_verificacao WHERE numero_processo = ?"
+_SQL_SALVAR_AGENDA = """
+    INSERT INTO agenda_verificacao (numero_processo, proxima_verificacao, intervalo_minutos, ultima_verificacao) VALUES (?, ?, ?, ?)
+    ON CONFLICT(numero_processo) DO UPDATE SET proxima_verificacao = excluded.proxima_verificacao,
+        intervalo_minutos = excluded.intervalo_minutos, ultima_verificacao = excluded.ultima_verificacao
+"""
+
+def _agendar_proxima_verificacao(cursor, numero_processo_limpo: str, mudou: bool, agora):
+    cursor.execute(_SQL_INTERVALO_AGENDA, (numero_processo_limpo,))
+    anterior = cursor.fetchone()
+    if mudou or not anterior:
+        intervalo = RPA_INTERVALO_MINIMO_MINUTOS
+    else:
+        intervalo = min(anterior[0] * RPA_FATOR_BACKOFF, RPA_INTERVALO_MAXIMO_MINUTOS)
+    # Variação de ±10% para os processos não voltarem todos no mesmo ciclo.
+    espera = intervalo * random.uniform(0.9, 1.1)
+    cursor.execute(_SQL_SALVAR_AGENDA, (numero_processo_limpo, agora + datetime.timedelta(minutes=espera), intervalo, agora))
+
+def _gravar_leitura(cursor, numero_processo: str, lista_subsidios: list, agora) -> tuple:
+    """
+    Grava uma leitura do RPA na transação do cursor. Retorna (subsídios
+    alterados, se o painel mudou). Leitura idêntica à anterior só reagenda a
+    próxima verificação do processo.
+    """
     numero_processo_limpo = _limpar_numero(numero_processo)
-    try:
-        for subsidio in lista_subsidios:
-            cursor.execute("INSERT INTO subsidios_atuais (numero_processo, item, status, data_atualizacao) VALUES (?, ?, ?, ?) ON CONFLICT(numero_processo, item) DO UPDATE SET status=excluded.status, data_atualizacao=excluded.data_atualizacao", (numero_processo_limpo, subsidio['item'], subsidio['status'], agora))
+    fingerprint = _fingerprint_subsidios(lista_subsidios)
+    cursor.execute(_SQL_FINGERPRINT, (numero_processo_limpo,))
+    anterior = cursor.fetchone()
+    if anterior and anterior[0] == fingerprint:
+        _agendar_proxima_verificacao(cursor, numero_processo_limpo, False, agora)
+        # Nada mudou. Só falta concluir visões criadas depois que o processo
+        # já estava todo concluído (ex.: outro usuário o adicionou).
+        if anterior[1]:
+            cursor.execute(_SQL_CONCLUIR_PROCESSO, (numero_processo_limpo,))
+            return 0, cursor.rowcount > 0
+        return 0, False
+
+    cursor.execute("SELECT item, status FROM subsidios_atuais WHERE numero_processo = ?", (numero_processo_limpo,))
+    status_atual = {row[0]: row[1] for row in cursor.fetchall()}
+    # Se o mesmo item vier repetido, vale o último (como no upsert).
+    lidos = {subsidio['item']: subsidio['status'] for subsidio in lista_subsidios}
+    alterados = [(numero_processo_limpo, item, status, agora) for item, status in lidos.items() if status_atual.get(item) != status]
+    if alterados:
+        cursor.executemany(_SQL_UPSERT_SUBSIDIO, alterados)
         cursor.execute("UPDATE processos SET data_ultima_atualizacao = ? WHERE numero_processo = ?", (agora, numero_processo_limpo))
-        _verificar_e_atualizar_status_geral(cursor, numero_processo_limpo)
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-    finally: conn.close()
+    todos_concluidos, visoes_concluidas = _verificar_e_atualizar_status_geral(cursor, numero_processo_limpo)
+    cursor.execute(_SQL_SALVAR_FINGERPRINT, (numero_processo_limpo, fingerprint, int(todos_concluidos)))
+    _agendar_proxima_verificacao(cursor, numero_processo_limpo, bool(alterados), agora)
+    return len(alterados), bool(alterados or visoes_concluidas)
+
+@_observada
+def gravar_leitura_rpa(numero_processo: str, lista_subsidios: list) -> int:
+    """
+    Grava a leitura do RPA para o processo e retorna quantos subsídios mudaram
+    (novos ou com status diferente). Se a leitura for idêntica à anterior
+    (mesma impressão digital) nada é escrito. Se a gravação falhar, a
+    transação é desfeita e a exceção sobe.
+    """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        alterados, painel_mudou = _gravar_leitura(cursor, numero_processo, lista_subsidios, datetime.datetime.now())
+        if painel_mudou:
+            _incrementar_versao_dados(cursor)
+        return alterados
+
+def atualizar_status_para_usuarios(numero_processo: str, lista_subsidios: list) -> int:
+    """
+    Como gravar_leitura_rpa, mas uma falha na gravação retorna 0 em vez de
+    levantar a exceção.
+    """
+    try:
+        return gravar_leitura_rpa(numero_processo, lista_subsidios)
+    except Exception:
+        return 0
+
+@_observada
+def atualizar_status_em_lote(leituras: list) -> dict:
+    """
+    Grava várias leituras [(numero_processo, lista_subsidios), ...] em uma única
+    transação. Retorna {numero_processo: subsídios alterados}. Se o lote falhar
+    nada é gravado e a exceção sobe, para quem chamou decidir como repetir.
+    """
+    agora = datetime.datetime.now()
+    resultado, painel_mudou = {}, False
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        for numero_processo, lista_subsidios in leituras:
+            alterados, mudou = _gravar_leitura(cursor, numero_processo, lista_subsidios, agora)
+            resultado[numero_processo] = resultado.get(numero_processo, 0) + alterados
+            painel_mudou = painel_mudou or mudou
+        if painel_mudou:
+            _incrementar_versao_dados(cursor)
+    return resultado
     
+_SQL_ARQUIVAR_PROCESSO = "UPDATE user_process_view SET status_visualizacao = 'arquivado' WHERE process_id IN (SELECT id FROM processos WHERE numero_processo = ?)"
+
+@_observada
 def marcar_ciencia_global(numero_processo: str):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     numero_processo_limpo = _limpar_numero(numero_processo)
-    try:
-        cursor.execute("UPDATE user_process_view SET status_visualizacao = 'arquivado' WHERE process_id IN (SELECT id FROM processos WHERE numero_processo = ?)", (numero_processo_limpo,))
-        conn.commit()
-    finally: conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SQL_ARQUIVAR_PROCESSO, (numero_processo_limpo,))
+        _incrementar_versao_dados(cursor)
+
+# Agora a query busca processos com status 'monitorando', 'pendente_ciencia' E 'Concluído'
+_SQL_PAINEL_PROCESSOS = """
+    SELECT p.id, p.numero_processo, p.responsavel_principal, p.classificacao, p.data_ultima_atualizacao, p.id_responsavel, MIN(v.status_visualizacao) AS status_geral 
+    FROM processos p JOIN user_process_view v ON p.id = v.process_id 
+    WHERE v.status_visualizacao IN ('monitorando', 'pendente_ciencia', 'Concluído') GROUP BY p.id ORDER BY p.data_ultima_atualizacao DESC
+"""
+# Subsídios de todos os processos do painel em uma única consulta (evita um SELECT por processo).
+_SQL_SUBSIDIOS_DO_PAINEL = """
+    SELECT sa.numero_processo, sa.item, sa.status FROM subsidios_atuais sa
+    WHERE sa.numero_processo IN (
+        SELECT p.numero_processo FROM processos p JOIN user_process_view v ON p.id = v.process_id
+        WHERE v.status_visualizacao IN ('monitorando', 'pendente_ciencia', 'Concluído')
+    )
+    ORDER BY sa.id
+"""
+
+def _agrupar_subsidios(linhas) -> dict:
+    """
+    Agrupa tuplas (numero_processo, item, status) por processo, mantendo a ordem de chegada.
+    """
+    subsidios_por_processo = {}
+    for numero_processo, item, status in linhas:
+        lista = subsidios_por_processo.get(numero_processo)
+        if lista is None:
+            lista = subsidios_por_processo[numero_processo] = []
+        lista.append({"item": item, "status": status})
+    return subsidios_por_processo
 
 # --- FUNÇÃO MODIFICADA ---
+@_observada
 def buscar_painel_usuario(user_id: int):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    # Agora a query busca processos com status 'monitorando', 'pendente_ciencia' E 'Concluído'
-    cursor.execute("""
-        SELECT p.id, p.numero_processo, p.responsavel_principal, p.classificacao, p.data_ultima_atualizacao, p.id_responsavel, MIN(v.status_visualizacao) AS status_geral 
-        FROM processos p JOIN user_process_view v ON p.id = v.process_id 
-        WHERE v.status_visualizacao IN ('monitorando', 'pendente_ciencia', 'Concluído') GROUP BY p.id ORDER BY p.data_ultima_atualizacao DESC
-    """)
-    dados_painel = [dict(row) for row in cursor.fetchall()]
+    with _conexao() as conn:
+        # Tuplas simples: com dezenas de milhares de linhas, montar sqlite3.Row custa mais que a consulta.
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        # As duas leituras enxergam o mesmo instante do banco, mesmo com o RPA gravando.
+        cursor.execute("BEGIN")
+        cursor.execute(_SQL_PAINEL_PROCESSOS)
+        colunas = [descricao[0] for descricao in cursor.description]
+        dados_painel = [dict(zip(colunas, row)) for row in cursor.fetchall()]
+        cursor.execute(_SQL_SUBSIDIOS_DO_PAINEL)
+        subsidios_por_processo = _agrupar_subsidios(cursor.fetchall())
     for processo in dados_painel:
-        cursor.execute("SELECT item, status FROM subsidios_atuais WHERE numero_processo = ? ORDER BY id", (processo['numero_processo'],))
-        processo['subsidios'] = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+        processo['subsidios'] = subsidios_por_processo.get(processo['numero_processo'], [])
     return dados_painel
 
+# --- PAINEL PAGINADO ---
+# Mesma agregação do painel completo; os filtros de processo entram no WHERE, o de
+# status (que depende do MIN entre usuários) no HAVING, e a paginação é por
+# keyset sobre (coluna de ordenação, id), sem OFFSET.
+_SQL_PAINEL_PAGINADO = """
+    SELECT p.id, p.numero_processo, p.responsavel_principal, p.classificacao, p.data_ultima_atualizacao, p.id_responsavel, MIN(v.status_visualizacao) AS status_geral
+    FROM processos p JOIN user_process_view v ON p.id = v.process_id
+    WHERE v.status_visualizacao IN ('monitorando', 'pendente_ciencia', 'Concluído') {filtros}
+    GROUP BY p.id {having}
+"""
+# Expressão SQL de cada ordenação aceita. NULL vira '' para o keyset comparar sempre.
+_ORDENACOES_PAINEL = {
+    "data_ultima_atualizacao": "COALESCE(p.data_ultima_atualizacao, '')",
+    "id": "p.id",
+}
+PAINEL_LIMITE_MAXIMO = 500
+
+def _codificar_cursor(valores: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+def _decodificar_cursor(cursor_paginacao: str) -> list:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor_paginacao.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor de paginação inválido.") from e
+    if not isinstance(valores, list) or len(valores) != 2:
+        raise ValueError("Cursor de paginação inválido.")
+    return valores
+
+@_observada
+def buscar_painel_paginado(user_id: int, limite: int = 50, cursor_paginacao: str = None, status: str = None,
+                           responsavel: str = None, numero: str = None,
+                           ordenar_por: str = "data_ultima_atualizacao", direcao: str = "desc") -> dict:
+    """
+    Uma página do painel, com filtros e ordenação feitos no SQL.
+    Retorna {"itens": [...], "total": <processos que atendem aos filtros>,
+    "proximo_cursor": <cursor da próxima página ou None>}.
+    Lança ValueError para ordenação, direção ou cursor inválidos.
+    """
+    if ordenar_por not in _ORDENACOES_PAINEL:
+        raise ValueError(f"Ordenação inválida: {ordenar_por}")
+    if direcao not in ("asc", "desc"):
+        raise ValueError(f"Direção inválida: {direcao}")
+    limite = max(1, min(int(limite), PAINEL_LIMITE_MAXIMO))
+    expressao_ordem = _ORDENACOES_PAINEL[ordenar_por]
+
+    filtros, parametros = [], []
+    numero_limpo = _limpar_numero(numero) if numero else ""
+    if numero_limpo:
+        filtros.append("p.numero_processo LIKE ?")
+        parametros.append(f"%{numero_limpo}%")
+    if responsavel and responsavel.strip():
+        filtros.append("(p.responsavel_principal LIKE ? OR CAST(p.id_responsavel AS TEXT) = ?)")
+        parametros.extend([f"%{responsavel.strip()}%", responsavel.strip()])
+    having, parametros_having = "", []
+    if status:
+        having = "HAVING status_geral = ?"
+        parametros_having.append(status)
+
+    sql_contagem = _SQL_PAINEL_PAGINADO.format(filtros="".join(f" AND {f}" for f in filtros), having=having)
+
+    filtros_pagina, parametros_pagina = list(filtros), list(parametros)
+    if cursor_paginacao:
+        valor_ordem, ultimo_id = _decodificar_cursor(cursor_paginacao)
+        operador = "<" if direcao == "desc" else ">"
+        filtros_pagina.append(f"({expressao_ordem}, p.id) {operador} (?, ?)")
+        parametros_pagina.extend([valor_ordem, ultimo_id])
+    sql_pagina = _SQL_PAINEL_PAGINADO.format(filtros="".join(f" AND {f}" for f in filtros_pagina), having=having)
+    sql_pagina += f" ORDER BY {expressao_ordem} {direcao.upper()}, p.id {direcao.upper()} LIMIT ?"
+
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        cursor.execute(f"SELECT COUNT(*) FROM ({sql_contagem})", parametros + parametros_having)
+        total = cursor.fetchone()[0]
+        # Um registro a mais indica se existe próxima página.
+        cursor.execute(sql_pagina, parametros_pagina + parametros_having + [limite + 1])
+        itens = [dict(row) for row in cursor.fetchall()]
+        tem_mais = len(itens) > limite
+        itens = itens[:limite]
+
+        numeros = list({item['numero_processo'] for item in itens})
+        subsidios_por_processo = {}
+        if numeros:
+            cursor.row_factory = None
+            placeholders = ','.join('?' for _ in numeros)
+            cursor.execute(f"SELECT numero_processo, item, status FROM subsidios_atuais WHERE numero_processo IN ({placeholders}) ORDER BY id", numeros)
+            subsidios_por_processo = _agrupar_subsidios(cursor.fetchall())
+
+    for item in itens:
+        item['subsidios'] = subsidios_por_processo.get(item['numero_processo'], [])
+
+    proximo_cursor = None
+    if tem_mais and itens:
+        ultimo = itens[-1]
+        valor_ordem = ultimo['id'] if ordenar_por == "id" else (ultimo['data_ultima_atualizacao'] or "")
+        proximo_cursor = _codificar_cursor([valor_ordem, ultimo['id']])
+    return {"itens": itens, "total": total, "proximo_cursor": proximo_cursor}
+
+_SQL_MONITORAMENTO_GERAL = "SELECT DISTINCT p.numero_processo FROM processos p JOIN user_process_view v ON p.id = v.process_id WHERE v.status_visualizacao = 'monitorando'"
+
 # --- FUNÇÃO CORRIGIDA ---
+@_observada
 def buscar_processos_em_monitoramento_geral() -> list:
     """
     Busca os NÚMEROS DE PROCESSO que estão em monitoramento para o robô RPA.
     """
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    # Retorna o numero_processo (string), que é o que o robô espera.
-    cursor.execute("SELECT DISTINCT p.numero_processo FROM processos p JOIN user_process_view v ON p.id = v.process_id WHERE v.status_visualizacao = 'monitorando'")
-    return [row[0] for row in cursor.fetchall()]
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        # Retorna o numero_processo (string), que é o que o robô espera.
+        cursor.execute(_SQL_MONITORAMENTO_GERAL)
+        return [row[0] for row in cursor.fetchall()]
 
+# Processos em monitoramento sem agenda (nunca verificados) vêm primeiro; depois
+# os vencidos, do mais atrasado para o mais recente.
+_SQL_PROCESSOS_A_VERIFICAR = f"""
+    SELECT m.numero_processo FROM ({_SQL_MONITORAMENTO_GERAL}) m
+    LEFT JOIN agenda_verificacao a ON a.numero_processo = m.numero_processo
+    WHERE a.proxima_verificacao IS NULL OR a.proxima_verificacao <= ?
+    ORDER BY a.proxima_verificacao IS NOT NULL, a.proxima_verificacao
+    LIMIT ?
+"""
+_SQL_PROXIMA_VERIFICACAO = f"""
+    SELECT MIN(COALESCE(a.proxima_verificacao, '')) FROM ({_SQL_MONITORAMENTO_GERAL}) m
+    LEFT JOIN agenda_verificacao a ON a.numero_processo = m.numero_processo
+"""
+
+@_observada
+def buscar_processos_para_verificar(limite: int) -> list:
+    """
+    Lote do próximo ciclo do RPA: até 'limite' processos em monitoramento cuja
+    verificação já venceu, em ordem de prioridade.
+    """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SQL_PROCESSOS_A_VERIFICAR, (datetime.datetime.now(), limite))
+        return [row[0] for row in cursor.fetchall()]
+
+def segundos_ate_proxima_verificacao():
+    """ Segundos até a próxima verificação vencer (0 se já há vencidas); None sem processos. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SQL_PROXIMA_VERIFICACAO)
+        proxima = cursor.fetchone()[0]
+    if proxima is None:
+        return None
+    if proxima == '':
+        return 0
+    return max(0.0, (datetime.datetime.fromisoformat(proxima) - datetime.datetime.now()).total_seconds())
+
+# --- FILA PERSISTENTE DE JOBS DO RPA ---
+# Cada execução grava um job por processo. Os workers pegam jobs com lease
+# (arrendamento com prazo, em epoch): se o worker morrer, o lease vence e o job
+# volta a ser entregue. Uma execução que não foi encerrada é retomada na próxima.
+@_observada
+def abrir_execucao_rpa(processos: list) -> tuple:
+    """
+    Retorna (execucao_id, retomada). Se há uma execução em andamento (ex.: o RPA
+    caiu no meio), ela é retomada e 'processos' é ignorado.
+    """
+    agora = datetime.datetime.now()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT id FROM rpa_execucoes WHERE status = 'em_andamento' ORDER BY id LIMIT 1")
+        aberta = cursor.fetchone()
+        if aberta:
+            return aberta[0], True
+        numeros = list(dict.fromkeys(processos))
+        cursor.execute("INSERT INTO rpa_execucoes (inicio, status, total) VALUES (?, 'em_andamento', ?)", (agora, len(numeros)))
+        execucao_id = cursor.lastrowid
+        cursor.executemany("INSERT INTO rpa_jobs (execucao_id, numero_processo, atualizado_em) VALUES (?, ?, ?)",
+                           [(execucao_id, numero, agora) for numero in numeros])
+        return execucao_id, False
+
+@_observada
+def arrendar_job_rpa(execucao_id: int, dono: str, lease_segundos: float, max_tentativas: int):
+    """
+    Entrega ao 'dono' o próximo job pendente (ou com lease vencido) que ainda
+    tenha tentativas, priorizando os menos tentados. Retorna o número do
+    processo ou None se não houver job disponível agora.
+    """
+    agora = time.time()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        # Lease vencido na última tentativa: o worker caiu (kill, restart, Ctrl+C)
+        # sem chamar falhar_job_rpa. Sem tentativas, o job não seria arrendado de
+        # novo e deixaria a execução aberta para sempre; marca como 'falhou'.
+        cursor.execute("""
+            UPDATE rpa_jobs SET estado = 'falhou', lease_ate = NULL, atualizado_em = ?,
+                   erro = COALESCE(erro, 'Lease vencido na última tentativa (worker interrompido).')
+            WHERE execucao_id = ? AND estado = 'em_andamento' AND lease_ate < ? AND tentativas >= ?
+        """, (datetime.datetime.now(), execucao_id, agora, max_tentativas))
+        cursor.execute("""
+            SELECT id, numero_processo FROM rpa_jobs
+            WHERE execucao_id = ? AND tentativas < ?
+              AND (estado = 'pendente' OR (estado = 'em_andamento' AND lease_ate < ?))
+            ORDER BY tentativas, id LIMIT 1
+        """, (execucao_id, max_tentativas, agora))
+        job = cursor.fetchone()
+        if not job:
+            return None
+        cursor.execute("""
+            UPDATE rpa_jobs SET estado = 'em_andamento', dono = ?, lease_ate = ?, tentativas = tentativas + 1, atualizado_em = ?
+            WHERE id = ?
+        """, (dono, agora + lease_segundos, datetime.datetime.now(), job[0]))
+        return job[1]
+
+@_observada
+def concluir_job_rpa(execucao_id: int, numero_processo: str, dono: str) -> bool:
+    """ Só o dono do lease conclui o job; retorna False se o lease já era de outro. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE rpa_jobs SET estado = 'concluido', lease_ate = NULL, erro = NULL, atualizado_em = ?
+            WHERE execucao_id = ? AND numero_processo = ? AND dono = ? AND estado = 'em_andamento'
+        """, (datetime.datetime.now(), execucao_id, numero_processo, dono))
+        return cursor.rowcount == 1
+
+@_observada
+def falhar_job_rpa(execucao_id: int, numero_processo: str, dono: str, erro: str, max_tentativas: int) -> bool:
+    """
+    Devolve o job à fila ou, esgotadas as tentativas, marca como 'falhou'.
+    Retorna se o job falhou de vez.
+    """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE rpa_jobs SET estado = CASE WHEN tentativas >= ? THEN 'falhou' ELSE 'pendente' END,
+                   lease_ate = NULL, erro = ?, atualizado_em = ?
+            WHERE execucao_id = ? AND numero_processo = ? AND dono = ? AND estado = 'em_andamento'
+        """, (max_tentativas, (erro or '')[:500], datetime.datetime.now(), execucao_id, numero_processo, dono))
+        cursor.execute("SELECT estado FROM rpa_jobs WHERE execucao_id = ? AND numero_processo = ?", (execucao_id, numero_processo))
+        row = cursor.fetchone()
+        return bool(row) and row[0] == 'falhou'
+
+def resumo_execucao_rpa(execucao_id: int) -> dict:
+    """ Quantidade de jobs por estado e a lista dos que falharam de vez. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT estado, COUNT(*) FROM rpa_jobs WHERE execucao_id = ? GROUP BY estado", (execucao_id,))
+        resumo = {estado: 0 for estado in ('pendente', 'em_andamento', 'concluido', 'falhou')}
+        resumo.update({row[0]: row[1] for row in cursor.fetchall()})
+        cursor.execute("SELECT numero_processo FROM rpa_jobs WHERE execucao_id = ? AND estado = 'falhou' ORDER BY id", (execucao_id,))
+        resumo['falhados'] = [row[0] for row in cursor.fetchall()]
+        return resumo
+
+def encerrar_execucao_rpa(execucao_id: int, status: str = 'concluida'):
+    with _conexao() as conn:
+        conn.cursor().execute("UPDATE rpa_execucoes SET status = ?, fim = ? WHERE id = ?", (status, datetime.datetime.now(), execucao_id))
+
+# --- RELATÓRIOS DE TEMPO DO RPA ---
+# Um relatório por chamada de executar_rpa (uma execução retomada gera mais de
+# um), com o JSON de RPA/medicao.py.
+def salvar_relatorio_rpa(execucao_id: int, inicio, fim, relatorio: dict) -> int:
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO rpa_relatorios (execucao_id, inicio, fim, processos, falhas, relatorio) VALUES (?, ?, ?, ?, ?, ?)",
+            (execucao_id, inicio, fim, relatorio.get("processos", 0), relatorio.get("falhas", 0), json.dumps(relatorio, ensure_ascii=False)),
+        )
+        return cursor.lastrowid
+
+def listar_relatorios_rpa(limite: int = 20) -> list:
+    """ Relatórios mais recentes primeiro, sem o JSON. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, execucao_id, inicio, fim, processos, falhas FROM rpa_relatorios ORDER BY id DESC LIMIT ?", (limite,))
+        return [dict(row) for row in cursor.fetchall()]
+
+def buscar_relatorio_rpa(relatorio_id: int):
+    """ Relatório completo (com o JSON decodificado em 'relatorio') ou None. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM rpa_relatorios WHERE id = ?", (relatorio_id,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    resultado = dict(row)
+    resultado["relatorio"] = json.loads(resultado["relatorio"])
+    return resultado
+
+@_observada
 def buscar_historico_usuario(user_id: int):
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT p.id, p.numero_processo, p.responsavel_principal, p.classificacao, p.data_ultima_atualizacao 
-        FROM processos p JOIN user_process_view v ON p.id = v.process_id 
-        WHERE v.user_id = ? AND v.status_visualizacao = 'arquivado' ORDER BY p.data_ultima_atualizacao DESC
-    """, (user_id,))
-    return [dict(row) for row in cursor.fetchall()]
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.id, p.numero_processo, p.responsavel_principal, p.classificacao, p.data_ultima_atualizacao 
+            FROM processos p JOIN user_process_view v ON p.id = v.process_id 
+            WHERE v.user_id = ? AND v.status_visualizacao = 'arquivado' ORDER BY p.data_ultima_atualizacao DESC
+        """, (user_id,))
+        return [dict(row) for row in cursor.fetchall()]
 
 # (O restante do arquivo permanece o mesmo)
 def listar_todos_usuarios():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username, role FROM users ORDER BY username")
-    return [dict(row) for row in cursor.fetchall()]
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, role FROM users ORDER BY username")
+        return [dict(row) for row in cursor.fetchall()]
 
 def buscar_itens_relevantes():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, item_nome FROM itens_relevantes ORDER BY item_nome")
-    return [dict(row) for row in cursor.fetchall()]
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, item_nome FROM itens_relevantes ORDER BY item_nome")
+        return [dict(row) for row in cursor.fetchall()]
 
 def salvar_itens_relevantes(itens: list):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    try:
-        cursor.execute("DELETE FROM itens_relevantes")
-        itens_unicos = sorted(list(set(item.strip() for item in itens if item.strip())))
-        itens_tuplas = [(item,) for item in itens_unicos]
-        if itens_tuplas:
-            cursor.executemany("INSERT INTO itens_relevantes (item_nome) VALUES (?)", itens_tuplas)
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-    finally: conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM itens_relevantes")
+            itens_unicos = sorted(list(set(item.strip() for item in itens if item.strip())))
+            itens_tuplas = [(item,) for item in itens_unicos]
+            if itens_tuplas:
+                cursor.executemany("INSERT INTO itens_relevantes (item_nome) VALUES (?)", itens_tuplas)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
 
 def get_itens_com_preferencias_usuario(user_id: int):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("INSERT OR IGNORE INTO user_item_preferences (user_id, item_id) SELECT ?, id FROM itens_relevantes WHERE id NOT IN (SELECT item_id FROM user_item_preferences WHERE user_id = ?)", (user_id, user_id))
-    conn.commit()
-    cursor.execute("SELECT ir.id, ir.item_nome, uip.is_enabled FROM itens_relevantes ir JOIN user_item_preferences uip ON ir.id = uip.item_id WHERE uip.user_id = ?", (user_id,))
-    return [{'id': row[0], 'item_nome': row[1], 'is_enabled': bool(row[2])} for row in cursor.fetchall()]
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT OR IGNORE INTO user_item_preferences (user_id, item_id) SELECT ?, id FROM itens_relevantes WHERE id NOT IN (SELECT item_id FROM user_item_preferences WHERE user_id = ?)", (user_id, user_id))
+        conn.commit()
+        cursor.execute("SELECT ir.id, ir.item_nome, uip.is_enabled FROM itens_relevantes ir JOIN user_item_preferences uip ON ir.id = uip.item_id WHERE uip.user_id = ?", (user_id,))
+        return [{'id': row[0], 'item_nome': row[1], 'is_enabled': bool(row[2])} for row in cursor.fetchall()]
 
 def atualizar_preferencia_usuario(user_id: int, item_id: int, is_enabled: bool):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("UPDATE user_item_preferences SET is_enabled = ? WHERE user_id = ? AND item_id = ?", (1 if is_enabled else 0, user_id, item_id))
-    conn.commit()
-    conn.close()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE user_item_preferences SET is_enabled = ? WHERE user_id = ? AND item_id = ?", (1 if is_enabled else 0, user_id, item_id))
+
+_SQL_CONTAR_PROCESSOS_POR_NUMERO = "SELECT COUNT(*) FROM processos WHERE numero_processo = ?"
 
+@_observada
 def excluir_processo_por_id(process_id: int):
     """
     Exclui um processo do banco de dados e suas associações.
     """
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     numero_processo_para_limpar = None
-    
-    try:
-        # 1. Descobrir o numero_processo antes de deletar
-        cursor.execute("SELECT numero_processo FROM processos WHERE id = ?", (process_id,))
-        resultado = cursor.fetchone()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        try:
+            # 1. Descobrir o numero_processo antes de deletar
+            cursor.execute("SELECT numero_processo FROM processos WHERE id = ?", (process_id,))
+            resultado = cursor.fetchone()
         
-        if resultado:
-            numero_processo_para_limpar = resultado[0]
+            if resultado:
+                numero_processo_para_limpar = resultado[0]
             
-            # 2. Excluir da tabela de visualização
-            cursor.execute("DELETE FROM user_process_view WHERE process_id = ?", (process_id,))
+                # 2. Excluir da tabela de visualização
+                cursor.execute("DELETE FROM user_process_view WHERE process_id = ?", (process_id,))
             
-            # 3. Excluir da tabela principal de processos
-            cursor.execute("DELETE FROM processos WHERE id = ?", (process_id,))
+                # 3. Excluir da tabela principal de processos
+                cursor.execute("DELETE FROM processos WHERE id = ?", (process_id,))
             
-            # 4. (Opcional, mas recomendado) Verificar se mais algum processo usa este número
-            cursor.execute("SELECT COUNT(*) FROM processos WHERE numero_processo = ?", (numero_processo_para_limpar,))
-            contagem = cursor.fetchone()[0]
+                # 4. (Opcional, mas recomendado) Verificar se mais algum processo usa este número
+                cursor.execute(_SQL_CONTAR_PROCESSOS_POR_NUMERO, (numero_processo_para_limpar,))
+                contagem = cursor.fetchone()[0]
             
-            # 5. Se nenhum outro processo usa, limpa os subsídios
-            if contagem == 0:
-                cursor.execute("DELETE FROM subsidios_atuais WHERE numero_processo = ?", (numero_processo_para_limpar,))
+                # 5. Se nenhum outro processo usa, limpa os subsídios
+                if contagem == 0:
+                    cursor.execute("DELETE FROM subsidios_atuais WHERE numero_processo = ?", (numero_processo_para_limpar,))
+                    cursor.execute("DELETE FROM subsidios_fingerprint WHERE numero_processo = ?", (numero_processo_para_limpar,))
+                    cursor.execute("DELETE FROM agenda_verificacao WHERE numero_processo = ?", (numero_processo_para_limpar,))
+
+                _incrementar_versao_dados(cursor)
         
-        conn.commit()
-        return True
+            conn.commit()
+            return True
         
-    except Exception as e:
-        print(f"Erro ao excluir processo {process_id}: {e}")
-        conn.rollback()
-        return False
-    finally:
-        conn.close()
+        except Exception as e:
+            print(f"Erro ao excluir processo {process_id}: {e}")
+            conn.rollback()
+            return False
+
+# --- MÉTRICAS ---
+# Cada processo (scheduler, workers do RPA) publica periodicamente o retrato dos
+# seus contadores; o /metrics do server.py junta esses retratos aos próprios.
+def salvar_metricas_processo(processo: str, conteudo: dict):
+    with _conexao() as conn:
+        conn.cursor().execute(
+            "INSERT INTO metricas_processos (processo, atualizado_em, conteudo) VALUES (?, ?, ?) "
+            "ON CONFLICT(processo) DO UPDATE SET atualizado_em = excluded.atualizado_em, conteudo = excluded.conteudo",
+            (processo, time.time(), json.dumps(conteudo, ensure_ascii=False)),
+        )
+
+def buscar_metricas_processos(idade_maxima_segundos: float) -> list:
+    """ Retratos publicados há no máximo 'idade_maxima_segundos': [(processo, atualizado_em, conteudo)]. """
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT processo, atualizado_em, conteudo FROM metricas_processos WHERE atualizado_em >= ? ORDER BY processo",
+                       (time.time() - idade_maxima_segundos,))
+        return [(row[0], row[1], json.loads(row[2])) for row in cursor.fetchall()]
+
+_SQL_METRICAS_FILA = f"""
+    SELECT COUNT(*), SUM(a.proxima_verificacao IS NULL OR a.proxima_verificacao <= ?) FROM ({_SQL_MONITORAMENTO_GERAL}) m
+    LEFT JOIN agenda_verificacao a ON a.numero_processo = m.numero_processo
+"""
+
+def metricas_rpa(janela_minutos: float = 10) -> dict:
+    """
+    Indicadores do RPA lidos do banco, válidos para todos os processos:
+    processos em monitoramento e com verificação vencida, jobs pendentes da
+    execução aberta, processos concluídos por minuto na janela e o fim da
+    última varredura terminada (concluída ou encerrada por prazo).
+    """
+    agora = datetime.datetime.now()
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SQL_METRICAS_FILA, (agora,))
+        monitorando, vencidos = cursor.fetchone()
+        cursor.execute("""
+            SELECT COUNT(*) FROM rpa_jobs j JOIN rpa_execucoes e ON e.id = j.execucao_id
+            WHERE e.status = 'em_andamento' AND j.estado IN ('pendente', 'em_andamento')
+        """)
+        jobs_pendentes = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM rpa_jobs WHERE estado = 'concluido' AND atualizado_em >= ?",
+                       (agora - datetime.timedelta(minutes=janela_minutos),))
+        concluidos = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(fim) FROM rpa_execucoes WHERE status IN ('concluida', 'encerrada_por_prazo')")
+        ultima_varredura = cursor.fetchone()[0]
+    return {
+        "monitorando": monitorando or 0,
+        "vencidos": vencidos or 0,
+        "jobs_pendentes": jobs_pendentes,
+        "processos_por_minuto": concluidos / janela_minutos,
+        "ultima_varredura": datetime.datetime.fromisoformat(str(ultima_varredura)) if ultima_varredura else None,
+    }
+
+# --- DIAGNÓSTICO DAS CONSULTAS ---
+# Consultas mais executadas pelo painel, pela exportação e pelo RPA, com
+# parâmetros de exemplo (o plano não depende dos valores).
+_CONSULTAS_CRITICAS = {
+    "buscar_painel_usuario (processos)": (_SQL_PAINEL_PROCESSOS, ()),
+    "buscar_painel_usuario (subsídios)": (_SQL_SUBSIDIOS_DO_PAINEL, ()),
+    "exportar_dados_json (elegíveis e subsídios)": (_SQL_EXPORTACAO_SUBSIDIOS, ()),
+    "exportar_dados_json (anti-join do histórico)": (_SQL_EXPORTACAO_CHAVES_NOVAS, ()),
+    "_verificar_e_atualizar_status_geral": (_SQL_CONTAGEM_SUBSIDIOS, ("0",)),
+    "atualizar_status_para_usuarios (fingerprint)": (_SQL_FINGERPRINT, ("0",)),
+    "_verificar_e_atualizar_status_geral (concluir)": (_SQL_CONCLUIR_PROCESSO, ("0",)),
+    "marcar_ciencia_global": (_SQL_ARQUIVAR_PROCESSO, ("0",)),
+    "excluir_processo_por_id (contagem)": (_SQL_CONTAR_PROCESSOS_POR_NUMERO, ("0",)),
+    "buscar_processos_em_monitoramento_geral": (_SQL_MONITORAMENTO_GERAL, ()),
+    "buscar_processos_para_verificar": (_SQL_PROCESSOS_A_VERIFICAR, ("9999-12-31", 100)),
+    "metricas_rpa (fila)": (_SQL_METRICAS_FILA, ("9999-12-31",)),
+}
+
+def relatorio_plano_de_consultas() -> dict:
+    """
+    Retorna o EXPLAIN QUERY PLAN de cada consulta crítica, no formato
+    {nome: [linhas do plano]}. Linhas com 'SCAN <tabela>' (sem índice) indicam
+    varredura completa da tabela.
+    """
+    relatorio = {}
+    with _conexao() as conn:
+        cursor = conn.cursor()
+        # A tabela temporária da exportação só existe na conexão que já exportou.
+        cursor.execute(_SQL_CRIAR_CANDIDATAS_EXPORTACAO)
+        for nome, (sql, parametros) in _CONSULTAS_CRITICAS.items():
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)
+            relatorio[nome] = [row['detail'] for row in cursor.fetchall()]
+    return relatorio
+
+def imprimir_plano_de_consultas():
+    print(f"Esquema na versão {versao_do_esquema()} ({DB_NAME})")
+    for nome, plano in relatorio_plano_de_consultas().items():
+        print(f"\n{nome}")
+        for linha in plano:
+            print(f"    {linha}")
 
 if __name__ == '__main__':
-    inicializar_banco()
\ No newline at end of file
+    # python bd/database.py            -> cria/migra o banco e os usuários padrão
+    # python bd/database.py --explain  -> mostra o plano de execução das consultas críticas
+    inicializar_banco()
+    if '--explain' in sys.argv[1:]:
+        imprimir_plano_de_consultas()
\ No newline at end of file
@@ -0,0 +1,123 @@
+# Em: benchmarks/bench_extracao_subsidios.py
+"""
+Compara a leitura da tabela de subsídios célula a célula (implementação antiga)
+com a leitura em uma única chamada (processo.extrair_dados_subsidios), usando
+a fixture estática em benchmarks/fixtures. Para cada caminho mostra o tempo e
+quantas chamadas ao Playwright ele faz (frame_locator, locator, all,
+text_content, wait_for, evaluate...), contadas por um envoltório na página.
+
+Uso:
+    python benchmarks/bench_extracao_subsidios.py [--repeticoes 20]
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from playwright.sync_api import FrameLocator, Locator, Page, sync_playwright
+
+caminho_raiz_do_projeto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if caminho_raiz_do_projeto not in sys.path:
+    sys.path.append(caminho_raiz_do_projeto)
+
+from RPA import processo
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "pagina_processo.html"
+
+
+class _Contado:
+    """
+    Envolve a página, os frame locators e os locators devolvidos por ela e soma
+    em contador["chamadas"] cada método chamado neles.
+    """
+    def __init__(self, alvo, contador: dict):
+        self._alvo = alvo
+        self._contador = contador
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if not callable(valor):
+            # Propriedades como .first só montam outro locator, sem ir ao navegador.
+            return self._envolver(valor)
+
+        def chamada(*args, **kwargs):
+            self._contador["chamadas"] += 1
+            return self._envolver(valor(*args, **kwargs))
+        return chamada
+
+    def _envolver(self, valor):
+        if isinstance(valor, list):
+            return [self._envolver(v) for v in valor]
+        if isinstance(valor, (Page, FrameLocator, Locator)):
+            return _Contado(valor, self._contador)
+        return valor
+
+
+def _contar_chamadas(funcao, page) -> int:
+    contador = {"chamadas": 0}
+    funcao(_Contado(page, contador))
+    return contador["chamadas"]
+
+def _extrair_por_celula(page) -> list:
+    """
+    Cópia da implementação anterior: um text_content() por célula.
+    """
+    frame = page.frame_locator("#WIDGET_ID_1")
+    frame.locator("thead").wait_for(state="visible", timeout=15000)
+    headers = [h.upper() for h in frame.locator("thead th").all_text_contents()]
+    item_index = headers.index('ITEM')
+    estado_index = headers.index('ESTADO')
+    if frame.locator("tbody > tr").count() == 0:
+        return []
+    frame.locator("tbody > tr").first.wait_for(state="visible", timeout=15000)
+    dados = []
+    for linha in frame.locator("tbody > tr").all():
+        celulas = linha.locator("td").all()
+        dados.append({
+            "item": celulas[item_index].text_content().strip(),
+            "status": celulas[estado_index].text_content().strip(),
+        })
+    return dados
+
+
+def _medir(nome: str, funcao, page, repeticoes: int):
+    # A contagem roda em uma passada à parte, para o envoltório não pesar no tempo.
+    chamadas = _contar_chamadas(funcao, page)
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(page)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"{nome:<22} linhas={len(resultado):<4} chamadas={chamadas:<6} mediana={statistics.median(tempos):8.2f} ms  "
+          f"p95={sorted(tempos)[int(0.95 * (len(tempos) - 1))]:8.2f} ms  min={min(tempos):8.2f} ms")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    # Os logs por item do processo.py distorceriam a medição.
+    logging.basicConfig(level=logging.WARNING)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.goto(FIXTURE.as_uri())
+        page.frame_locator("#WIDGET_ID_1").locator("tbody > tr").first.wait_for(state="visible")
+
+        antigo = _medir("por célula (antigo)", _extrair_por_celula, page, args.repeticoes)
+        novo = _medir("em lote (atual)", processo.extrair_dados_subsidios, page, args.repeticoes)
+        browser.close()
+
+    if antigo != novo:
+        raise SystemExit("ERRO: as duas implementações retornaram dados diferentes.")
+    print("Resultados idênticos nas duas implementações.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Em: benchmarks/bench_gravacao.py
+"""
+Mede quanto tempo o RPA fica parado gravando leituras: uma transação por
+processo (database.atualizar_status_para_usuarios, como antes) contra a
+entrega ao GravadorEmLote, que grava em lote em segundo plano.
+
+Uso:
+    python benchmarks/bench_gravacao.py [--processos 2000] [--subsidios 8] [--lote 25]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+caminho_raiz_do_projeto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if caminho_raiz_do_projeto not in sys.path:
+    sys.path.append(caminho_raiz_do_projeto)
+
+from bd import database
+from RPA.gravador import GravadorEmLote
+
+
+def _leituras(quantidade: int, subsidios: int, rodada: int) -> list:
+    # A cada rodada muda o status de um item, para que toda leitura gere escrita.
+    return [
+        (f"{i:020d}", [{"item": f"Item {j}", "status": "Concluído" if j == rodada % subsidios else "Pendente"} for j in range(subsidios)])
+        for i in range(quantidade)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processos", type=int, default=2000)
+    parser.add_argument("--subsidios", type=int, default=8)
+    parser.add_argument("--lote", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        database.DB_NAME = os.path.join(pasta, "bench_gravacao.db")
+        database.adicionar_processos_em_lote(1, [{"numero_processo": numero} for numero, _ in _leituras(args.processos, 1, 0)])
+
+        inicio = time.perf_counter()
+        for numero, subsidios in _leituras(args.processos, args.subsidios, 1):
+            database.atualizar_status_para_usuarios(numero, subsidios)
+        tempo_direto = time.perf_counter() - inicio
+
+        alterados = {}
+        gravador = GravadorEmLote(args.lote, 2.0, apos_gravar=alterados.update)
+        inicio = time.perf_counter()
+        for numero, subsidios in _leituras(args.processos, args.subsidios, 2):
+            gravador(numero, subsidios)
+        tempo_entrega = time.perf_counter() - inicio
+        gravador.fechar()
+        tempo_total = time.perf_counter() - inicio
+        database.fechar_conexoes()
+
+    if len(alterados) != args.processos or not all(alterados.values()):
+        raise SystemExit("ERRO: o gravador não gravou todas as leituras.")
+    print(f"transação por processo: RPA parado {tempo_direto * 1000:8.0f} ms")
+    print(f"gravador em lote:       RPA parado {tempo_entrega * 1000:8.0f} ms  (gravação concluída em {tempo_total * 1000:.0f} ms, {gravador.lotes_gravados} lotes)")
+
+
+if __name__ == "__main__":
+    main()
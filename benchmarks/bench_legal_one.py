@@ -0,0 +1,93 @@
+# Em: benchmarks/bench_legal_one.py
+"""
+Compara a busca de CNJs das tarefas novas feita uma a uma, com requests.get
+avulso (implementação antiga), com apexFluxoLegalOne.processar_tarefas (sessão
+compartilhada, consultas simultâneas e cache de CNJ), contra o stub local do
+Legal One. A coluna "repetida" é a mesma importação com o cache já populado.
+
+Uso:
+    python benchmarks/bench_legal_one.py [--tarefas 20 100 300] [--latencia-ms 80] [--a-cada-429 25]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+caminho_raiz_do_projeto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if caminho_raiz_do_projeto not in sys.path:
+    sys.path.append(caminho_raiz_do_projeto)
+
+from bd import database
+from RPA import apexFluxoLegalOne
+from benchmarks.stub_legal_one import StubLegalOne, gerar_tarefas
+
+
+def _processar_sequencial(tasks) -> list:
+    """
+    Cópia da implementação anterior: um requests.get (nova conexão) por tarefa.
+    """
+    resultados = []
+    for task in tasks:
+        litigation_id = task['relationships'][0].get('linkId') if task.get('relationships') else None
+        cnj_number = None
+        if litigation_id:
+            url = f"{apexFluxoLegalOne.BASE_URL}/litigations/{litigation_id}?$select=identifierNumber"
+            response = requests.get(url, headers={"Authorization": f"Bearer {apexFluxoLegalOne.get_access_token()}"}, params={})
+            if response.ok:
+                cnj_number = response.json().get('identifierNumber')
+        resultados.append({
+            "tarefa_id": task.get('id'),
+            "processo_id": litigation_id,
+            "processo_cnj": cnj_number,
+            "finalizado_por_id": task.get('finishedBy'),
+        })
+    return resultados
+
+
+def _medir(servidor, funcao, tasks):
+    servidor.conexoes = servidor.requisicoes = servidor.respostas_429 = 0
+    inicio = time.perf_counter()
+    resultado = funcao(tasks)
+    return (time.perf_counter() - inicio) * 1000, servidor.conexoes, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tarefas", type=int, nargs="+", default=[20, 100, 300])
+    parser.add_argument("--latencia-ms", type=int, default=80)
+    parser.add_argument("--a-cada-429", type=int, default=0, help="o stub responde 429 a cada N requisições (só na versão atual)")
+    args = parser.parse_args()
+
+    servidor = StubLegalOne(("127.0.0.1", 0), args.latencia_ms).iniciar_em_segundo_plano()
+    apexFluxoLegalOne.BASE_URL = servidor.url
+    apexFluxoLegalOne.AUTH_URL = f"{servidor.url}/oauth"
+    apexFluxoLegalOne.get_access_token()
+
+    print(f"{'tarefas':>8} {'antigo (ms)':>12} {'conexões':>9} {'atual (ms)':>11} {'conexões':>9} {'429':>5} {'ganho':>7} {'repetida (ms)':>14} {'req.':>5}")
+    for quantidade in args.tarefas:
+        tasks = gerar_tarefas(quantidade)
+        with tempfile.TemporaryDirectory() as pasta:
+            database.DB_NAME = os.path.join(pasta, "bench_legal_one.db")
+            apexFluxoLegalOne._cache_cnj.clear()
+            tempo_antigo, conexoes_antigo, antigo = _medir(servidor, _processar_sequencial, tasks)
+            servidor.a_cada_429 = args.a_cada_429
+            tempo_novo, conexoes_novo, novo = _medir(servidor, apexFluxoLegalOne.processar_tarefas, tasks)
+            respostas_429 = servidor.respostas_429
+            servidor.a_cada_429 = 0
+            # Segunda importação: a memória é limpa para medir a leitura do banco.
+            apexFluxoLegalOne._cache_cnj.clear()
+            tempo_repetida, _, repetida = _medir(servidor, apexFluxoLegalOne.processar_tarefas, tasks)
+            requisicoes_repetida = servidor.requisicoes
+            database.fechar_conexoes()
+        if not (antigo == novo == repetida):
+            raise SystemExit(f"ERRO: resultados diferentes com {quantidade} tarefas.")
+        print(f"{quantidade:>8} {tempo_antigo:>12.0f} {conexoes_antigo:>9} {tempo_novo:>11.0f} {conexoes_novo:>9} {respostas_429:>5} {tempo_antigo / tempo_novo:>6.1f}x {tempo_repetida:>14.1f} {requisicoes_repetida:>5}")
+    print(f"Cache de CNJ: {apexFluxoLegalOne.estatisticas_cache_cnj}")
+    servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Em: benchmarks/bench_painel.py
+"""
+Mede database.buscar_painel_usuario contra a implementação antiga (uma consulta
+de subsídios por processo) em bancos temporários com 1k, 10k e 50k processos.
+
+Uso:
+    python benchmarks/bench_painel.py [--tamanhos 1000 10000 50000] [--subsidios 5]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+caminho_raiz_do_projeto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if caminho_raiz_do_projeto not in sys.path:
+    sys.path.append(caminho_raiz_do_projeto)
+
+from bd import database
+
+STATUS_VISUALIZACAO = ('monitorando', 'pendente_ciencia', 'Concluído', 'arquivado')
+STATUS_SUBSIDIO = ('Concluído', 'Pendente', 'Em andamento', 'Excluído')
+
+
+def _popular_banco(quantidade: int, subsidios_por_processo: int):
+    agora = datetime.datetime.now()
+    processos, visoes, subsidios = [], [], []
+    for i in range(1, quantidade + 1):
+        numero = f"{i:020d}"
+        processos.append((i, numero, f"responsável {i % 40}", agora - datetime.timedelta(minutes=i), i, i % 40))
+        visoes.append((1, i, STATUS_VISUALIZACAO[i % len(STATUS_VISUALIZACAO)]))
+        for j in range(subsidios_por_processo):
+            subsidios.append((numero, f"Item {j}", STATUS_SUBSIDIO[(i + j) % len(STATUS_SUBSIDIO)], agora))
+    with database._conexao() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("INSERT INTO processos (id, numero_processo, responsavel_principal, data_ultima_atualizacao, tarefa_id, id_responsavel) VALUES (?, ?, ?, ?, ?, ?)", processos)
+        cursor.executemany("INSERT INTO user_process_view (user_id, process_id, status_visualizacao) VALUES (?, ?, ?)", visoes)
+        cursor.executemany("INSERT INTO subsidios_atuais (numero_processo, item, status, data_atualizacao) VALUES (?, ?, ?, ?)", subsidios)
+
+
+def _painel_n_mais_um(user_id: int) -> list:
+    """
+    Cópia da implementação anterior: uma consulta de subsídios por processo.
+    """
+    with database._conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute(database._SQL_PAINEL_PROCESSOS)
+        dados_painel = [dict(row) for row in cursor.fetchall()]
+        for processo in dados_painel:
+            cursor.execute("SELECT item, status FROM subsidios_atuais WHERE numero_processo = ? ORDER BY id", (processo['numero_processo'],))
+            processo['subsidios'] = [dict(row) for row in cursor.fetchall()]
+    return dados_painel
+
+
+def _cronometrar(funcao, repeticoes: int):
+    melhor, resultado = None, None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(1)
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor * 1000, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--subsidios", type=int, default=5, help="subsídios por processo")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'processos':>10} {'no painel':>10} {'consultas antes':>16} {'N+1 (ms)':>10} {'atual (ms)':>11} {'ganho':>7}")
+    for quantidade in args.tamanhos:
+        with tempfile.TemporaryDirectory() as pasta:
+            database.DB_NAME = os.path.join(pasta, "bench_painel.db")
+            _popular_banco(quantidade, args.subsidios)
+
+            tempo_antigo, antigo = _cronometrar(_painel_n_mais_um, args.repeticoes)
+            tempo_novo, novo = _cronometrar(database.buscar_painel_usuario, args.repeticoes)
+            if antigo != novo:
+                raise SystemExit(f"ERRO: resultados diferentes com {quantidade} processos.")
+
+            print(f"{quantidade:>10} {len(novo):>10} {len(novo) + 1:>16} {tempo_antigo:>10.1f} {tempo_novo:>11.1f} {tempo_antigo / tempo_novo:>6.1f}x")
+            database.fechar_conexoes()
+
+
+if __name__ == "__main__":
+    main()
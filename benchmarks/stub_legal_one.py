@@ -0,0 +1,163 @@
+# Em: benchmarks/stub_legal_one.py
+"""
+Servidor local que imita os endpoints do Legal One usados pelo apexFluxoLegalOne
+(/oauth, /tasks e /litigations/<id>), com latência artificial e respostas 429
+opcionais. Serve para medir e testar a importação sem acessar a API real.
+
+Uso:
+    python benchmarks/stub_legal_one.py [--porta 8765] [--latencia-ms 80] [--a-cada-429 0]
+
+Depois aponte o RPA para ele:
+    LEGAL_ONE_BASE_URL=http://127.0.0.1:8765 LEGAL_ONE_AUTH_URL=http://127.0.0.1:8765/oauth
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class StubLegalOne(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia_ms=80, a_cada_429=0, tarefas=None, com_next_link=True, validade_token=1800):
+        super().__init__(endereco, _Manipulador)
+        self.latencia = latencia_ms / 1000
+        self.a_cada_429 = a_cada_429
+        self.tarefas = tarefas if tarefas is not None else []
+        # Sem @odata.nextLink o cliente precisa paginar com $skip.
+        self.com_next_link = com_next_link
+        # Tokens emitidos e ainda aceitos; remover um simula a revogação (401).
+        self.validade_token = validade_token
+        self.tokens_validos = set()
+        self.tokens_emitidos = 0
+        self.requisicoes = 0
+        self.respostas_429 = 0
+        self.conexoes = 0
+        self._trava = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def iniciar_em_segundo_plano(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def _contar(self):
+        with self._trava:
+            self.requisicoes += 1
+            return self.requisicoes
+
+
+# Pares (typeId, subTypeId) dos filtros do importador
+TIPOS = [(26, 1131), (28, 961), (28, 936), (15, 856), (28, 984)]
+
+
+def gerar_tarefas(quantidade: int, primeiro_id: int = 1) -> list:
+    """ Tarefas distribuídas em rodízio entre os tipos dos filtros. """
+    tarefas = []
+    for i in range(primeiro_id, primeiro_id + quantidade):
+        type_id, sub_type_id = TIPOS[i % len(TIPOS)]
+        tarefas.append({"id": i, "typeId": type_id, "subTypeId": sub_type_id, "finishedBy": i % 40,
+                        "relationships": [{"id": i, "linkId": 100000 + i}]})
+    return tarefas
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server._trava:
+            self.server.conexoes += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _limitar(self) -> bool:
+        numero = self.server._contar()
+        if self.server.a_cada_429 and numero % self.server.a_cada_429 == 0:
+            with self.server._trava:
+                self.server.respostas_429 += 1
+            self._responder(429, {"message": "Too Many Requests"}, {"Retry-After": "0"})
+            return True
+        time.sleep(self.server.latencia)
+        return False
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho:
+            self.rfile.read(tamanho)
+        if urlparse(self.path).path != "/oauth":
+            return self._responder(404, {"message": "not found"})
+        if self._limitar():
+            return
+        with self.server._trava:
+            self.server.tokens_emitidos += 1
+            token = f"token-de-teste-{self.server.tokens_emitidos}"
+            self.server.tokens_validos.add(token)
+        self._responder(200, {"access_token": token, "expires_in": self.server.validade_token})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if self._limitar():
+            return
+        if self.headers.get("Authorization", "").removeprefix("Bearer ") not in self.server.tokens_validos:
+            return self._responder(401, {"message": "Unauthorized"})
+        if url.path == "/tasks":
+            return self._responder(200, self._filtrar_tarefas(parse_qs(url.query)))
+        encontrado = re.fullmatch(r"/litigations/(\d+)", url.path)
+        if encontrado:
+            litigation_id = int(encontrado.group(1))
+            return self._responder(200, {"id": litigation_id, "identifierNumber": f"{litigation_id:07d}-00.2024.8.26.0100"})
+        self._responder(404, {"message": "not found"})
+
+    def _filtrar_tarefas(self, query) -> dict:
+        tarefas = list(self.server.tarefas)
+        filtro = (query.get("$filter") or [""])[0]
+        tipo = re.search(r"typeId eq (\d+) and subTypeId eq (\d+)", filtro)
+        if tipo:
+            par = (int(tipo.group(1)), int(tipo.group(2)))
+            tarefas = [t for t in tarefas if (t.get("typeId"), t.get("subTypeId")) == par]
+        maior_que = re.search(r"\bid gt (\d+)", filtro)
+        if maior_que:
+            tarefas = [t for t in tarefas if t["id"] > int(maior_que.group(1))]
+        tarefas.sort(key=lambda t: t["id"], reverse=(query.get("$orderby") or [""])[0] == "id desc")
+        inicio = int((query.get("$skip") or ["0"])[0])
+        topo = int((query.get("$top") or ["30"])[0])
+        corpo = {"value": [{k: v for k, v in t.items() if k not in ("typeId", "subTypeId")} for t in tarefas[inicio:inicio + topo]]}
+        if self.server.com_next_link and inicio + topo < len(tarefas):
+            proxima = {chave: valores[0] for chave, valores in query.items()}
+            proxima["$skip"] = str(inicio + topo)
+            corpo["@odata.nextLink"] = f"{self.server.url}/tasks?{urlencode(proxima)}"
+        return corpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=int, default=80)
+    parser.add_argument("--a-cada-429", type=int, default=0, help="responde 429 a cada N requisições (0 desativa)")
+    parser.add_argument("--tarefas", type=int, default=150)
+    args = parser.parse_args()
+
+    servidor = StubLegalOne(("127.0.0.1", args.porta), args.latencia_ms, args.a_cada_429, gerar_tarefas(args.tarefas))
+    print(f"🧪 Stub do Legal One em {servidor.url}")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
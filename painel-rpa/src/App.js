@@ -1,7 +1,8 @@
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import {
-    fetchPainelData,
+    fetchPainelPage,
     addSingleProcess,
+    addProcessesBatch,
     checkLoginStatus,
     logout,
     importFromLegalOne,
@@ -13,6 +14,16 @@ import LoginPage from './LoginPage';
 import './App.css';
 import logo from './assets/logo-onesid.png';
 
+// Quantidade de processos buscados por página no painel
+const TAMANHO_PAGINA = 50;
+
+// Valor de status_geral enviado ao servidor para cada botão de filtro
+const STATUS_POR_FILTRO = {
+    todos: null,
+    monitorando: 'monitorando',
+    concluido: 'Concluído',
+};
+
 // Componente para o Modal de Detalhes
 const DetailsModal = ({ processo, onClose }) => {
     if (!processo) return null;
@@ -39,27 +50,36 @@ const DetailsModal = ({ processo, onClose }) => {
 // Componente Principal da Aplicação
 function App() {
     const [processos, setProcessos] = useState([]);
+    const [totalProcessos, setTotalProcessos] = useState(0);
+    const [proximoCursor, setProximoCursor] = useState(null);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
     const [user, setUser] = useState(null);
     const [message, setMessage] = useState('');
     const [numeroProcesso, setNumeroProcesso] = useState('');
     const [executante, setExecutante] = useState('');
+    const [textoLote, setTextoLote] = useState('');
+    const [isAddingBatch, setIsAddingBatch] = useState(false);
     const [isImporting, setIsImporting] = useState(false);
     const [selectedProcess, setSelectedProcess] = useState(null);
     const [isExporting, setIsExporting] = useState(false);
 
     const [filter, setFilter] = useState('todos');
 
-    // 2. Estado para a ordenação
-    const [sortConfig, setSortConfig] = useState({ key: 'id', direction: 'ascending' });
+    // Campos de busca (digitados) e busca aplicada (enviada ao servidor)
+    const [buscaNumero, setBuscaNumero] = useState('');
+    const [buscaResponsavel, setBuscaResponsavel] = useState('');
+    const [buscaAplicada, setBuscaAplicada] = useState({ numero: '', responsavel: '' });
+
+    // 2. Estado para a ordenação (feita no servidor)
+    const [sortConfig, setSortConfig] = useState({ key: 'data_ultima_atualizacao', direction: 'descending' });
 
     const checkAuth = async () => {
         try {
             const userData = await checkLoginStatus();
             if (userData && userData.logged_in) {
                 setUser(userData);
-                loadPainelData();
             } else {
                 setUser(null);
             }
@@ -70,26 +90,49 @@ function App() {
         }
     };
 
-    const loadPainelData = async () => {
-        setIsLoading(true);
+    // Sem cursor recarrega a primeira página; com cursor acrescenta a próxima página à lista.
+    const loadPainelData = useCallback(async (cursor = null) => {
+        if (cursor) {
+            setIsLoadingMore(true);
+        } else {
+            setIsLoading(true);
+        }
         try {
-            const data = await fetchPainelData();
-            const dataWithSubsidios = data.map(proc => ({ ...proc, subsidios: proc.subsidios || [] }));
-            setProcessos(dataWithSubsidios);
+            const pagina = await fetchPainelPage({
+                limite: TAMANHO_PAGINA,
+                cursor,
+                status: STATUS_POR_FILTRO[filter],
+                numero: buscaAplicada.numero,
+                responsavel: buscaAplicada.responsavel,
+                ordenar_por: sortConfig.key,
+                direcao: sortConfig.direction === 'ascending' ? 'asc' : 'desc',
+            });
+            const itens = pagina.itens.map(proc => ({ ...proc, subsidios: proc.subsidios || [] }));
+            setProcessos(anteriores => (cursor ? [...anteriores, ...itens] : itens));
+            setTotalProcessos(pagina.total);
+            setProximoCursor(pagina.proximo_cursor);
             setError(null);
         } catch (error) {
             setError('Falha ao carregar dados do painel.');
             setProcessos([]);
+            setProximoCursor(null);
         } finally {
             setIsLoading(false);
+            setIsLoadingMore(false);
         }
-    };
+    }, [filter, buscaAplicada, sortConfig]);
 
     useEffect(() => { checkAuth(); }, []);
 
+    // Recarrega a primeira página ao entrar e sempre que filtro, busca ou ordenação mudarem
+    useEffect(() => {
+        if (user) {
+            loadPainelData();
+        }
+    }, [user, loadPainelData]);
+
     const handleLoginSuccess = (userData) => {
         setUser(userData);
-        loadPainelData();
     };
 
     const handleArchiveProcess = async (numeroProcesso, processId) => {
@@ -110,6 +153,18 @@ function App() {
         await logout();
         setUser(null);
         setProcessos([]);
+        setProximoCursor(null);
+    };
+
+    const handleSearch = (e) => {
+        e.preventDefault();
+        setBuscaAplicada({ numero: buscaNumero.trim(), responsavel: buscaResponsavel.trim() });
+    };
+
+    const handleClearSearch = () => {
+        setBuscaNumero('');
+        setBuscaResponsavel('');
+        setBuscaAplicada({ numero: '', responsavel: '' });
     };
 
     const handleAddProcess = async (e) => {
@@ -130,6 +185,26 @@ function App() {
         }
     };
 
+    const handleAddBatch = async (e) => {
+        e.preventDefault();
+        if (!textoLote.trim()) {
+            setMessage('Cole ao menos um número de processo.');
+            return;
+        }
+        setIsAddingBatch(true);
+        setMessage('Adicionando processos em lote...');
+        try {
+            const response = await addProcessesBatch(textoLote, executante);
+            setMessage(response.message);
+            setTextoLote('');
+            loadPainelData();
+        } catch (error) {
+            setMessage(error.message || 'Erro ao adicionar processos em lote.');
+        } finally {
+            setIsAddingBatch(false);
+        }
+    };
+
     // 3. Função para lidar com a exclusão
     const handleDeleteProcess = async (processId, processoNumero) => {
         if (!window.confirm(`Tem certeza que deseja excluir o processo ${processoNumero} (ID: ${processId})?\n\nEsta ação não pode ser desfeita.`)) {
@@ -197,39 +272,12 @@ function App() {
         setSortConfig({ key, direction });
     };
 
-    // 5. Lógica de filtragem E ordenação com useMemo
-    const processedProcessos = useMemo(() => {
-        let dataToProcess = [...processos];
-
-        // 1. Filtragem
-        const filteredData = dataToProcess.filter(p => {
-            if (filter === 'monitorando') {
-                return p.status_geral && p.status_geral.toLowerCase() === 'monitorando';
-            }
-            if (filter === 'concluido') {
-                return p.status_geral && p.status_geral.toLowerCase() === 'concluído';
-            }
-            return true; // para 'todos'
-        });
-
-        // 2. Ordenação
-        if (sortConfig.key === 'id') {
-            filteredData.sort((a, b) => {
-                const valA = a.id || 0;
-                const valB = b.id || 0;
-
-                if (valA < valB) {
-                    return sortConfig.direction === 'ascending' ? -1 : 1;
-                }
-                if (valA > valB) {
-                    return sortConfig.direction === 'ascending' ? 1 : -1;
-                }
-                return 0;
-            });
+    const renderSortIndicator = (key) => {
+        if (sortConfig.key !== key) {
+            return ' ↕';
         }
-
-        return filteredData;
-    }, [processos, filter, sortConfig]); // Dependências
+        return sortConfig.direction === 'ascending' ? ' ▲' : ' ▼';
+    };
 
     if (!user) {
         return <LoginPage onLoginSuccess={handleLoginSuccess} />;
@@ -256,6 +304,10 @@ function App() {
                                 <input type="text" value={executante} onChange={(e) => setExecutante(e.target.value)} placeholder="Nome do Executante" />
                                 <button type="submit">Adicionar à Esteira</button>
                             </form>
+                            <form onSubmit={handleAddBatch} className="add-process-form batch-form">
+                                <textarea value={textoLote} onChange={(e) => setTextoLote(e.target.value)} placeholder="Ou cole aqui uma coluna do Excel com vários números de processo" rows={5} />
+                                <button type="submit" disabled={isAddingBatch}>{isAddingBatch ? 'Adicionando...' : 'Adicionar Lote'}</button>
+                            </form>
                         </div>
                         <div className="import-container card">
                             <h2>Ações em Lote</h2>
@@ -276,32 +328,42 @@ function App() {
                             <button onClick={() => setFilter('concluido')} className={filter === 'concluido' ? 'active' : ''}>Concluído</button>
                         </div>
 
+                        <form onSubmit={handleSearch} className="search-form">
+                            <input type="text" value={buscaNumero} onChange={(e) => setBuscaNumero(e.target.value)} placeholder="Buscar por número do processo" />
+                            <input type="text" value={buscaResponsavel} onChange={(e) => setBuscaResponsavel(e.target.value)} placeholder="Buscar por responsável" />
+                            <button type="submit">Buscar</button>
+                            <button type="button" onClick={handleClearSearch}>Limpar</button>
+                        </form>
+
                         {isLoading ? <p>Carregando...</p> : error ? <p className="error">{error}</p> : (
                             <table>
                                 <thead>
                                     <tr>
-                                        {/* 6. Cabeçalho de ID clicável */}
+                                        {/* 6. Cabeçalhos clicáveis (ordenação feita no servidor) */}
                                         <th
                                             onClick={() => requestSort('id')}
                                             className="sortable-header"
                                         >
                                             ID
-                                            {sortConfig.key === 'id' ?
-                                                (sortConfig.direction === 'ascending' ? ' ▲' : ' ▼') :
-                                                ' ↕'
-                                            }
+                                            {renderSortIndicator('id')}
                                         </th>
                                         <th>Número do Processo</th>
                                         <th>ID do Responsável</th>
                                         <th>Status</th>
-                                        <th>Última Verificação</th>
+                                        <th
+                                            onClick={() => requestSort('data_ultima_atualizacao')}
+                                            className="sortable-header"
+                                        >
+                                            Última Alteração
+                                            {renderSortIndicator('data_ultima_atualizacao')}
+                                        </th>
                                         <th>Ações</th> {/* 7. Cabeçalho de Ações */}
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {/* 8. Renderiza a lista processada */}
-                                    {processedProcessos.length > 0 ? (
-                                        processedProcessos.map((p) => (
+                                    {/* 8. Renderiza as páginas já carregadas */}
+                                    {processos.length > 0 ? (
+                                        processos.map((p) => (
                                             <tr key={`${p.id}-${p.numero_processo}`}>
                                                 <td>{p.id}</td>
                                                 <td><button className="link-button" onClick={() => setSelectedProcess(p)}>{p.numero_processo}</button></td>
@@ -332,6 +394,17 @@ function App() {
                                 </tbody>
                             </table>
                         )}
+
+                        {!isLoading && !error && (
+                            <div className="pagination">
+                                <span>Exibindo {processos.length} de {totalProcessos} processo(s).</span>
+                                {proximoCursor && (
+                                    <button onClick={() => loadPainelData(proximoCursor)} disabled={isLoadingMore}>
+                                        {isLoadingMore ? 'Carregando...' : 'Carregar mais'}
+                                    </button>
+                                )}
+                            </div>
+                        )}
                     </div>
                 </main>
             </div>
@@ -40,9 +40,17 @@ export async function checkLoginStatus() {
 
 
 // --- Funções de Processos ---
-export async function fetchPainelData() {
-    const response = await fetch(`${API_BASE_URL}/painel`, {
-        credentials: 'include', // <-- MUDANÇA IMPORTANTE
+// Busca uma página do painel. Filtros, ordenação e paginação são feitos no servidor.
+// params: { limite, cursor, status, responsavel, numero, ordenar_por, direcao }
+export async function fetchPainelPage(params) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([chave, valor]) => {
+        if (valor !== undefined && valor !== null && valor !== '') {
+            query.append(chave, valor);
+        }
+    });
+    const response = await fetch(`${API_BASE_URL}/painel?${query.toString()}`, {
+        credentials: 'include',
     });
     return handleResponse(response);
 }
@@ -57,6 +65,17 @@ export async function addSingleProcess(processData) {
     return handleResponse(response);
 }
 
+// Envia o texto colado do Excel (um processo por linha; executante opcional na 2ª coluna)
+export async function addProcessesBatch(processos, executante) {
+    const response = await fetch(`${API_BASE_URL}/add-processes-batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ processos, executante }),
+        credentials: 'include',
+    });
+    return handleResponse(response);
+}
+
 export async function importFromLegalOne() {
     const response = await fetch(`${API_BASE_URL}/import-legal-one`, {
         method: 'POST',